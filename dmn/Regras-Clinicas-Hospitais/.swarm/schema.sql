@@ -23,6 +23,10 @@ CREATE TABLE IF NOT EXISTS memory_entries (
   embedding TEXT,
   embedding_model TEXT DEFAULT 'local',
   embedding_dimensions INTEGER,
+  -- Packed little-endian float32 copy (dmn_engine memory migrate); the JSON
+  -- text above is kept; --clear-json sets it to NULL once packed
+  embedding_blob BLOB,
+  embedding_packed_at INTEGER, -- updated_at of the row when it was packed
 
   -- Metadata
   tags TEXT, -- JSON array
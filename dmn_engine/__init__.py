@@ -0,0 +1,88 @@
+"""
+In-process evaluator for the dmn/ regra.dmn.xml corpus
+
+    from dmn_engine import Corpus
+    corpus = Corpus()
+    corpus.evaluate("DDI-SEROTONIN-002", {
+        "medicamentosAtivos": ["FENELZINA"],
+        "medicamentoNovo": "FENTANIL",
+    })
+"""
+
+from .analyzer import analyze_table
+from .applicability import ApplicabilityIndex
+from .audit import Auditor, run_audit
+from .batch import BatchTable, compile_batch, evaluate_batch
+from .bench import run_benchmark
+from .cache import ResultCache
+from .cid import CidIndex
+from .corpus import Corpus, TableRef, discover
+from .ddi import DrugIndex, canonical_drug, normalize_drug
+from .engine import CompiledRule, CompiledTable, compile_table
+from .errors import (
+    AmbiguousTableError,
+    DmnError,
+    DmnParseError,
+    FeelSyntaxError,
+    TableNotFoundError,
+)
+from .ews import EwsMonitor
+from .generate import Spec, find_specs, generate
+from .indexer import rebuild_index, rebuild_indexes
+from .loader import load_table, parse_dmn
+from .memory import RuleMemory, find_memories
+from .metrics import Metrics
+from .pipeline import RevenuePipeline
+from .shadow import Shadow
+from .shared import SharedFragments
+from .snapshot import Snapshot, build_snapshot
+from .validate import check_table, validate
+from .worker import BpmnError, ExternalTaskWorker, Subscription
+
+__all__ = [
+    "AmbiguousTableError",
+    "ApplicabilityIndex",
+    "Auditor",
+    "BatchTable",
+    "BpmnError",
+    "CidIndex",
+    "CompiledRule",
+    "CompiledTable",
+    "Corpus",
+    "DmnError",
+    "DmnParseError",
+    "DrugIndex",
+    "EwsMonitor",
+    "ExternalTaskWorker",
+    "FeelSyntaxError",
+    "Metrics",
+    "ResultCache",
+    "RevenuePipeline",
+    "RuleMemory",
+    "Shadow",
+    "SharedFragments",
+    "Snapshot",
+    "Spec",
+    "Subscription",
+    "TableNotFoundError",
+    "TableRef",
+    "analyze_table",
+    "build_snapshot",
+    "canonical_drug",
+    "check_table",
+    "compile_batch",
+    "compile_table",
+    "discover",
+    "evaluate_batch",
+    "find_memories",
+    "find_specs",
+    "generate",
+    "load_table",
+    "normalize_drug",
+    "parse_dmn",
+    "rebuild_index",
+    "rebuild_indexes",
+    "run_audit",
+    "run_benchmark",
+    "validate",
+]
@@ -0,0 +1,457 @@
+"""
+Static analysis of FIRST tables: dead rules and a safe hit-frequency order
+
+Under hitPolicy FIRST the rule order is part of the semantics and also the
+cost of a match. analyze_table() looks at every rule against the input
+domains and the rules above it:
+
+    report = analyze_table(corpus.get("20101201"), corpus.metadata("20101201"))
+    report["unreachable"]   # rules no input in the domain can satisfy
+    report["shadowed"]      # rules whose every match is taken by earlier rules
+    analyze_table(table, metadata, hits={"Rule_Aprovado_ClasseI_Geral": 9120, ...})["order"]
+
+    python -m dmn_engine analyze --family Regras-Audit-Operadora
+    python -m dmn_engine analyze 20101201 --hits dmn.prom      # audit --metrics output
+
+Each input column is reduced to a finite set of cells whose values every
+test treats alike: the column's inputValues, or the allowedValues of
+metadata.json when the DMN declares none, True/False for booleans, and otherwise one value
+per numeric boundary and one between each pair of boundaries, the string
+literals the tests mention plus "any other string". Missing inputs (None)
+are a cell too unless assume_complete is set, so the catch-all fallback
+that exists for incomplete claims is not reported as shadowed. A rule is
+then a box (one cell set per column); a rule is unreachable when one of its
+sets is empty and shadowed when the boxes of the rules above it cover its
+box, which is checked exactly by box subtraction.
+
+Tests the cells cannot describe - expressions over other variables,
+`list contains(...)` on list inputs, inputs that are expressions - are
+opaque: an opaque rule never shadows anything and its opaque columns count
+as matching everything, so every finding is sound for the given domains.
+
+Given hit counts (a {rule id: count} dict, or the dmn_rule_hits_total lines
+of a metrics file), "order" is a semantics-preserving reorder: a rule may
+only move above rules it is disjoint from (some column where their cell
+sets do not meet), and among the rules free to go next the most frequent
+goes first. The engine does not enforce inputValues or allowedValues, so
+the order is worked out on cells for any input instead: the literals and
+numeric boundaries of the tests, their string forms, true, false, null and
+any other string, with string ordering tests left opaque. Only the rules
+no input at all can match are dropped ("dropped"); rules that are dead
+for the declared domains stay, and having no hits they sink as far down as
+the order allows, in their original relative order. "cost" is the mean
+number of rules visited per match before and after. reorder() builds the
+CompiledTable.
+"""
+
+import re
+
+from .engine import NEVER, CompiledTable, parse_table
+from .errors import DmnError, FeelSyntaxError
+from .feel import parse_unary_tests
+
+# Box subtraction fans out with the number of columns; past this many
+# pieces a rule is reported as undecided instead of shadowed or not
+MAX_BOXES = 20000
+
+_NUMERIC_TYPES = ("number", "integer", "long", "double")
+_INTEGER_TYPES = ("integer", "long")
+_OTHER = "\x00other"
+
+_HITS_LINE = re.compile(r"^dmn_rule_hits_total\{(.*)\}\s+(\S+)")
+_LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+
+# ---------------------------------------------------------------------------
+# Test classification
+# ---------------------------------------------------------------------------
+
+def _literals(node, found):
+    if isinstance(node, tuple):
+        if len(node) == 2 and node[0] == "lit":
+            found.append(node[1])
+            return found
+        if node[0] == "eq" and node[1][0] == "name":
+            found.append(node[1][1])
+            return found
+        for child in node[1:]:
+            _literals(child, found)
+    elif isinstance(node, list):
+        for child in node:
+            _literals(child, found)
+    return found
+
+
+def _exact_positive(test, variables):
+    """True when a positive test only compares the input with literals"""
+    tag = test[0]
+    if tag == "eq":
+        # Bare words are string literals unless the context has them (see
+        # feel._compile_equality); the table's own inputs always are variables
+        return test[1][0] == "lit" or (test[1][0] == "name" and test[1][1] not in variables)
+    if tag == "cmp":
+        return test[2][0] == "lit"
+    if tag == "range":
+        return test[2][0] == "lit" and test[3][0] == "lit"
+    if tag in ("any_of", "all_of", "negate"):
+        return all(_exact_positive(p, variables) for p in test[1])
+    return False
+
+
+def _exact(ast, variables):
+    return ast == NEVER or ast is None or all(_exact_positive(p, variables) for p in ast[1])
+
+
+def _orders_strings(node):
+    """True when a test compares the input with a string by order (< "M", ["A".."C"])"""
+    if isinstance(node, tuple) and node:
+        if node[0] == "cmp":
+            return type(node[2][1]) is str
+        if node[0] == "range":
+            return type(node[2][1]) is str or type(node[3][1]) is str
+        return any(_orders_strings(child) for child in node[1:])
+    if isinstance(node, list):
+        return any(_orders_strings(child) for child in node)
+    return False
+
+
+def input_specs(metadata):
+    """{input name: {"type", "allowedValues"}} from the metadata.json variants.
+
+    Families write inputs as a {name: spec} object or a list of specs with a
+    "name", and spell the keys type/tipo and allowedValues/values/
+    valoresPossiveis.
+    """
+    inputs = (metadata or {}).get("inputs")
+    if isinstance(inputs, dict):
+        items = [(name, spec) for name, spec in inputs.items() if isinstance(spec, dict)]
+    elif isinstance(inputs, list):
+        items = [(spec.get("name"), spec) for spec in inputs
+                 if isinstance(spec, dict) and spec.get("name")]
+    else:
+        items = []
+    specs = {}
+    for name, spec in items:
+        allowed = next((spec[k] for k in ("allowedValues", "values", "valoresPossiveis")
+                        if isinstance(spec.get(k), list)), None)
+        specs[name] = {"type": spec.get("type") or spec.get("tipo"), "allowedValues": allowed}
+    return specs
+
+
+def _domain(clause, spec):
+    """Finite value set from inputValues, else allowedValues, or None"""
+    if clause.input_values:
+        try:
+            parsed = parse_unary_tests(clause.input_values)
+        except FeelSyntaxError:
+            parsed = None
+        if parsed is not None and parsed[0] == "tests" and all(
+                p[0] == "eq" and p[1][0] == "lit" for p in parsed[1]):
+            return [p[1][1] for p in parsed[1]]
+    allowed = (spec or {}).get("allowedValues")
+    if isinstance(allowed, list) and allowed:
+        return list(dict.fromkeys(v for v in allowed if not isinstance(v, (list, dict))))
+    return None
+
+
+def _numeric_cells(bounds, integer):
+    bounds = sorted(set(bounds))
+    if not bounds:
+        return [0]
+    cells = [bounds[0] - 1]
+    for a, b in zip(bounds, bounds[1:]):
+        cells.append(a)
+        if integer:
+            inside = int(a) + 1
+            if inside < b:
+                cells.append(inside)
+        else:
+            cells.append((a + b) / 2)
+    cells.append(bounds[-1])
+    cells.append(bounds[-1] + 1)
+    return cells
+
+
+def _cells(clause, spec, asts, assume_complete):
+    """Representative values of one input column"""
+    kind = (clause.type_ref or (spec or {}).get("type") or "").lower()
+    domain = _domain(clause, spec)
+    if domain is not None:
+        cells = domain
+    elif kind == "boolean":
+        cells = [True, False]
+    else:
+        literals = []
+        for ast in asts:
+            if ast is not None and ast != NEVER:
+                _literals(ast, literals)
+        numbers = [v for v in literals
+                   if isinstance(v, (int, float)) and not isinstance(v, bool)]
+        strings = list(dict.fromkeys(v for v in literals if isinstance(v, str)))
+        if kind in _NUMERIC_TYPES:
+            strings = []
+        cells = _numeric_cells(numbers, kind in _INTEGER_TYPES) \
+            if numbers or kind in _NUMERIC_TYPES else []
+        cells += strings
+        if kind not in _NUMERIC_TYPES:
+            cells.append(_OTHER)
+        if any(v is True or v is False for v in literals):
+            cells += [True, False]
+    if not assume_complete and None not in cells:
+        cells = list(cells) + [None]
+    return cells
+
+
+def _any_input_cells(asts):
+    """Representative values of whatever a column may receive, declared domains aside"""
+    literals = []
+    for ast in asts:
+        if ast is not None and ast != NEVER:
+            _literals(ast, literals)
+    numbers = [v for v in literals if isinstance(v, (int, float)) and not isinstance(v, bool)]
+    numeric = _numeric_cells(numbers, False)
+    cells = {}
+    for value in numeric + [str(n) for n in numeric] \
+            + [v for v in literals if isinstance(v, str)] + [True, False, _OTHER, None]:
+        cells.setdefault((type(value), value), value)
+    return list(cells.values())
+
+
+# ---------------------------------------------------------------------------
+# Boxes
+# ---------------------------------------------------------------------------
+
+def _covers(a, b):
+    """Box a contains box b"""
+    return all(y & ~x == 0 for x, y in zip(a, b))
+
+
+def _disjoint(a, b):
+    return any(x & y == 0 for x, y in zip(a, b))
+
+
+def _subtract(box, other):
+    """Pieces of box outside other (box itself when they are disjoint)"""
+    if _disjoint(box, other):
+        return [box]
+    pieces = []
+    head = list(box)
+    for i, (a, b) in enumerate(zip(box, other)):
+        rest = a & ~b
+        if rest:
+            pieces.append(tuple(head[:i]) + (rest,) + box[i + 1:])
+        head[i] = a & b
+    return pieces
+
+
+class _Rule:
+    __slots__ = ("rule", "box", "opaque", "dead", "any_box", "never")
+
+    def __init__(self, rule, box, opaque):
+        self.rule = rule
+        self.box = box
+        self.opaque = opaque
+        self.dead = False
+        # Box over _any_input_cells(), and whether no input at all matches
+        self.any_box = box
+        self.never = False
+
+
+def _label(rule):
+    return rule.id or f"#{rule.index + 1}"
+
+
+# ---------------------------------------------------------------------------
+# Analysis
+# ---------------------------------------------------------------------------
+
+def analyze_table(table, metadata=None, hits=None, assume_complete=False):
+    """Report on one CompiledTable (see the module docstring for the keys)"""
+    if table.hit_policy != "FIRST":
+        raise DmnError(f"hitPolicy {table.hit_policy}: only FIRST tables are analyzed")
+    source = table.source
+    input_asts, parsed_rules, _ = parse_table(source)
+    specs = input_specs(metadata)
+
+    columns = []
+    for col, (clause, ast) in enumerate(zip(source.inputs, input_asts)):
+        name = ast[1] if ast[0] == "name" else None
+        tests = [tests[col] if col < len(tests) else None for tests, _ in parsed_rules]
+        cells = _cells(clause, specs.get(name), tests, assume_complete) if name else []
+        columns.append((clause.expression, name is not None, cells))
+    variables = {ast[1] for ast in input_asts if ast[0] == "name"}
+    full = tuple((1 << len(cells)) - 1 if exact else 1 for _, exact, cells in columns)
+    any_cells = [_any_input_cells([tests[col] if col < len(tests) else None
+                                   for tests, _ in parsed_rules]) if exact else []
+                 for col, (_, exact, _) in enumerate(columns)]
+    any_full = tuple((1 << len(cells)) - 1 if cells else 1 for cells in any_cells)
+
+    report = {"table": source.id, "rules": len(table.rules), "unreachable": [],
+              "shadowed": [], "undecided": []}
+    rules = []
+    for rule in table.rules:
+        box = list(full)
+        opaque = False
+        reason = None
+        test_asts = parsed_rules[rule.index][0]
+        for col, pred in rule.tests:
+            ast = test_asts[col]
+            name, exact, cells = columns[col]
+            if ast == NEVER:
+                reason = f"{name}: entry does not compile"
+                box[col] = 0
+                continue
+            if not exact or not _exact(ast, variables):
+                opaque = True
+                continue
+            mask = 0
+            for bit, value in enumerate(cells):
+                if pred(value, {}):
+                    mask |= 1 << bit
+            box[col] = mask
+            if mask == 0 and reason is None:
+                reason = f"{name}: no value in {[c for c in cells if c != _OTHER]} passes"
+        entry = _Rule(rule, tuple(box), opaque)
+        if hits is not None:
+            entry.any_box, entry.never = _any_input_box(rule, test_asts, any_cells, any_full,
+                                                        variables)
+        rules.append(entry)
+        if reason is not None:
+            entry.dead = True
+            report["unreachable"].append({"rule": _label(rule), "index": rule.index,
+                                          "reason": reason})
+
+    for position, entry in enumerate(rules):
+        if entry.dead:
+            continue
+        earlier = [q for q in rules[:position] if not q.dead and not q.opaque]
+        single = next((q for q in earlier if _covers(q.box, entry.box)), None)
+        if single is not None:
+            entry.dead = True
+            report["shadowed"].append({"rule": _label(entry.rule), "index": entry.rule.index,
+                                       "by": [_label(single.rule)]})
+            continue
+        remaining = [entry.box]
+        used = []
+        for q in earlier:
+            pieces = []
+            for box in remaining:
+                pieces.extend(_subtract(box, q.box))
+            if pieces != remaining:
+                used.append(q)
+            remaining = pieces
+            if not remaining or len(remaining) > MAX_BOXES:
+                break
+        if not remaining:
+            entry.dead = True
+            report["shadowed"].append({"rule": _label(entry.rule), "index": entry.rule.index,
+                                       "by": [_label(q.rule) for q in used]})
+        elif len(remaining) > MAX_BOXES:
+            report["undecided"].append({"rule": _label(entry.rule), "index": entry.rule.index})
+
+    if hits is not None:
+        _propose(report, rules, hits)
+    return report
+
+
+def _any_input_box(rule, test_asts, any_cells, any_full, variables):
+    """(box over the cells of any input, True when no input matches the rule)"""
+    box = list(any_full)
+    for col, pred in rule.tests:
+        ast = test_asts[col]
+        if ast == NEVER:
+            return tuple(box), True
+        cells = any_cells[col]
+        if not cells or not _exact(ast, variables) or _orders_strings(ast):
+            continue
+        mask = 0
+        for bit, value in enumerate(cells):
+            if pred(value, {}):
+                mask |= 1 << bit
+        if mask == 0:
+            return tuple(box), True
+        box[col] = mask
+    return tuple(box), False
+
+
+def _propose(report, rules, hits):
+    """Add "order", "dropped" and "cost" from hit counts keyed by rule id, #n label or index"""
+    def count(entry):
+        rule = entry.rule
+        return hits.get(rule.id, 0) if rule.id in hits else \
+            hits.get(_label(rule), hits.get(rule.index, 0))
+
+    live = [entry for entry in rules if not entry.never]
+    counts = {entry.rule.index: count(entry) for entry in live}
+    # q must stay above r when q comes first today and some input matches both
+    above = {entry.rule.index: {q.rule.index for q in live[:i]
+                                if not _disjoint(q.any_box, entry.any_box)}
+             for i, entry in enumerate(live)}
+    order = []
+    placed = set()
+    pending = list(live)
+    while pending:
+        ready = [e for e in pending if above[e.rule.index] <= placed]
+        best = max(ready, key=lambda e: (counts[e.rule.index], -e.rule.index))
+        order.append(best)
+        placed.add(best.rule.index)
+        pending.remove(best)
+
+    total = sum(counts.values())
+    report["order"] = [_label(e.rule) for e in order]
+    report["indices"] = [e.rule.index for e in order]
+    report["dropped"] = [_label(e.rule) for e in rules if e.never]
+    report["cost"] = {"before": _mean_position(rules, counts, total),
+                      "after": _mean_position(order, counts, total), "hits": total}
+
+
+def _mean_position(sequence, counts, total):
+    """Mean number of rules visited per match (dead rules still cost a visit)"""
+    if not total:
+        return None
+    visited = sum(counts.get(e.rule.index, 0) * (i + 1) for i, e in enumerate(sequence))
+    return round(visited / total, 3)
+
+
+def reorder(table, indices):
+    """A copy of table whose rules run in the given order (rule.index values)"""
+    by_index = {rule.index: rule for rule in table.rules}
+    return CompiledTable(table.source, table._extractors, [by_index[i] for i in indices],
+                         table.errors)
+
+
+def analyze(corpus, names=None, hits=None, assume_complete=False, family=None):
+    """Yield (TableRef, report) for the FIRST tables of a corpus.
+
+    hits is {table key: {rule label: count}} as read_hits() returns.
+    """
+    refs = [corpus.resolve(name) for name in names] if names else list(corpus)
+    for ref in refs:
+        if family is not None and ref.family != family:
+            continue
+        table = corpus.get(ref.key)
+        if table.hit_policy != "FIRST":
+            continue
+        report = analyze_table(table, ref.load_metadata(),
+                               (hits or {}).get(ref.key) if hits is not None else None,
+                               assume_complete)
+        report["table"] = ref.key
+        yield ref, report
+
+
+def read_hits(path):
+    """{table key: {rule label: count}} from the dmn_rule_hits_total lines of a metrics file"""
+    hits = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            m = _HITS_LINE.match(line)
+            if m is None:
+                continue
+            labels = {k: v.replace('\\"', '"').replace("\\n", "\n").replace("\\\\", "\\")
+                      for k, v in _LABEL.findall(m.group(1))}
+            table, rule = labels.get("table"), labels.get("rule")
+            if table is None or rule is None:
+                continue
+            counts = hits.setdefault(table, {})
+            counts[rule] = counts.get(rule, 0) + int(float(m.group(2)))
+    return hits
@@ -0,0 +1,207 @@
+"""
+Applicability index: the tables a context has every required input for
+
+Each table reads a fixed set of variables (diagnosticoPrincipal,
+medicamentosAtivos, saturacaoO2...). Screening a chart update by evaluating
+every clinical alert wastes most evaluations on tables whose inputs the
+update does not carry: they fall into their default rule or decide on
+nulls. ApplicabilityIndex reads the variables of every table once and
+answers which tables can apply to a context, most urgent first:
+
+    index = ApplicabilityIndex(Corpus())
+    ctx = {"medicamentosAtivos": ["FENELZINA"], "medicamentoNovo": "FENTANIL", "idade": 70}
+    index.tables(ctx)
+    # -> the 24 of 287 tables that read nothing else, CRITICAL ones first
+    index.evaluate(ctx)
+    # -> [{"table": "DDI-SEROTONIN-002", "key": ..., "category": "DDI",
+    #      "priority": "CRITICAL", "rule": "rule_fentanil_imao", "outputs": {...}}]
+
+A table applies when every variable its input expressions read is present
+(not None) in the context, as in EwsMonitor. Inputs that metadata.json
+declares with "required": false are not needed. Tables with the same
+variables share one entry, filed under its least common variable, so a
+lookup only checks the sets whose rarest variable the context has.
+
+Priority is the first of priority, severity or severidade in the table's
+metadata.json ("CRITICA", "ALTA", "ALERTA"... are read as CRITICAL, HIGH,
+MEDIUM or LOW), else the avgImpact of its category in the family index file
+(CLINICAL_ALERTS_INDEX.json). Tables are ordered by priority, then
+in corpus order; tables without a priority come last.
+"""
+
+import json
+import unicodedata
+
+from .engine import parse_table
+from .ews import _names
+from .indexer import INDEX_FILES
+
+FAMILY = "Regras-Clinicas-Hospitais"
+
+PRIORITIES = ("CRITICAL", "HIGH", "MEDIUM", "LOW")
+
+# Metadata fields holding a table's priority, in order of preference
+PRIORITY_FIELDS = ("priority", "severity", "severidade")
+
+_LEVELS = {
+    "CRITICAL": "CRITICAL", "CRITICA": "CRITICAL", "CRITICO": "CRITICAL",
+    "IMEDIATA": "CRITICAL",
+    "HIGH": "HIGH", "ALTA": "HIGH", "ALTO": "HIGH", "ALERTA": "HIGH", "URGENTE": "HIGH",
+    "MEDIUM": "MEDIUM", "MEDIA": "MEDIUM", "MODERATE": "MEDIUM", "MODERADA": "MEDIUM",
+    "MODERADO": "MEDIUM", "ATENCAO": "MEDIUM",
+    "LOW": "LOW", "BAIXA": "LOW", "BAIXO": "LOW", "ROUTINE": "LOW", "ROTINA": "LOW",
+    "INFORMATIVO": "LOW", "INFORMATIVA": "LOW",
+}
+_RANK = {p: i for i, p in enumerate(PRIORITIES)}
+
+
+def priority_level(value):
+    """One of PRIORITIES for a metadata severity word, or None"""
+    if not isinstance(value, str):
+        return None
+    text = unicodedata.normalize("NFKD", value.strip().upper())
+    return _LEVELS.get("".join(ch for ch in text if not unicodedata.combining(ch)))
+
+
+def category_impacts(root):
+    """{(family, category): priority} from the avgImpact of the family index files"""
+    impacts = {}
+    for family, name in INDEX_FILES.items():
+        try:
+            with open(root / family / name, encoding="utf-8") as f:
+                categories = json.load(f).get("categories")
+        except (OSError, ValueError):
+            continue
+        if not isinstance(categories, dict):
+            continue
+        for category, info in categories.items():
+            level = priority_level(info.get("avgImpact")) if isinstance(info, dict) else None
+            if level is not None:
+                impacts[family, category] = level
+    return impacts
+
+
+def _optional_inputs(metadata):
+    """Input names metadata.json declares with "required": false"""
+    inputs = metadata.get("inputs") if isinstance(metadata, dict) else None
+    if isinstance(inputs, dict):
+        inputs = [dict(spec, name=name) if isinstance(spec, dict) else spec
+                  for name, spec in inputs.items()]
+    return {spec.get("name") for spec in inputs or ()
+            if isinstance(spec, dict) and spec.get("required") is False}
+
+
+class _Entry:
+    __slots__ = ("ref", "required", "category", "priority")
+
+    def __init__(self, ref, required, category, priority):
+        self.ref = ref
+        self.required = required
+        self.category = category
+        self.priority = priority
+
+
+class ApplicabilityIndex:
+    """Tables by the set of variables they need, ordered by priority"""
+
+    def __init__(self, corpus, family=FAMILY, groups=None):
+        """Index the tables of family (None: every family) in the given groups
+        (first directory names such as "DDI" or "EWS"; default: all)"""
+        self.corpus = corpus
+        impacts = category_impacts(corpus.root)
+        wanted = set(groups) if groups else None
+        entries = []
+        for ref in corpus:
+            category = ref.group.split("/", 1)[0]
+            if family is not None and ref.family != family:
+                continue
+            if wanted is not None and category not in wanted:
+                continue
+            input_asts, _, _ = parse_table(corpus.get(ref.key).source)
+            try:
+                metadata = corpus.metadata(ref.key)
+            except (OSError, ValueError):
+                metadata = None
+            optional = _optional_inputs(metadata)
+            required = frozenset(name for ast in input_asts
+                                 for name in _names(ast, set()) if name not in optional)
+            priority = None
+            if isinstance(metadata, dict):
+                for field in PRIORITY_FIELDS:
+                    priority = priority_level(metadata.get(field))
+                    if priority is not None:
+                        break
+            if priority is None:
+                priority = impacts.get((ref.family, category))
+            entries.append(_Entry(ref, required, category, priority))
+        # Stable sort: corpus order within a priority
+        entries.sort(key=lambda e: _RANK.get(e.priority, len(PRIORITIES)))
+        self._entries = entries
+        self._by_key = {entry.ref.key: entry for entry in entries}
+
+        sets = {}
+        for position, entry in enumerate(entries):
+            sets.setdefault(entry.required, []).append(position)
+        frequency = {}
+        for names in sets:
+            for name in names:
+                frequency[name] = frequency.get(name, 0) + 1
+        self._always = []
+        self._by_anchor = {}
+        for names, positions in sets.items():
+            if not names:
+                self._always = positions
+                continue
+            anchor = min(names, key=lambda n: (frequency[n], n))
+            self._by_anchor.setdefault(anchor, []).append((names, positions))
+        self._sets = sets
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def variable_sets(self):
+        """{sorted variable names: [table keys]} - the precomputed index"""
+        return {tuple(sorted(names)): [self._entries[p].ref.key for p in positions]
+                for names, positions in sorted(self._sets.items(), key=lambda i: sorted(i[0]))}
+
+    def _positions(self, ctx):
+        present = {name for name, value in ctx.items() if value is not None}
+        found = list(self._always)
+        for name in present:
+            for names, positions in self._by_anchor.get(name, ()):
+                if names <= present:
+                    found.extend(positions)
+        found.sort()
+        return found
+
+    def tables(self, ctx):
+        """TableRefs of the tables whose required inputs ctx has, most urgent first"""
+        return [self._entries[p].ref for p in self._positions(ctx)]
+
+    def priority(self, name):
+        """Priority of an indexed table (key or code), or None"""
+        entry = self._by_key.get(self.corpus.resolve(name).key)
+        return entry.priority if entry is not None else None
+
+    def evaluate(self, ctx):
+        """Evaluate the applicable tables; one dict per table a rule fired in.
+
+        Returns [{"table", "key", "category", "priority", "rule", "outputs"}]
+        in the order of tables(). As in DrugIndex.screen(), a table's
+        catch-all rule (no tests) is not reported.
+        """
+        results = []
+        for position in self._positions(ctx):
+            entry = self._entries[position]
+            rule = self.corpus.get(entry.ref.key).match(ctx)
+            if rule is not None and rule.tests:
+                results.append({
+                    "table": entry.ref.code,
+                    "key": entry.ref.key,
+                    "category": entry.category,
+                    "priority": entry.priority,
+                    "rule": rule.id,
+                    "outputs": rule.output(ctx),
+                })
+        return results
@@ -0,0 +1,473 @@
+"""
+Streaming claim auditor
+
+Reads guias (claims) from JSONL or CSV, routes each one by its TUSS code to
+Regras-Audit-Operadora/<especialidade>/<tuss>/regra.dmn.xml and writes one
+JSONL result per input line, in input order:
+
+    {"line": 1, "guia": "G-0001", "tuss": "20101201",
+     "table": "Regras-Audit-Operadora/cardiologia/20101201",
+     "rule": "Rule_Aprovado_CDI", "resultado": "Aprovado",
+     "observacao": "...", "fundamentacao": "..."}
+
+Claims are evaluated by a pool of worker processes. Input is read in chunks
+and at most `inflight` chunks are outstanding at any time - the reader blocks
+until the writer has emitted the oldest one - so memory stays constant no
+matter how large the file is, and throughput scales with the worker count.
+
+    python -m dmn_engine audit guias.jsonl -o resultados.jsonl --workers 8
+
+Each worker opens its own Corpus (or the --snapshot file, which makes worker
+start-up nearly free) and compiles tables as claims reach them. With
+--cache-size each worker also memoizes results (see cache.py), which pays off
+on the many claims that repeat the same inputs. --compose evaluates the
+documentation gate and universal contraindications as shared fragments (see
+shared.py); the result then carries "fragment" when one of them decided.
+--metrics writes the rule hit counters and timings of every worker, merged,
+as an OpenMetrics file (see metrics.py).
+
+--shadow evaluates every claim on a candidate corpus too (a directory or a
+snapshot, see shadow.py) and records the claims whose resultado or
+observacao would change; the results themselves are those of the live
+corpus:
+
+    python -m dmn_engine audit guias.jsonl -o resultados.jsonl \
+        --shadow /srv/dmn-next --divergences divergencias.jsonl
+    # {"line": 7, "guia": "G-0007", "tuss": "20101201", "table": "...",
+    #  "live": {"rule": ..., "resultado": "Aprovado", "observacao": ...},
+    #  "candidate": {"rule": ..., "resultado": "Pendente", "observacao": ...}}
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import queue
+import re
+import sys
+import threading
+import time
+import unicodedata
+
+from .cache import ResultCache
+from .corpus import Corpus
+from .errors import DmnError
+from .metrics import Metrics
+from .shadow import UNCHANGED, Shadow
+from .shared import SharedFragments
+
+FAMILY = "Regras-Audit-Operadora"
+
+# Claim fields tried, in order, for the TUSS code, specialty and claim number
+TUSS_FIELDS = ("tuss", "codigoTuss", "tussCode", "codigoProcedimento", "codigo")
+SPECIALTY_FIELDS = ("especialidade", "specialty")
+ID_FIELDS = ("guia", "numeroGuia", "id")
+
+# Output names used by the tables for the three standard audit outputs
+_RESULT_NAMES = {
+    "resultado": ("resultado", "Resultado", "decisao"),
+    "observacao": ("observacao", "Observação", "justificativa"),
+    "fundamentacao": ("fundamentacao", "Fundamentação", "referencia"),
+}
+
+# Outputs compared against the candidate corpus in shadow mode
+SHADOW_FIELDS = ("resultado", "observacao")
+
+_NON_DIGITS = re.compile(r"\D")
+
+
+def normalize_tuss(code):
+    """'2.01.01.20-1' style codes reduced to their 8 digits; other codes as given"""
+    text = str(code).strip()
+    digits = _NON_DIGITS.sub("", text)
+    return digits if len(digits) == 8 else text
+
+
+def _slug(text):
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def _first(record, fields):
+    for field in fields:
+        value = record.get(field)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+class Auditor:
+    """Routes a claim to its audit table and evaluates it"""
+
+    def __init__(self, corpus, tuss_fields=TUSS_FIELDS, specialty_fields=SPECIALTY_FIELDS,
+                 context_field=None, cache_size=0, compose=False, shadow=None):
+        if compose and shadow is not None:
+            raise DmnError("shadow mode cannot be combined with compose")
+        self.corpus = corpus
+        self.tuss_fields = tuss_fields
+        self.specialty_fields = specialty_fields
+        self.context_field = context_field
+        self.cache = ResultCache(corpus, cache_size) if cache_size else None
+        self.shared = SharedFragments(corpus) if compose else None
+        self.shadow = Shadow(corpus, shadow) if shadow is not None else None
+
+    def route(self, tuss, specialty=None):
+        """The TableRef for a TUSS code, using the specialty when the code repeats"""
+        refs = self.corpus.find(tuss, family=FAMILY)
+        if len(refs) > 1 and specialty:
+            slug = _slug(specialty)
+            refs = [r for r in refs if r.group == slug or r.group.startswith(slug + "/")]
+        if not refs:
+            raise DmnError(f"no audit table for TUSS {tuss}"
+                           + (f" in {specialty}" if specialty else ""))
+        if len(refs) > 1:
+            groups = ", ".join(r.group for r in refs)
+            raise DmnError(f"TUSS {tuss} exists in several specialties ({groups}); "
+                           f"set especialidade")
+        return refs[0]
+
+    def audit(self, record, line=None):
+        """Evaluate one claim dict; errors are reported in the result, not raised"""
+        result = {"line": line, "guia": _first(record, ID_FIELDS)}
+        code = _first(record, self.tuss_fields)
+        if code is None:
+            result["error"] = "claim has no TUSS code"
+            return result
+        tuss = result["tuss"] = normalize_tuss(code)
+        try:
+            ref = self.route(tuss, _first(record, self.specialty_fields))
+            result["table"] = ref.key
+            ctx = record.get(self.context_field, {}) if self.context_field else record
+            if self.shared is not None:
+                composed = self.shared.claim(ctx).match(ref.key)
+                if composed["source"] != ref.key:
+                    result["fragment"] = composed["source"]
+                rule_id, outputs = composed["rule"], composed["outputs"]
+            else:
+                if self.cache is not None:
+                    rule, outputs = self.cache.lookup(ref.key, ctx)
+                else:
+                    rule = self.corpus.get(ref.key).match(ctx)
+                    outputs = rule.output(ctx) if rule is not None else None
+                rule_id = rule.id if rule is not None else None
+        except DmnError as exc:
+            result["error"] = str(exc)
+            return result
+        result["rule"] = rule_id
+        outputs = outputs or {}
+        for field, names in _RESULT_NAMES.items():
+            result[field] = _first(outputs, names)
+        if self.shadow is not None:
+            self._compare(ref.key, ctx, result)
+        return result
+
+    def _compare(self, key, ctx, result):
+        """Add "shadow" to result when the candidate decides differently"""
+        try:
+            found = self.shadow.match(key, ctx)
+        except DmnError as exc:
+            result["shadow"] = {"error": str(exc)}
+            return
+        if found is UNCHANGED:
+            return
+        rule, outputs = found
+        outputs = outputs or {}
+        candidate = {field: _first(outputs, _RESULT_NAMES[field]) for field in SHADOW_FIELDS}
+        if any(candidate[field] != result[field] for field in SHADOW_FIELDS):
+            result["shadow"] = {"rule": rule.id if rule is not None else None, **candidate}
+
+
+def _parse_line(text):
+    record = json.loads(text)
+    if not isinstance(record, dict):
+        raise ValueError("line is not a JSON object")
+    return record
+
+
+def audit_chunk(auditor, chunk):
+    """Audit a list of (line, record) where record is a dict or a JSON line"""
+    results = []
+    for line, record in chunk:
+        if isinstance(record, str):
+            try:
+                record = _parse_line(record)
+            except ValueError as exc:
+                results.append({"line": line, "error": f"invalid JSON: {exc}"})
+                continue
+        results.append(auditor.audit(record, line))
+    return results
+
+
+def read_claims(stream, fmt="jsonl"):
+    """Yield (line number, record) from a JSONL or CSV stream.
+
+    JSONL lines are yielded unparsed so the JSON decoding also runs in the
+    workers; CSV rows are yielded as dicts keyed by the header.
+    """
+    if fmt == "csv":
+        # Numbered like the file lines: the header is line 1
+        yield from enumerate(csv.DictReader(stream), 2)
+        return
+    for number, text in enumerate(stream, 1):
+        if text.strip():
+            yield number, text
+
+
+def _chunks(items, size):
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# ---------------------------------------------------------------------------
+# Worker processes
+# ---------------------------------------------------------------------------
+
+def _open_corpus(root, snapshot, metrics=None):
+    if snapshot:
+        from .snapshot import Snapshot
+        corpus = Snapshot(snapshot)
+    else:
+        corpus = Corpus(root, families=(FAMILY,))
+    return metrics.attach(corpus) if metrics is not None else corpus
+
+
+def _open_candidate(path):
+    """The --shadow corpus: a snapshot file or a corpus root directory"""
+    if path is None:
+        return None
+    if os.path.isfile(path):
+        return _open_corpus(None, path)
+    if not os.path.isdir(path):
+        raise DmnError(f"shadow corpus {path} does not exist")
+    return _open_corpus(path, None)
+
+
+def _worker_main(tasks, results, root, snapshot, options, reports=None, metrics=False,
+                 shadow=None):
+    metrics = Metrics() if metrics else None
+    auditor = Auditor(_open_corpus(root, snapshot, metrics), shadow=_open_candidate(shadow),
+                      **options)
+    try:
+        _worker_loop(auditor, tasks, results)
+    finally:
+        if reports is not None:
+            reports.put((metrics.snapshot() if metrics is not None else None,
+                         auditor.shadow.stats() if auditor.shadow is not None else None))
+
+
+def _worker_loop(auditor, tasks, results):
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        seq, chunk = task
+        try:
+            results.put((seq, audit_chunk(auditor, chunk)))
+        except BaseException as exc:  # report instead of hanging the writer
+            results.put((seq, [{"line": line, "error": f"worker failed: {exc}"}
+                               for line, _ in chunk]))
+
+
+class _Stats:
+    def __init__(self, shadow=False):
+        self.claims = 0
+        self.errors = 0
+        self.divergent = 0 if shadow else None
+        self.shadow = {} if shadow else None
+        self.results = {}
+        self.started = time.perf_counter()
+
+    def add(self, result):
+        self.claims += 1
+        if "shadow" in result:
+            self.divergent += 1
+        if "error" in result:
+            self.errors += 1
+        else:
+            key = result.get("resultado")
+            self.results[key] = self.results.get(key, 0) + 1
+
+    def add_shadow(self, stats):
+        """Sum the Shadow.stats() of an auditor into the summary"""
+        for key, value in stats.items():
+            self.shadow[key] = self.shadow.get(key, 0) + value
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        summary = {
+            "claims": self.claims,
+            "errors": self.errors,
+            "resultados": self.results,
+            "seconds": round(elapsed, 3),
+            "claimsPerSecond": round(self.claims / elapsed, 1) if elapsed else None,
+        }
+        if self.divergent is not None:
+            summary["divergent"] = self.divergent
+            summary["shadow"] = dict(self.shadow, seconds=round(self.shadow.get("seconds", 0), 3))
+        return summary
+
+
+def _write(out, results, stats, divergences=None):
+    for result in results:
+        stats.add(result)
+        if divergences is not None and "shadow" in result:
+            candidate = result.pop("shadow")
+            divergence = {key: result.get(key) for key in ("line", "guia", "tuss", "table")}
+            divergence["live"] = {"rule": result.get("rule"),
+                                  **{field: result.get(field) for field in SHADOW_FIELDS}}
+            divergence["candidate"] = candidate
+            divergences.write(json.dumps(divergence, ensure_ascii=False))
+            divergences.write("\n")
+        out.write(json.dumps(result, ensure_ascii=False))
+        out.write("\n")
+
+
+def run_audit(stream, out, fmt="jsonl", workers=None, chunk_size=256, inflight=None,
+              root=None, snapshot=None, metrics=None, shadow=None, divergences=None,
+              **options):
+    """Audit every claim in stream and write JSONL results to out.
+
+    workers=0 audits in the calling process. Otherwise a pool of worker
+    processes is used and at most `inflight` chunks (default 4 per worker)
+    are read ahead of the writer. When metrics is a Metrics registry, the
+    counters of every worker are merged into it. shadow is the path of a
+    candidate corpus (directory or snapshot); the claims it decides
+    differently are written to the divergences stream, or keep a "shadow"
+    field when there is none; the summary then has "divergent" and "shadow",
+    the Shadow.stats() of every worker summed (the candidate's evaluation
+    time in "seconds"). Returns the summary dict.
+    """
+    if shadow is not None:
+        if options.get("compose"):
+            raise DmnError("shadow mode cannot be combined with compose")
+        if not os.path.exists(shadow):
+            raise DmnError(f"shadow corpus {shadow} does not exist")
+    stats = _Stats(shadow is not None)
+    chunks = _chunks(read_claims(stream, fmt), chunk_size)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 0:
+        auditor = Auditor(_open_corpus(root, snapshot, metrics),
+                          shadow=_open_candidate(shadow), **options)
+        for chunk in chunks:
+            _write(out, audit_chunk(auditor, chunk), stats, divergences)
+        if auditor.shadow is not None:
+            stats.add_shadow(auditor.shadow.stats())
+        return stats.summary()
+
+    inflight = inflight or 4 * workers
+    ctx = multiprocessing.get_context()
+    tasks = ctx.Queue()
+    results = ctx.Queue(maxsize=inflight)
+    slots = threading.BoundedSemaphore(inflight)
+    # Each worker reports its metrics and shadow stats here when it exits
+    reports = ctx.Queue() if metrics is not None or shadow is not None else None
+    procs = [
+        ctx.Process(target=_worker_main,
+                    args=(tasks, results, root, snapshot, options, reports,
+                          metrics is not None, shadow),
+                    daemon=True)
+        for _ in range(workers)
+    ]
+    for p in procs:
+        p.start()
+
+    state = {"sent": None, "error": None}
+
+    def writer():
+        # Re-order chunks by sequence number; the buffer never exceeds `inflight`
+        pending = {}
+        expected = 0
+        try:
+            while state["sent"] is None or expected < state["sent"]:
+                try:
+                    seq, chunk_results = results.get(timeout=0.5)
+                except queue.Empty:
+                    if not any(p.is_alive() for p in procs):
+                        raise DmnError("audit workers exited unexpectedly")
+                    continue
+                pending[seq] = chunk_results
+                while expected in pending:
+                    _write(out, pending.pop(expected), stats, divergences)
+                    expected += 1
+                    slots.release()
+        except BaseException as exc:
+            state["error"] = exc
+            # Unblock the reader so it can notice the failure
+            for _ in range(inflight):
+                try:
+                    slots.release()
+                except ValueError:
+                    break
+
+    thread = threading.Thread(target=writer, name="audit-writer", daemon=True)
+    thread.start()
+    seq = 0
+    try:
+        for chunk in chunks:
+            slots.acquire()
+            if state["error"] is not None:
+                break
+            tasks.put((seq, chunk))
+            seq += 1
+    finally:
+        state["sent"] = seq
+        for _ in procs:
+            tasks.put(None)
+        thread.join()
+        if reports is not None:
+            # Drain before joining: a worker cannot exit with data still queued
+            for _ in procs:
+                try:
+                    counters, shadow_stats = reports.get(timeout=5)
+                except queue.Empty:
+                    break
+                if counters is not None:
+                    metrics.merge(counters)
+                if shadow_stats is not None:
+                    stats.add_shadow(shadow_stats)
+        for p in procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+    if state["error"] is not None:
+        raise state["error"]
+    return stats.summary()
+
+
+def main_audit(args):
+    """Entry point of `python -m dmn_engine audit`"""
+    fmt = args.format
+    if fmt is None:
+        fmt = "csv" if args.input.lower().endswith(".csv") else "jsonl"
+    options = {"context_field": args.context_field, "cache_size": args.cache_size,
+               "compose": args.compose}
+    if args.tuss_field:
+        options["tuss_fields"] = (args.tuss_field,)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8", newline="")
+    target = sys.stdout if args.output in (None, "-") else open(args.output, "w", encoding="utf-8")
+    metrics = Metrics() if args.metrics else None
+    divergences = open(args.divergences, "w", encoding="utf-8") if args.divergences else None
+    try:
+        summary = run_audit(source, target, fmt=fmt, workers=args.workers,
+                            chunk_size=args.chunk_size, root=args.root,
+                            snapshot=args.snapshot, metrics=metrics, shadow=args.shadow,
+                            divergences=divergences, **options)
+        if metrics is not None:
+            metrics.write(args.metrics)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+        if divergences is not None:
+            divergences.close()
+    print(json.dumps(summary, ensure_ascii=False), file=sys.stderr)
+    return 0
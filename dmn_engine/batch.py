@@ -0,0 +1,308 @@
+"""
+Vectorized batch evaluation over columnar data (requires numpy)
+
+CompiledTable.evaluate() scores one reading at a time. For telemetry feeds -
+every EWS table (NEWS2, MEWS, PEWS, qSOFA) over a whole ward's vital signs -
+compile_batch() turns the same table into NumPy mask operations instead:
+
+    from dmn_engine.batch import compile_batch
+    batch = compile_batch(corpus.get("EWS-NEWS-002"))
+    result = batch.evaluate({
+        "frequenciaRespiratoria": np.array([18, 26, 7]),
+        "saturacaoO2": np.array([97, 90, 95]),
+        ...
+    })
+    result["nivelAlerta"]   # array(['OK', 'Alerta', 'Alerta'], dtype=object)
+    result["rule"]          # index of the rule that fired per row, -1 if none
+
+Each rule becomes the AND of its column masks, and FIRST is applied by
+clearing the rows already claimed by an earlier rule. Numeric comparisons,
+ranges and literal equality run as array operations; any other entry falls
+back to the scalar predicate for that column only, so results always match
+CompiledTable.evaluate(). Missing values (None, or NaN in a numeric column)
+behave like FEEL null: they fail every comparison.
+
+numpy is an optional dependency: the rest of dmn_engine does not need it and
+importing this module without it raises DmnError on use.
+"""
+
+import operator
+from functools import reduce
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .engine import MULTI_HIT_POLICIES, NEVER, _coercer, parse_table
+from .errors import DmnError
+from .feel import to_number
+
+_NUMERIC_TYPES = ("number", "integer", "long", "double")
+_CMP = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+
+def _require_numpy():
+    if np is None:
+        raise DmnError("batch evaluation requires numpy (pip install numpy)")
+
+
+def _is_number(x):
+    return isinstance(x, (int, float)) and type(x) is not bool
+
+
+def _to_float(value):
+    n = to_number(value)
+    return float("nan") if n is None else n
+
+
+class _Column:
+    """One input column in the representation its tests need"""
+
+    def __init__(self, values, type_ref, n):
+        self.n = n
+        self.numeric = (type_ref or "").lower() in _NUMERIC_TYPES
+        if values is None:
+            self.raw = np.full(n, None, dtype=object)
+            self.num = np.full(n, np.nan) if self.numeric else None
+            return
+        arr = np.asarray(values) if hasattr(values, "__array__") else None
+        if self.numeric:
+            if arr is not None and arr.dtype.kind in "iuf":
+                self.num = arr.astype(float, copy=False)
+            else:
+                self.num = np.fromiter((_to_float(v) for v in values), float, count=n)
+            self.raw = None
+        else:
+            self.num = None
+            if arr is not None and arr.dtype.kind == "b":
+                self.raw = arr
+            else:
+                coerce = _coercer(type_ref)
+                seq = _pylist(values)
+                if coerce is not None:
+                    seq = [coerce(v) for v in seq]
+                self.raw = np.empty(n, dtype=object)
+                self.raw[:] = seq
+
+    def objects(self):
+        """Scalar values as the row-at-a-time engine would see them"""
+        if self.num is not None:
+            return [None if x != x else x for x in self.num.tolist()]
+        return self.raw.tolist()
+
+
+class BatchTable:
+    """A CompiledTable whose unary tests are evaluated as NumPy masks"""
+
+    def __init__(self, table):
+        _require_numpy()
+        if table.hit_policy in MULTI_HIT_POLICIES:
+            raise DmnError(f"batch evaluation supports single-hit tables, not {table.hit_policy}")
+        self.table = table
+        self.rule_ids = [rule.id for rule in table.rules]
+        input_asts, parsed_rules, _ = parse_table(table.source)
+        self._inputs = [
+            (ast[1] if ast[0] == "name" else None, clause.type_ref)
+            for ast, clause in zip(input_asts, table.source.inputs)
+        ]
+        self._rules = []
+        for rule, (test_asts, _) in zip(table.rules, parsed_rules):
+            preds = dict(rule.tests)
+            tests = [(col, ast, preds[col]) for col, ast in enumerate(test_asts)
+                     if ast is not None and col in preds]
+            self._rules.append((rule, tests))
+
+    def _columns(self, batch, contexts):
+        columns = []
+        n = None
+        for (name, _), extract in zip(self._inputs, self.table._extractors):
+            if name is None:
+                # Computed input expression: evaluate it row by row
+                values = [extract(ctx) for ctx in contexts()]
+            else:
+                values = _lookup(batch, name)
+            if values is not None:
+                size = len(values)
+                if n is None:
+                    n = size
+                elif size != n:
+                    raise DmnError(f"column {name!r} has {size} rows, expected {n}")
+            columns.append(values)
+        if n is None:
+            n = _batch_length(batch)
+        return n, [_Column(v, t, n) for v, (_, t) in zip(columns, self._inputs)]
+
+    def _row_contexts(self, batch):
+        names = _names(batch)
+        cols = [_pylist(_lookup(batch, name)) for name in names]
+        if not cols:
+            return [{} for _ in range(_batch_length(batch))]
+        return [dict(zip(names, row)) for row in zip(*cols)]
+
+    def evaluate(self, batch):
+        """Evaluate every row of a columnar batch.
+
+        batch maps input names to equal-length sequences (dict of lists or
+        NumPy arrays, a pandas DataFrame, a structured array). Returns a dict
+        with "rule" (index of the rule that fired, -1 when none did) and one
+        array per output; numeric outputs are float arrays, others object
+        arrays with None for unmatched rows.
+        """
+        state = {"ctx": None}
+
+        def contexts():
+            if state["ctx"] is None:
+                state["ctx"] = self._row_contexts(batch)
+            return state["ctx"]
+
+        n, columns = self._columns(batch, contexts)
+
+        hit = np.full(n, -1, dtype=np.int64)
+        open_rows = np.ones(n, dtype=bool)
+        for index, (rule, tests) in enumerate(self._rules):
+            mask = open_rows.copy()
+            for col, ast, pred in tests:
+                if not mask.any():
+                    break
+                mask &= _test_mask(ast, pred, columns[col], contexts)
+            if mask.any():
+                hit[mask] = index
+                open_rows &= ~mask
+                if not open_rows.any():
+                    break
+
+        result = {"rule": hit}
+        for name in self.table.output_names:
+            result[name] = self._output(name, hit, contexts)
+        return result
+
+    def _output(self, name, hit, contexts):
+        values = []
+        dynamic = []
+        for index, (rule, _) in enumerate(self._rules):
+            constant = rule._constant
+            if constant is None:
+                dynamic.append(index)
+                values.append(None)
+            else:
+                values.append(constant.get(name))
+        values.append(None)  # hit == -1 picks this slot
+        if not dynamic and all(_is_number(v) for v in values[:-1]) and values[:-1]:
+            table = np.array(values[:-1] + [np.nan], dtype=float)
+            return table[hit]
+        table = np.empty(len(values), dtype=object)
+        table[:] = values
+        out = table[hit]
+        for index in dynamic:
+            rows = np.nonzero(hit == index)[0]
+            if len(rows):
+                rule = self._rules[index][0]
+                ctxs = contexts()
+                for i in rows.tolist():
+                    out[i] = rule.output(ctxs[i])[name]
+        return out
+
+
+def _lookup(batch, name):
+    try:
+        return batch[name]
+    except (KeyError, ValueError, IndexError):
+        return None
+
+
+def _names(batch):
+    if hasattr(batch, "keys"):
+        return list(batch.keys())
+    return list(batch.dtype.names or ())
+
+
+def _batch_length(batch):
+    if hasattr(batch, "keys"):
+        for key in batch.keys():
+            return len(batch[key])
+        return 0
+    return len(batch)
+
+
+def _pylist(values):
+    """Plain Python objects (not NumPy scalars), as the scalar predicates expect"""
+    return values.tolist() if hasattr(values, "tolist") else list(values)
+
+
+def _test_mask(ast, pred, column, contexts):
+    if ast == NEVER:
+        return np.zeros(column.n, dtype=bool)
+    kind, positives = ast
+    masks = [_positive_mask(p, column) for p in positives]
+    if any(m is None for m in masks):
+        return _scalar_mask(pred, column, contexts)
+    mask = reduce(operator.or_, masks)
+    return ~mask if kind == "not" else mask
+
+
+def _positive_mask(p, column):
+    """Vectorized mask for one positive test, or None when it needs the scalar path"""
+    tag = p[0]
+    if tag == "any_of":
+        masks = [_positive_mask(q, column) for q in p[1]]
+        return None if any(m is None for m in masks) else reduce(operator.or_, masks)
+    if tag == "all_of":
+        masks = [_positive_mask(q, column) for q in p[1]]
+        return None if any(m is None for m in masks) else reduce(operator.and_, masks)
+    if tag == "negate":
+        masks = [_positive_mask(q, column) for q in p[1]]
+        return None if any(m is None for m in masks) else ~reduce(operator.or_, masks)
+    if tag == "cmp" and p[2][0] == "lit" and _is_number(p[2][1]) and p[1] in _CMP:
+        if column.num is None:
+            return None
+        with np.errstate(invalid="ignore"):
+            return _CMP[p[1]](column.num, p[2][1])
+    if tag == "range" and p[2][0] == "lit" and p[3][0] == "lit" \
+            and _is_number(p[2][1]) and _is_number(p[3][1]):
+        if column.num is None:
+            return None
+        _, lo_closed, lo, hi, hi_closed = p
+        x = column.num
+        with np.errstate(invalid="ignore"):
+            low = x >= lo[1] if lo_closed else x > lo[1]
+            high = x <= hi[1] if hi_closed else x < hi[1]
+        return low & high
+    if tag == "eq" and p[1][0] == "lit":
+        return _equality_mask(p[1][1], column)
+    return None
+
+
+def _equality_mask(lit, column):
+    if column.num is not None:
+        if _is_number(lit):
+            return column.num == lit
+        if lit is None:
+            return np.isnan(column.num)
+        return np.zeros(column.n, dtype=bool)
+    raw = column.raw
+    if raw.dtype.kind == "b":
+        if lit is True or lit is False:
+            return raw == lit
+        return np.zeros(column.n, dtype=bool)
+    if lit is None or lit is True or lit is False:
+        return np.fromiter((v is lit for v in raw), bool, count=column.n)
+    if type(lit) is str:
+        return np.asarray(raw == lit, dtype=bool)
+    return np.fromiter((to_number(v) == lit for v in raw), bool, count=column.n)
+
+
+def _scalar_mask(pred, column, contexts):
+    values = column.objects()
+    ctxs = contexts()
+    return np.fromiter((pred(v, c) is True for v, c in zip(values, ctxs)), bool, count=column.n)
+
+
+def compile_batch(table):
+    """Build a BatchTable from a CompiledTable"""
+    return BatchTable(table)
+
+
+def evaluate_batch(table, batch):
+    """One-off vectorized evaluation of a CompiledTable over a columnar batch"""
+    return BatchTable(table).evaluate(batch)
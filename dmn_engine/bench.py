@@ -0,0 +1,297 @@
+"""
+Reproducible benchmark of the corpus: parse, compile and evaluation latency
+
+run_benchmark() loads every table of a Corpus (or Snapshot) in corpus order,
+timing the parse (XML and FEEL parsing, or unmarshal from a snapshot) and the
+compile of each, then evaluates synthesized contexts against every table and
+reports the latency distribution per group:
+
+    report = run_benchmark(Corpus(), samples=200, seed=0)
+    report["groups"]["Regras-Clinicas-Hospitais/EWS"]
+    # {"tables": 25, "rules": 131, "errors": 0,
+    #  "parse": {"totalMs": 17.8, "meanMs": 0.71, "maxMs": 1.09},
+    #  "compile": {...},
+    #  "evaluate": {"count": 5000, "p50Us": 1.72, "p99Us": 3.5, "meanUs": 1.76,
+    #               "maxUs": 3.98, "matched": 1.0}}
+
+    python -m dmn_engine bench -o bench.json
+    python -m dmn_engine bench --compare bench.json     # exit 1 on a regression
+
+Groups are the family plus the first directory below it: the specialties of
+Regras-Audit-Operadora and Regras-Clinicas-Operadora, the categories of
+Regras-Adm-Hospitais (AUTH, BILL, DENY...) and the families of
+Regras-Clinicas-Hospitais (DDI, EWS, LAB, SYN, RSK, VIT...). "families" and
+"total" aggregate the same measurements.
+
+Fixtures come from each table's metadata.json inputs: the allowedValues of
+an input when it declares them, plus the representative values of the
+column the analyzer uses (inputValues, True/False for booleans, numeric
+boundaries and the string literals the tests mention), which also covers
+the tables that have no metadata.json. Each context draws one value per
+input from a random.Random seeded with the seed and the decision id, so the
+same seed gives the same contexts on every run and machine, and adding a
+table does not change the contexts of the others. "matched" is the share of
+contexts some rule fired for.
+
+Evaluation times are per context: perf_counter_ns around evaluate(), the
+fastest of `repeat` runs after one untimed pass, with the garbage collector
+disabled as timeit does. Contexts that raise are counted in "errors" and
+not timed. Compiled predicates are shared between tables (see engine.py),
+so compile times are those of loading the selected tables in one fresh
+process, which is what a worker does at boot.
+"""
+
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .analyzer import _OTHER, _cells, input_specs
+from .engine import compile_table, parse_table
+
+OTHER_VALUE = "outro"
+
+# Metrics compared by compare(): (section, key)
+_COMPARED = (
+    ("parse", "totalMs"),
+    ("compile", "totalMs"),
+    ("evaluate", "p50Us"),
+    ("evaluate", "p99Us"),
+)
+
+
+def _key(value):
+    return type(value), value
+
+
+def input_values(table, metadata=None):
+    """{input name: [candidate values]} for the fixtures of a CompiledTable"""
+    input_asts, parsed_rules, _ = parse_table(table.source)
+    specs = input_specs(metadata)
+    columns = {}
+    for col, (clause, ast) in enumerate(zip(table.source.inputs, input_asts)):
+        if ast[0] != "name":
+            continue
+        name = ast[1]
+        spec = specs.get(name)
+        tests = [tests[col] if col < len(tests) else None for tests, _ in parsed_rules]
+        values = columns.setdefault(name, {})
+        for value in (spec or {}).get("allowedValues") or ():
+            if not isinstance(value, (list, dict)):
+                values.setdefault(_key(value), value)
+        for value in _cells(clause, spec, tests, assume_complete=True):
+            value = OTHER_VALUE if value == _OTHER else value
+            values.setdefault(_key(value), value)
+    return {name: list(values.values()) for name, values in columns.items()}
+
+
+def fixtures(table, metadata=None, count=100, seed=0):
+    """count contexts for a CompiledTable, the same for the same seed"""
+    rng = random.Random(f"{seed}:{table.id}")
+    columns = sorted(input_values(table, metadata).items())
+    return [{name: rng.choice(values) for name, values in columns if values}
+            for _ in range(count)]
+
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of a sorted list"""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(p / 100.0 * len(ordered)) - 1)]
+
+
+class _Group:
+    def __init__(self):
+        self.tables = 0
+        self.rules = 0
+        self.errors = 0
+        self.parse = []
+        self.compile = []
+        self.evaluate = []
+        self.matched = 0
+
+    def add(self, other):
+        self.tables += other.tables
+        self.rules += other.rules
+        self.errors += other.errors
+        self.parse += other.parse
+        self.compile += other.compile
+        self.evaluate += other.evaluate
+        self.matched += other.matched
+
+    def report(self):
+        def phase(times):
+            total = sum(times)
+            return {"totalMs": round(total * 1e3, 3),
+                    "meanMs": round(total * 1e3 / len(times), 4) if times else None,
+                    "maxMs": round(max(times) * 1e3, 4) if times else None}
+
+        ordered = sorted(self.evaluate)
+        count = len(ordered)
+
+        def us(ns):
+            return round(ns / 1e3, 3) if ns is not None else None
+
+        return {
+            "tables": self.tables,
+            "rules": self.rules,
+            "errors": self.errors,
+            "parse": phase(self.parse),
+            "compile": phase(self.compile),
+            "evaluate": {
+                "count": count,
+                "p50Us": us(percentile(ordered, 50)),
+                "p99Us": us(percentile(ordered, 99)),
+                "meanUs": us(sum(ordered) / count) if count else None,
+                "maxUs": us(ordered[-1]) if count else None,
+                "matched": round(self.matched / count, 4) if count else None,
+            },
+        }
+
+
+def _time_evaluations(table, contexts, repeat=3, clock=time.perf_counter_ns):
+    """(per-context ns, contexts matched, errors) for one table"""
+    evaluate = table.evaluate
+    matched = 0
+    errors = 0
+    valid = []
+    for ctx in contexts:
+        try:
+            if evaluate(ctx):
+                matched += 1
+        except Exception:
+            errors += 1
+            continue
+        valid.append(ctx)
+    best = [None] * len(valid)
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            for i, ctx in enumerate(valid):
+                started = clock()
+                evaluate(ctx)
+                elapsed = clock() - started
+                if best[i] is None or elapsed < best[i]:
+                    best[i] = elapsed
+    finally:
+        if enabled:
+            gc.enable()
+    return best, matched, errors
+
+
+def run_benchmark(corpus, samples=200, seed=0, family=None, groups=None, repeat=3,
+                  progress=None):
+    """Benchmark the tables of a corpus; returns the JSON-ready report.
+
+    family keeps one family; groups keeps the groups named "family/first
+    directory" or by their first directory alone (e.g. ["EWS", "BILL"]).
+    Each context is timed repeat times and its fastest run kept.
+    progress, if given, is called with each TableRef before it is loaded.
+    """
+    refs = [ref for ref in corpus if family is None or ref.family == family]
+    if groups:
+        wanted = set(groups)
+        refs = [ref for ref in refs if ref.group.split("/", 1)[0] in wanted
+                or f"{ref.family}/{ref.group.split('/', 1)[0]}" in wanted]
+
+    by_group = {}
+    failures = []
+    started = time.perf_counter()
+    gc.collect()
+    for ref in refs:
+        if progress is not None:
+            progress(ref)
+        name = f"{ref.family}/{ref.group.split('/', 1)[0]}" if ref.group else ref.family
+        group = by_group.setdefault(name, _Group())
+        try:
+            t0 = time.perf_counter()
+            table, parsed = corpus._load(ref)
+            t1 = time.perf_counter()
+            compiled = compile_table(table, parsed)
+            t2 = time.perf_counter()
+        except Exception as exc:
+            group.errors += 1
+            failures.append({"table": ref.key, "error": f"{type(exc).__name__}: {exc}"})
+            continue
+        group.tables += 1
+        group.rules += len(compiled.rules)
+        group.parse.append(t1 - t0)
+        group.compile.append(t2 - t1)
+        contexts = fixtures(compiled, corpus.metadata(ref.key), samples, seed)
+        times, matched, errors = _time_evaluations(compiled, contexts, repeat)
+        group.evaluate += times
+        group.matched += matched
+        group.errors += errors
+
+    families = {}
+    total = _Group()
+    for name, group in by_group.items():
+        families.setdefault(name.split("/", 1)[0], _Group()).add(group)
+        total.add(group)
+    return {
+        "python": platform.python_version(),
+        "implementation": sys.implementation.name,
+        "platform": platform.platform(),
+        "root": str(corpus.root),
+        "samples": samples,
+        "seed": seed,
+        "repeat": repeat,
+        "elapsedSeconds": round(time.perf_counter() - started, 2),
+        "total": total.report(),
+        "families": {name: g.report() for name, g in sorted(families.items())},
+        "groups": {name: g.report() for name, g in sorted(by_group.items())},
+        "failures": failures,
+    }
+
+
+def write_report(path, report):
+    """Write a report as JSON to path atomically"""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp",
+                               dir=path.parent if str(path.parent) else ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def compare(baseline, report, tolerance=0.25, floor_us=1.0, floor_ms=10.0):
+    """Metrics of report more than tolerance above baseline, per group.
+
+    Returns [{"group", "metric", "before", "after", "change"}]. Changes
+    smaller than floor_us (evaluation percentiles) or floor_ms (parse and
+    compile totals) are timer noise and ignored. Groups missing from either
+    report are skipped.
+    """
+    regressions = []
+    sections = [("total", baseline.get("total"), report.get("total"))]
+    for kind in ("families", "groups"):
+        for name, after in report.get(kind, {}).items():
+            sections.append((name, baseline.get(kind, {}).get(name), after))
+    for name, before, after in sections:
+        if not before or not after:
+            continue
+        for section, key in _COMPARED:
+            old = before.get(section, {}).get(key)
+            new = after.get(section, {}).get(key)
+            if not old or new is None:
+                continue
+            if new - old < (floor_us if key.endswith("Us") else floor_ms):
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append({"group": name, "metric": f"{section}.{key}",
+                                    "before": old, "after": new,
+                                    "change": round(new / old - 1, 3)})
+    return regressions
@@ -0,0 +1,255 @@
+"""
+Memoized table evaluation
+
+Most audit calls repeat: the same TUSS code with the same handful of string
+and boolean inputs across thousands of routine exams. ResultCache sits in
+front of Corpus.get(...).match() and remembers the result per
+
+    (content hash of the table, values of every context name it reads)
+
+    cache = ResultCache(Corpus(), maxsize=65536)
+    cache.evaluate("40301630", {"indicacaoClinica": "Rastreamento", ...})
+    cache.stats()   # {"hits": ..., "misses": ..., "hitRate": ...}
+
+The key covers every name that the input expressions, the tests and the
+output expressions read, not just the declared inputs. A rule that tests
+`starts with(diagnosticoPrincipal, "C")` on another column, or that computes
+its observacao from the context, therefore still gets a correct key. Values
+keep their type: True, 1 and "true" are different keys.
+
+The content hash is the sha1 of regra.dmn.xml and metadata.json. At most once
+per check_interval seconds a table's files are stat()ed. When they changed,
+they are hashed again. A new hash reloads the table and drops its cached
+results. With a Snapshot the recorded hash is used and nothing is watched,
+because the snapshot file does not change under it.
+
+Entries are evicted least recently used first. A hit costs about as much as
+evaluating a median table, so the cache pays off on the tables with
+function tests, long rule lists or computed outputs; those take 10-50 us to
+evaluate. A cache is not thread-safe; give each worker its own.
+"""
+
+import hashlib
+import os
+import time
+from collections import OrderedDict
+
+from .engine import MULTI_HIT_POLICIES, parse_table
+from .snapshot import Snapshot
+
+# Key placeholder for a name absent from the context (bare-word tests read
+# ctx.get(name, name), so absent and None must not share a key)
+_MISSING = object()
+_TRUE, _FALSE = (bool, True), (bool, False)
+
+# Values hashable as they are; their types go in the key so True, 1 and 1.0 differ
+_SCALARS = frozenset({str, type(None), bool, int, float, object})
+
+
+def _names(node, found):
+    """Collect every ("name", x) referenced by a parsed FEEL structure"""
+    if isinstance(node, tuple):
+        if len(node) == 2 and node[0] == "name" and isinstance(node[1], str):
+            found.add(node[1])
+            return
+        for child in node:
+            if isinstance(child, (tuple, list)):
+                _names(child, found)
+    elif isinstance(node, list):
+        for child in node:
+            _names(child, found)
+
+
+def _freeze(value):
+    """Hashable, type-preserving form of a context value (TypeError if none)"""
+    t = type(value)
+    if t is str or value is None or value is _MISSING:
+        return value
+    if t is bool:
+        return _TRUE if value else _FALSE
+    if t is int or t is float:
+        return t, value
+    if t is list or t is tuple:
+        return t, tuple(_freeze(v) for v in value)
+    if t is set or t is frozenset:
+        return t, frozenset(_freeze(v) for v in value)
+    if t is dict:
+        return t, frozenset((k, _freeze(v)) for k, v in value.items())
+    raise TypeError(f"cannot cache a {t.__name__} input")
+
+
+def _stamp(path):
+    if path is None:
+        return None
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+
+def _content_hash(ref):
+    h = hashlib.sha1()
+    for path in (ref.path, ref.metadata_path):
+        h.update(b"\0")
+        if path is not None:
+            try:
+                with open(path, "rb") as f:
+                    h.update(f.read())
+            except FileNotFoundError:
+                pass
+    return h.hexdigest()
+
+
+def _copy(result):
+    if isinstance(result, list):
+        return [dict(r) for r in result]
+    return dict(result) if result is not None else None
+
+
+class _TableState:
+    __slots__ = ("ref", "table", "names", "version", "stamp", "checked")
+
+    def __init__(self, ref):
+        self.ref = ref
+        self.table = self.names = self.version = self.stamp = None
+        self.checked = 0.0
+
+
+class ResultCache:
+    """LRU cache of table results keyed by content hash and input values"""
+
+    def __init__(self, corpus, maxsize=65536, check_interval=1.0):
+        self.corpus = corpus
+        self.maxsize = maxsize
+        self.check_interval = None if isinstance(corpus, Snapshot) else check_interval
+        self._entries = OrderedDict()
+        self._tables = {}
+        self._named = {}
+        self.hits = self.misses = self.evictions = self.invalidations = self.uncacheable = 0
+
+    def _state(self, name, group, family):
+        named = name if group is None and family is None else (name, group, family)
+        state = self._named.get(named)
+        if state is None:
+            ref = self.corpus.resolve(name, group, family)
+            state = self._tables.get(ref.key)
+            if state is None:
+                state = self._tables[ref.key] = _TableState(ref)
+                self._load(state)
+            self._named[named] = state
+        elif self.check_interval is not None:
+            now = time.monotonic()
+            if now - state.checked >= self.check_interval:
+                state.checked = now
+                self._check(state)
+        return state
+
+    def _load(self, state):
+        ref = state.ref
+        if self.check_interval is None:
+            state.version = self.corpus.content_hash(ref.key) \
+                if isinstance(self.corpus, Snapshot) else _content_hash(ref)
+        else:
+            state.stamp = (_stamp(ref.path), _stamp(ref.metadata_path))
+            state.version = _content_hash(ref)
+            state.checked = time.monotonic()
+        state.table = self.corpus.get(ref.key)
+        input_asts, rules, _ = parse_table(state.table.source)
+        found = set()
+        _names(input_asts, found)
+        _names(rules, found)
+        state.names = tuple(sorted(found))
+
+    def _check(self, state):
+        ref = state.ref
+        stamp = (_stamp(ref.path), _stamp(ref.metadata_path))
+        if stamp == state.stamp:
+            return
+        old = state.version
+        if _content_hash(ref) == old:
+            state.stamp = stamp
+            return
+        self.invalidations += 1
+        self.corpus.reload(ref.key)
+        self._load(state)
+        for key in [k for k in self._entries if k[0] == old]:
+            del self._entries[key]
+
+    def _result(self, name, ctx, group, family):
+        """(rule, outputs) for ctx; rule is None for multi-hit tables"""
+        state = self._state(name, group, family)
+        table = state.table
+        get = ctx.get
+        values = [get(n, _MISSING) for n in state.names]
+        types = tuple(map(type, values))
+        try:
+            if _SCALARS.issuperset(types):
+                key = (state.version, tuple(values), types)
+            else:
+                key = (state.version, tuple([_freeze(v) for v in values]), None)
+        except TypeError:
+            self.uncacheable += 1
+            key = None
+        else:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                if self.corpus.metrics is not None:
+                    self.corpus.metrics.record_cache_hit(state.ref.key, state.ref.code)
+                return entry
+            self.misses += 1
+
+        if table.hit_policy in MULTI_HIT_POLICIES:
+            entry = (None, table.evaluate(ctx))
+        else:
+            rule = table.match(ctx)
+            entry = (rule, rule.output(ctx) if rule is not None else None)
+        if key is not None and self.maxsize > 0:
+            self._entries[key] = entry
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return entry
+
+    def lookup(self, name, ctx, group=None, family=None):
+        """(CompiledRule or None, outputs) for ctx, shared with the cache.
+
+        Callers must not modify the outputs; match() returns a copy.
+        """
+        return self._result(name, ctx, group, family)
+
+    def match(self, name, ctx, group=None, family=None):
+        """(CompiledRule or None, output dict or None) for ctx.
+
+        The output dict is a copy; the rule is shared with the compiled table.
+        """
+        rule, outputs = self._result(name, ctx, group, family)
+        return rule, _copy(outputs)
+
+    def evaluate(self, name, ctx, group=None, family=None):
+        """Same result as corpus.evaluate(name, ctx), memoized"""
+        return _copy(self._result(name, ctx, group, family)[1])
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        """Forget every cached result and table version"""
+        self._entries.clear()
+        self._tables.clear()
+        self._named.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "uncacheable": self.uncacheable,
+        }
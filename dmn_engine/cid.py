@@ -0,0 +1,407 @@
+"""
+Shared CID-10 index over every diagnosis test in the corpus
+
+Diagnosis columns are tested in several shapes: exact codes ("Z36.0"),
+prefixes (`starts with(diagnosticoOncologico, "C")`), regex alternations
+(`matches(diagnosticoPrincipal, "L89|L08|T14")`), chapter ranges
+(`["C00".."C97"]`) and negations of all of these. Checking a claim's
+principal and secondary diagnoses against each rule one regex at a time is
+what dominates oncology and radiotherapy audits.
+
+CidIndex reads those tests once and stores them in two shared structures:
+
+- a trie of code symbols. Exact literals are stored at their last node and
+  prefixes along the path. A regex `.` becomes a wildcard edge.
+- the string ranges and comparisons, split into elementary intervals that a
+  single bisect resolves.
+
+A lookup walks the code once, in O(code length) plus the size of the answer:
+
+    index = CidIndex(Corpus())
+    index.tables("C50.9")           # every table with a test accepting C50.9
+    index.rules(["C50.9", "Z51.0"]) # [{"table", "rule", "variable", "codes"}, ...]
+
+Results follow the engine's semantics exactly. Ranges compare strings the
+way FEEL does, so "C97.1" is outside "C00".."C97". An unanchored
+`matches`/`contains` alternative that starts with a letter behaves like a
+prefix only for codes shaped like CID-10 codes (a letter, then digits). For
+any other string these tests, and the few entries the index cannot
+represent, are answered by their compiled predicate.
+
+compile() returns a copy of a table whose prefix, regex and range tests
+resolve through the cached lookup, so each distinct diagnosis is matched
+once per claim instead of once per rule.
+"""
+
+import re
+from bisect import bisect_left
+from functools import lru_cache
+
+from .engine import NEVER, CompiledRule, CompiledTable, parse_table
+
+# Input names that hold a diagnosis even when no test mentions a code
+_DIAGNOSIS_NAME = re.compile(r"^(?:cid|diagn)|Cid|CID|Diagn")
+# Literal that is a CID-10 category or subcategory
+_CID_LITERAL = re.compile(r"[A-Z]\d{2}(?:\.\d{1,2})?")
+# Codes for which an unanchored pattern starting with a letter is a prefix test
+_CID_CODE = re.compile(r"[A-Z]\d{2}(?:\.?\d{1,2})?")
+
+_ANY = None  # trie edge of a regex `.`
+_REGEX_META = frozenset("()[]{}*+?$^|\\")
+_CALLS = ("starts with", "matches", "contains")
+_STRING_CMP = ("<", "<=", ">", ">=")
+
+# Where a key is stored in the trie
+_EXACT, _PREFIX, _SEARCH = "exact", "prefix", "search"
+
+
+class _Node:
+    __slots__ = ("children", "exact", "prefix", "search")
+
+    def __init__(self):
+        self.children = {}
+        self.exact = []
+        self.prefix = []
+        self.search = []
+
+
+class _Test:
+    """One indexed (table, rule, column) diagnosis test"""
+
+    __slots__ = ("table", "rule", "rule_id", "column", "variable", "pred")
+
+    def __init__(self, table, rule, column, variable, pred):
+        self.table = table
+        self.rule = rule.index
+        self.rule_id = rule.id
+        self.column = column
+        self.variable = variable
+        self.pred = pred
+
+
+def _is_subject(node, variable):
+    return node == ("input",) or node == ("name", variable)
+
+
+def _regex_keys(pattern):
+    """Trie keys of a `|` alternation of literal codes, else None"""
+    keys = []
+    for alt in pattern.split("|"):
+        anchored = alt.startswith("^")
+        if anchored:
+            alt = alt[1:]
+        symbols = []
+        i = 0
+        while i < len(alt):
+            ch = alt[i]
+            if ch == "\\":
+                if alt[i + 1:i + 2] not in (".", "-"):
+                    return None
+                symbols.append(alt[i + 1])
+                i += 2
+                continue
+            if ch in _REGEX_META:
+                return None
+            symbols.append(_ANY if ch == "." else ch)
+            i += 1
+        if not symbols:
+            return None
+        if anchored:
+            keys.append((_PREFIX, tuple(symbols)))
+        elif isinstance(symbols[0], str) and "A" <= symbols[0] <= "Z":
+            keys.append((_SEARCH, tuple(symbols)))
+        else:
+            return None
+    return keys
+
+
+def _positive_keys(p, variable):
+    """Index keys of one positive test on a string column, else None.
+
+    Keys are (_EXACT|_PREFIX|_SEARCH, symbols) for the trie and
+    ("interval", lo, lo_closed, hi, hi_closed) for ranges; an empty list
+    means the test never accepts a string.
+    """
+    tag = p[0]
+    if tag == "eq":
+        if p[1][0] != "lit":
+            return None
+        lit = p[1][1]
+        if type(lit) is str:
+            return [(_EXACT, tuple(lit))]
+        return [] if lit is None or lit is True or lit is False else None
+    if tag == "cmp":
+        op, expr = p[1], p[2]
+        if op not in _STRING_CMP or expr[0] != "lit" or type(expr[1]) is not str:
+            return None
+        if op[0] == "<":
+            return [("interval", None, False, expr[1], op == "<=")]
+        return [("interval", expr[1], op == ">=", None, False)]
+    if tag == "range":
+        _, lo_closed, lo, hi, hi_closed = p
+        if lo[0] != "lit" or hi[0] != "lit" or type(lo[1]) is not str or type(hi[1]) is not str:
+            return None
+        return [("interval", lo[1], lo_closed, hi[1], hi_closed)]
+    if tag == "any_of":
+        keys = []
+        for q in p[1]:
+            found = _positive_keys(q, variable)
+            if found is None:
+                return None
+            keys.extend(found)
+        return keys
+    if tag != "bool" or p[1][0] != "call":
+        return None
+    _, fname, args = p[1]
+    if fname == "list contains" and len(args) == 2 and args[0][0] == "list" \
+            and _is_subject(args[1], variable):
+        items = args[0][1]
+        if all(n[0] == "lit" and type(n[1]) is str for n in items):
+            return [(_EXACT, tuple(n[1])) for n in items]
+        return None
+    if fname not in _CALLS or len(args) != 2 or not _is_subject(args[0], variable) \
+            or args[1][0] != "lit" or type(args[1][1]) is not str:
+        return None
+    lit = args[1][1]
+    if fname == "starts with":
+        return [(_PREFIX, tuple(lit))]
+    if fname == "matches":
+        return _regex_keys(lit)
+    # contains(): a substring, i.e. an unanchored literal pattern
+    if lit and "A" <= lit[0] <= "Z":
+        return [(_SEARCH, tuple(lit))]
+    return None
+
+
+def _test_keys(ast, variable):
+    """(negated, keys) for a unary test, or None when the index cannot answer it"""
+    kind, positives = ast
+    keys = []
+    for p in positives:
+        found = _positive_keys(p, variable)
+        if found is None:
+            return None
+        keys.extend(found)
+    return kind == "not", keys
+
+
+def _mentions_cid(keys):
+    for key in keys:
+        if key[0] == "interval":
+            text = key[1] or key[3]
+        else:
+            text = "".join(s for s in key[1] if s is not _ANY)
+        if _CID_LITERAL.fullmatch(text):
+            return True
+    return False
+
+
+def _worth_resolving(ast):
+    """Whether the trie beats the compiled predicate (anything but plain literals)"""
+    for p in ast[1]:
+        if p[0] != "eq":
+            return True
+    return False
+
+
+class _Intervals:
+    """String intervals split at their endpoints; membership is one bisect"""
+
+    def __init__(self, intervals):
+        self.bounds = sorted({b for lo, _, hi, _, _ in intervals for b in (lo, hi) if b is not None})
+        n = len(self.bounds)
+        points = [set() for _ in range(n)]
+        gaps = [set() for _ in range(n + 1)]
+        for lo, lo_closed, hi, hi_closed, test in intervals:
+            first = 0 if lo is None else bisect_left(self.bounds, lo)
+            last = n if hi is None else bisect_left(self.bounds, hi)
+            # gaps[i] lies between bounds[i-1] and bounds[i]
+            for i in range(first + 1 if lo is not None else 0, last + 1):
+                gaps[i].add(test)
+            for i in range(first, min(last + 1, n)):
+                if (i != first or lo is None or lo_closed) and (i != last or hi is None or hi_closed):
+                    points[i].add(test)
+        self.points = [frozenset(s) for s in points]
+        self.gaps = [frozenset(s) for s in gaps]
+
+    def lookup(self, code):
+        i = bisect_left(self.bounds, code)
+        if i < len(self.bounds) and self.bounds[i] == code:
+            return self.points[i]
+        return self.gaps[i]
+
+
+class CidIndex:
+    """Prefix trie and interval index over the diagnosis tests of a corpus"""
+
+    def __init__(self, corpus, families=None, cache_size=8192):
+        self._corpus = corpus
+        self._tests = []
+        self._root = _Node()
+        self._negated = set()
+        self._search = []
+        self._residual = []
+        self._by_table = {}
+        intervals = []
+        for ref in corpus:
+            if families is None or ref.family in families:
+                self._add_table(ref.key, corpus.get(ref.key), intervals)
+        self._intervals = _Intervals(intervals)
+        self._negated = frozenset(self._negated)
+        self._search_ids = frozenset(self._search)
+        self.lookup = lru_cache(maxsize=cache_size)(self._lookup)
+
+    def _add_table(self, key, table, intervals):
+        input_asts, parsed_rules, _ = parse_table(table.source)
+        columns = []
+        for col, (input_ast, clause) in enumerate(zip(input_asts, table.source.inputs)):
+            if input_ast[0] != "name" or (clause.type_ref or "string").lower() != "string":
+                continue
+            variable = input_ast[1]
+            planned = []
+            for rule, (test_asts, _) in zip(table.rules, parsed_rules):
+                ast = test_asts[col] if col < len(test_asts) else None
+                if ast is None or ast == NEVER:
+                    continue
+                planned.append((rule, ast, _test_keys(ast, variable)))
+            if _DIAGNOSIS_NAME.search(variable) or any(
+                    keys is not None and _mentions_cid(keys[1]) for _, _, keys in planned):
+                columns.append((col, variable, planned))
+
+        resolved = {}
+        for col, variable, planned in columns:
+            for rule, ast, keys in planned:
+                pred = dict(rule.tests)[col]
+                test_id = len(self._tests)
+                if keys is None:
+                    self._tests.append(_Test(key, rule, col, variable, pred))
+                    self._residual.append(test_id)
+                    continue
+                negated, entries = keys
+                self._tests.append(_Test(key, rule, col, variable, pred))
+                if any(k[0] == _SEARCH for k in entries):
+                    self._search.append(test_id)
+                if negated:
+                    self._negated.add(test_id)
+                for k in entries:
+                    if k[0] == "interval":
+                        intervals.append(k[1:] + (test_id,))
+                    else:
+                        self._insert(k[0], k[1], test_id)
+                if _worth_resolving(ast):
+                    resolved[(rule.index, col)] = test_id
+        self._by_table[key] = resolved
+
+    def _insert(self, where, symbols, test_id):
+        node = self._root
+        for s in symbols:
+            child = node.children.get(s)
+            if child is None:
+                child = node.children[s] = _Node()
+            node = child
+        getattr(node, where).append(test_id)
+
+    def __len__(self):
+        return len(self._tests)
+
+    @property
+    def variables(self):
+        """Every input name treated as a diagnosis column"""
+        return sorted({t.variable for t in self._tests})
+
+    def _walk(self, code):
+        hits = set()
+        frontier = [self._root]
+        for ch in code:
+            following = []
+            for node in frontier:
+                hits.update(node.prefix)
+                hits.update(node.search)
+                child = node.children.get(ch)
+                if child is not None:
+                    following.append(child)
+                if ch != "\n":
+                    child = node.children.get(_ANY)
+                    if child is not None:
+                        following.append(child)
+            frontier = following
+            if not frontier:
+                return hits
+        for node in frontier:
+            hits.update(node.prefix)
+            hits.update(node.search)
+            hits.update(node.exact)
+        return hits
+
+    def _lookup(self, code):
+        hits = self._walk(code)
+        hits.update(self._intervals.lookup(code))
+        hits.symmetric_difference_update(self._negated)
+        checked = self._residual
+        if _CID_CODE.fullmatch(code) is None:
+            hits.difference_update(self._search_ids)
+            checked = self._residual + self._search
+        for test_id in checked:
+            test = self._tests[test_id]
+            if test.pred(code, {test.variable: code}):
+                hits.add(test_id)
+        return frozenset(hits)
+
+    def rules(self, codes, variable=None):
+        """The rules whose diagnosis test accepts any of codes (one code or a list).
+
+        Returns {"table", "rule", "ruleIndex", "variable", "codes"} dicts in
+        table and rule order; "codes" lists which of the given codes matched.
+        A rule testing several diagnosis columns is listed once per column.
+        """
+        if isinstance(codes, str):
+            codes = [codes]
+        found = {}
+        for code in dict.fromkeys(codes):
+            if type(code) is not str:
+                continue
+            for test_id in self.lookup(code):
+                found.setdefault(test_id, []).append(code)
+        result = []
+        for test_id in sorted(found):
+            test = self._tests[test_id]
+            if variable is None or test.variable == variable:
+                result.append({
+                    "table": test.table,
+                    "rule": test.rule_id,
+                    "ruleIndex": test.rule,
+                    "variable": test.variable,
+                    "codes": found[test_id],
+                })
+        return result
+
+    def tables(self, codes, variable=None):
+        """Sorted keys of the tables with a diagnosis test accepting any of codes"""
+        return sorted({r["table"] for r in self.rules(codes, variable)})
+
+    def compile(self, name):
+        """A copy of a table whose diagnosis tests resolve through the index"""
+        table = self._corpus.get(name)
+        key = self._corpus.resolve(name).key
+        resolved = self._by_table.get(key)
+        if not resolved:
+            return table
+        rules = []
+        for rule in table.rules:
+            tests = tuple(
+                (col, self._resolved(resolved[(rule.index, col)], pred))
+                if (rule.index, col) in resolved else (col, pred)
+                for col, pred in rule.tests
+            )
+            rules.append(CompiledRule(rule.index, rule.id, rule.description, tests,
+                                      rule._outputs, rule._constant))
+        return CompiledTable(table.source, table._extractors, rules, table.errors)
+
+    def _resolved(self, test_id, fallback):
+        lookup = self.lookup
+
+        def pred(v, ctx):
+            if type(v) is str:
+                return test_id in lookup(v)
+            return fallback(v, ctx)
+        return pred
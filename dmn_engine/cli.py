@@ -0,0 +1,474 @@
+"""
+Command line entry point: python -m dmn_engine <command> ...
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from .analyzer import analyze, read_hits
+from .applicability import ApplicabilityIndex
+from .audit import Auditor, main_audit
+from .bench import compare, run_benchmark, write_report
+from .cid import CidIndex
+from .corpus import FAMILIES, Corpus
+from .ddi import DrugIndex
+from .errors import DmnError
+from .ews import EwsMonitor
+from .generate import generate
+from .indexer import rebuild_indexes
+from .memory import RuleMemory, find_memories
+from .metrics import Metrics
+from .pipeline import PRE_SUBMISSION, RevenuePipeline
+from .snapshot import Snapshot, build_snapshot, describe
+from .validate import ERROR, validate
+from .worker import ExternalTaskWorker, Subscription, audit_handler, table_handler
+
+
+def _read_context(value):
+    if value in (None, "-"):
+        return json.load(sys.stdin)
+    return json.loads(value)
+
+
+def open_corpus(args):
+    if args.snapshot:
+        return Snapshot(args.snapshot)
+    return Corpus(args.root)
+
+
+def cmd_eval(args):
+    corpus = open_corpus(args)
+    table = corpus.get(args.table, group=args.group)
+    ctx = _read_context(args.context)
+    rule = table.match(ctx)
+    result = {
+        "table": args.table,
+        "rule": rule.id if rule is not None else None,
+        "outputs": rule.output(ctx) if rule is not None else None,
+    }
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_applicable(args):
+    index = ApplicabilityIndex(open_corpus(args), family=args.family or None,
+                               groups=args.group)
+    ctx = _read_context(args.context)
+    if args.evaluate:
+        result = index.evaluate(ctx)
+    else:
+        result = [{"table": ref.code, "key": ref.key, "priority": index.priority(ref.key)}
+                  for ref in index.tables(ctx)]
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_ddi(args):
+    index = DrugIndex(open_corpus(args))
+    context = json.loads(args.context) if args.context else None
+    alerts = index.screen(args.drug, args.active, context)
+    print(json.dumps(alerts, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_ews(args):
+    monitor = EwsMonitor(open_corpus(args), tables=args.tables.split(",") if args.tables else None)
+    source = sys.stdin if args.input in (None, "-") else open(args.input, encoding="utf-8")
+    try:
+        readings = (json.loads(line) for line in source if line.strip())
+        for alert in monitor.stream(readings, args.patient_field, args.time_field):
+            print(json.dumps(alert, ensure_ascii=False), flush=True)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+    return 0
+
+
+def cmd_cid(args):
+    index = CidIndex(open_corpus(args))
+    if args.tables:
+        result = index.tables(args.codes, args.variable)
+    else:
+        result = index.rules(args.codes, args.variable)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_generate(args):
+    report = generate(args.root, specs=args.specs or None, dry_run=args.dry_run,
+                      force=args.force, workers=args.workers,
+                      diff=sys.stdout.write if args.dry_run else None)
+    counts = {}
+    for path, status in report:
+        counts[status] = counts.get(status, 0) + 1
+        if args.verbose or status in ("written", "modified"):
+            verb = "would write" if args.dry_run and status == "written" else status
+            print(f"{verb}: {path}", file=sys.stderr)
+    summary = ", ".join(f"{n} {status}" for status, n in sorted(counts.items()))
+    print(f"{len(report)} files: {summary or 'none'}", file=sys.stderr)
+    return 0
+
+
+def cmd_pipeline(args):
+    if args.account in (None, "-"):
+        account = json.load(sys.stdin)
+    else:
+        with open(args.account, encoding="utf-8") as f:
+            account = json.load(f)
+    stages = args.stages.split(",") if args.stages else None
+    if args.pre_submission:
+        stages = PRE_SUBMISSION
+    with RevenuePipeline(open_corpus(args), stages=stages, workers=args.workers) as pipeline:
+        report = pipeline.run(account)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_worker(args):
+    corpus = open_corpus(args)
+    metrics = None
+    if args.metrics_port is not None:
+        metrics = Metrics(tags={"worker": args.worker_id or "dmn-engine"})
+        metrics.attach(corpus)
+        metrics.serve(args.metrics_port)
+    auditor = None
+    subscriptions = []
+    for spec in args.topic:
+        topic, _, table = spec.partition("=")
+        if table:
+            handler = table_handler(corpus, table)
+        else:
+            if auditor is None:
+                auditor = Auditor(corpus)
+            handler = audit_handler(auditor)
+        subscriptions.append(Subscription(topic, handler, lock_duration=args.lock_duration))
+    worker = ExternalTaskWorker(args.url, subscriptions, worker_id=args.worker_id,
+                                max_tasks=args.max_tasks, concurrency=args.concurrency,
+                                async_response_timeout=args.long_poll)
+
+    async def run():
+        try:
+            await worker.run()
+        finally:
+            await worker.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(worker.stats(), indent=2), file=sys.stderr)
+    return 0
+
+
+def _memories(args):
+    return args.memory or find_memories(args.root)
+
+
+def cmd_memory_migrate(args):
+    for path in _memories(args):
+        with RuleMemory(path) as memory:
+            result = memory.migrate(keep_json=not args.clear_json)
+            print(f"{memory.db_path}: {result['packed']} packed, {result['invalid']} invalid, "
+                  f"{memory.count} vectors")
+    return 0
+
+
+def cmd_memory_similar(args):
+    results = {}
+    for path in _memories(args):
+        with RuleMemory(path) as memory:
+            try:
+                found = memory.similar_to(args.key, k=args.k, namespace=args.namespace,
+                                          status=args.status or None, type=args.type)
+            except DmnError:
+                continue
+            results[str(memory.db_path)] = found
+    if not results:
+        raise DmnError(f"no memory entry {args.key!r} with an embedding")
+    print(json.dumps(results, ensure_ascii=False, indent=2))
+    return 0
+
+
+def cmd_memory_info(args):
+    info = []
+    for path in _memories(args):
+        with RuleMemory(path) as memory:
+            info.append(memory.stats())
+    print(json.dumps(info, indent=2))
+    return 0
+
+
+def cmd_snapshot_build(args):
+    count, errors = build_snapshot(args.output, args.root)
+    for err in errors:
+        print(f"skipped {err}", file=sys.stderr)
+    print(f"wrote {count} tables to {args.output}")
+    return 0
+
+
+def cmd_snapshot_info(args):
+    print(json.dumps(describe(args.path), indent=2))
+    return 0
+
+
+def cmd_analyze(args):
+    hits = read_hits(args.hits) if args.hits else None
+    counts = {"tables": 0, "unreachable": 0, "shadowed": 0, "undecided": 0}
+    for _, report in analyze(open_corpus(args), args.tables or None, hits,
+                             args.assume_complete, args.family):
+        counts["tables"] += 1
+        for key in ("unreachable", "shadowed", "undecided"):
+            counts[key] += len(report[key])
+        if args.tables or report["unreachable"] or report["shadowed"] or report["undecided"]:
+            print(json.dumps(report, ensure_ascii=False))
+    print(json.dumps(counts), file=sys.stderr)
+    return 0
+
+
+def cmd_bench(args):
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    progress = None
+    if args.verbose:
+        def progress(ref):
+            print(ref.key, file=sys.stderr)
+    report = run_benchmark(open_corpus(args), samples=args.samples, seed=args.seed,
+                           family=args.family, groups=args.group, repeat=args.repeat,
+                           progress=progress)
+    if args.output:
+        write_report(args.output, report)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    total = report["total"]
+    print(f"{total['tables']} tables: parse {total['parse']['totalMs'] / 1e3:.2f} s, "
+          f"compile {total['compile']['totalMs'] / 1e3:.2f} s, evaluate "
+          f"p50 {total['evaluate']['p50Us']} us p99 {total['evaluate']['p99Us']} us",
+          file=sys.stderr)
+    if baseline is None:
+        return 0
+    regressions = compare(baseline, report, tolerance=args.tolerance)
+    for r in regressions:
+        print(f"regression: {r['group']} {r['metric']} {r['before']} -> {r['after']} "
+              f"(+{r['change']:.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def cmd_validate(args):
+    stats = {}
+    counts = {}
+    failed = 0
+    for ref, findings in validate(args.root, families=args.family or FAMILIES,
+                                  names=args.tables or None, workers=args.workers,
+                                  cache=args.cache, stats=stats):
+        if args.errors:
+            findings = [f for f in findings if f["severity"] == ERROR]
+        for f in findings:
+            counts[f["code"]] = counts.get(f["code"], 0) + 1
+        if any(f["severity"] == ERROR for f in findings):
+            failed += 1
+        if findings or args.all:
+            print(json.dumps({"table": ref.key, "findings": findings}, ensure_ascii=False))
+    summary = ", ".join(f"{n} {code}" for code, n in sorted(counts.items()))
+    print(f"{stats.get('tables', 0)} tables ({stats.get('cached', 0)} cached), "
+          f"{failed} with errors: {summary or 'no findings'}", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def cmd_index(args):
+    results = rebuild_indexes(args.root, write=not args.check)
+    stale = False
+    for r in results:
+        state = "changed" if r["changed"] else "up to date"
+        if args.check and r["changed"]:
+            state = "stale"
+            stale = True
+        print(f"{r['path']}: {state} ({r['tables']} tables, {r['parsed']} parsed, "
+              f"{r['reused']} reused)")
+    return 1 if stale else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="dmn_engine", description=__doc__.strip())
+    parser.add_argument("--root", help="corpus root (default: the repository dmn/ directory)")
+    parser.add_argument("--snapshot", help="read tables from a snapshot file instead of --root")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("eval", help="evaluate one table against a JSON context")
+    p.add_argument("table", help="table key or code, e.g. 20101201 or DDI-SEROTONIN-002")
+    p.add_argument("context", nargs="?", help="JSON object with the inputs (default: stdin)")
+    p.add_argument("--group", help="specialty/category when the code is ambiguous")
+    p.set_defaults(func=cmd_eval)
+
+    p = sub.add_parser("audit", help="audit a JSONL/CSV stream of claims against the TUSS tables")
+    p.add_argument("input", help="claims file (.jsonl or .csv), - for stdin")
+    p.add_argument("-o", "--output", help="JSONL results file (default: stdout)")
+    p.add_argument("--format", choices=("jsonl", "csv"), help="input format (default: by extension)")
+    p.add_argument("--workers", type=int, help="worker processes (default: CPU count, 0 = inline)")
+    p.add_argument("--chunk-size", type=int, default=256, help="claims per task (default: 256)")
+    p.add_argument("--tuss-field", help="claim field holding the TUSS code")
+    p.add_argument("--context-field", help="claim field holding the table inputs "
+                                           "(default: the claim itself)")
+    p.add_argument("--cache-size", type=int, default=0,
+                   help="results memoized per worker (default: 0, no cache)")
+    p.add_argument("--compose", action="store_true",
+                   help="test the shared documentation/contraindication fragments once per claim "
+                        "(ignores --cache-size)")
+    p.add_argument("--metrics", help="write rule hit counters and timings to this "
+                                     "OpenMetrics file")
+    p.add_argument("--shadow", help="candidate corpus (directory or snapshot) to evaluate "
+                                    "every claim on as well")
+    p.add_argument("--divergences", help="JSONL file for the claims whose resultado or "
+                                         "observacao differ in the --shadow corpus "
+                                         "(default: a 'shadow' field in the results)")
+    p.set_defaults(func=main_audit)
+
+    p = sub.add_parser("applicable", help="list the tables a context has every required input "
+                                          "for, most urgent first")
+    p.add_argument("context", nargs="?", help="JSON object with the inputs (default: stdin)")
+    p.add_argument("--family", default="Regras-Clinicas-Hospitais",
+                   help="family to index (default: Regras-Clinicas-Hospitais; '' for all)")
+    p.add_argument("--group", action="append",
+                   help="only this category, e.g. DDI or EWS (repeatable)")
+    p.add_argument("--evaluate", action="store_true",
+                   help="evaluate them and print the rules that fired")
+    p.set_defaults(func=cmd_applicable)
+
+    p = sub.add_parser("ddi", help="screen a new order against the active medication list")
+    p.add_argument("drug", help="the new order, e.g. FENTANILA")
+    p.add_argument("active", nargs="*", help="active medications")
+    p.add_argument("--context", help="JSON object with other inputs (idade, potassio...)")
+    p.set_defaults(func=cmd_ddi)
+
+    p = sub.add_parser("ews", help="follow a JSONL stream of vital signs and print EWS level changes")
+    p.add_argument("input", nargs="?", help="JSONL readings, one object per line (default: stdin)")
+    p.add_argument("--patient-field", default="paciente", help="field with the patient/bed id "
+                                                               "(default: paciente)")
+    p.add_argument("--time-field", help="field copied to the alerts as 'at'")
+    p.add_argument("--tables", help="comma-separated tables (default: every EWS table)")
+    p.set_defaults(func=cmd_ews)
+
+    p = sub.add_parser("cid", help="list the rules whose diagnosis tests accept CID-10 codes")
+    p.add_argument("codes", nargs="+", help="CID-10 codes, e.g. C50.9 Z51.0")
+    p.add_argument("--variable", help="only tests on this input, e.g. diagnosticoPrincipal")
+    p.add_argument("--tables", action="store_true", help="print table keys only")
+    p.set_defaults(func=cmd_cid)
+
+    p = sub.add_parser("pipeline", help="run a hospital account through the revenue-cycle stages")
+    p.add_argument("account", nargs="?", help="JSON account file with its line items (default: stdin)")
+    p.add_argument("--stages", help="comma-separated stages to run (default: all)")
+    p.add_argument("--pre-submission", action="store_true",
+                   help="run only the stages before submission (credentialing to denial)")
+    p.add_argument("--workers", type=int, help="threads for the subcategory fan-out (0 = inline)")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser("worker", help="serve Camunda 7 external tasks by evaluating tables locally")
+    p.add_argument("--url", required=True, help="engine REST base, e.g. http://camunda:8080/engine-rest")
+    p.add_argument("--topic", action="append", required=True, metavar="TOPIC[=TABLE]",
+                   help="topic to subscribe (repeatable); with =TABLE the task variables are "
+                        "evaluated on that table, without it they are routed by TUSS code")
+    p.add_argument("--worker-id", help="workerId (default: dmn-engine-<host>-<pid>)")
+    p.add_argument("--max-tasks", type=int, default=100, help="tasks locked at once (default: 100)")
+    p.add_argument("--concurrency", type=int, default=32,
+                   help="completions in flight (default: 32)")
+    p.add_argument("--lock-duration", type=int, default=60000, help="ms (default: 60000)")
+    p.add_argument("--long-poll", type=int, default=20000,
+                   help="fetchAndLock asyncResponseTimeout in ms (default: 20000)")
+    p.add_argument("--metrics-port", type=int, help="serve OpenMetrics on this port")
+    p.set_defaults(func=cmd_worker)
+
+    p = sub.add_parser("snapshot", help="build or inspect a pre-parsed corpus snapshot")
+    snap = p.add_subparsers(dest="snapshot_command", required=True)
+    s = snap.add_parser("build", help="parse the corpus and write a snapshot file")
+    s.add_argument("-o", "--output", default="dmn-corpus.snap")
+    s.set_defaults(func=cmd_snapshot_build)
+    s = snap.add_parser("info", help="summarize a snapshot file")
+    s.add_argument("path")
+    s.set_defaults(func=cmd_snapshot_info)
+
+    p = sub.add_parser("memory", help="pack and search the .swarm rule memory embeddings")
+    mem = p.add_subparsers(dest="memory_command", required=True)
+    s = mem.add_parser("migrate", help="pack JSON embeddings into float32 BLOBs")
+    s.add_argument("memory", nargs="*", help=".swarm directories (default: every one under --root)")
+    s.add_argument("--clear-json", action="store_true",
+                   help="set the JSON embedding column to NULL once packed (irreversible)")
+    s.set_defaults(func=cmd_memory_migrate)
+    s = mem.add_parser("similar", help="entries closest to an existing entry")
+    s.add_argument("key", help="memory entry key or id")
+    s.add_argument("--memory", action="append", help=".swarm directory (repeatable)")
+    s.add_argument("-k", type=int, default=5, help="results (default: 5)")
+    s.add_argument("--namespace")
+    s.add_argument("--status", default="active", help="entry status (default: active, '' = any)")
+    s.add_argument("--type", help="entry type, e.g. semantic")
+    s.set_defaults(func=cmd_memory_similar)
+    s = mem.add_parser("info", help="summarize the vector files")
+    s.add_argument("memory", nargs="*", help=".swarm directories (default: every one under --root)")
+    s.set_defaults(func=cmd_memory_info)
+
+    p = sub.add_parser("generate", help="regenerate tables from _generator/spec.json files")
+    p.add_argument("specs", nargs="*", help="spec.json files (default: every spec under --root)")
+    p.add_argument("-n", "--dry-run", action="store_true",
+                   help="write nothing; print a unified diff of the files that would change")
+    p.add_argument("--force", action="store_true",
+                   help="also render files that are hand-edited or not yet in the manifest")
+    p.add_argument("--workers", type=int, help="rendering threads")
+    p.add_argument("-v", "--verbose", action="store_true", help="list every file")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("analyze", help="find shadowed/unreachable rules and propose a faster "
+                                       "safe rule order")
+    p.add_argument("tables", nargs="*", help="tables to analyze (default: every FIRST table; "
+                                             "only tables with findings are printed)")
+    p.add_argument("--family", help="only tables of this family, e.g. Regras-Audit-Operadora")
+    p.add_argument("--hits", help="OpenMetrics file with dmn_rule_hits_total (audit --metrics) "
+                                  "to propose an order from")
+    p.add_argument("--assume-complete", action="store_true",
+                   help="assume every input is present (missing values are not a case)")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("bench", help="time parse, compile and evaluation of every table on "
+                                     "synthesized inputs")
+    p.add_argument("-o", "--output", help="JSON report file (default: stdout)")
+    p.add_argument("--samples", type=int, default=200, help="contexts per table (default: 200)")
+    p.add_argument("--seed", type=int, default=0, help="fixture seed (default: 0)")
+    p.add_argument("--repeat", type=int, default=3,
+                   help="timed runs per context, the fastest is kept (default: 3)")
+    p.add_argument("--family", help="only tables of this family, e.g. Regras-Clinicas-Hospitais")
+    p.add_argument("--group", action="append",
+                   help="only this group, e.g. EWS or Regras-Adm-Hospitais/BILL (repeatable)")
+    p.add_argument("--compare", help="earlier report; exit 1 when a group got slower")
+    p.add_argument("--tolerance", type=float, default=0.25,
+                   help="slowdown allowed by --compare (default: 0.25)")
+    p.add_argument("-v", "--verbose", action="store_true", help="list tables as they load")
+    p.set_defaults(func=cmd_bench)
+
+    p = sub.add_parser("validate", help="check every table against its metadata.json and the "
+                                        "family outputStandard")
+    p.add_argument("tables", nargs="*", help="table keys or codes (default: every table)")
+    p.add_argument("--family", action="append",
+                   help="only this family, e.g. Regras-Audit-Operadora (repeatable)")
+    p.add_argument("--workers", type=int,
+                   help="worker processes (default: CPU count, 0 = inline)")
+    p.add_argument("--cache", help="results cache file; unchanged tables are not re-read")
+    p.add_argument("--errors", action="store_true", help="report errors only, not warnings")
+    p.add_argument("--all", action="store_true", help="also print tables without findings")
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser("index", help="rebuild the family index files from the tables on disk")
+    p.add_argument("--check", action="store_true",
+                   help="do not write; exit 1 if any index file is out of date")
+    p.set_defaults(func=cmd_index)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except DmnError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
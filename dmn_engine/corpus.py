@@ -0,0 +1,166 @@
+"""
+Discovery and lazy loading of the dmn/ rule corpus
+
+A table is identified by its key, the posix path of its directory relative to
+the corpus root (e.g. "Regras-Audit-Operadora/cardiologia/20101201"), and
+looked up by code, the directory name (TUSS code or rule ID such as
+"DDI-SEROTONIN-002"). Codes are not unique - the same TUSS code can exist in
+several specialties - so resolve() accepts a group to disambiguate.
+"""
+
+import json
+import os
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from .engine import compile_table, parse_table
+from .errors import AmbiguousTableError, TableNotFoundError
+from .loader import load_table
+
+DEFAULT_ROOT = Path(__file__).resolve().parent.parent / "dmn"
+
+FAMILIES = (
+    "Regras-Audit-Operadora",
+    "Regras-Clinicas-Operadora",
+    "Regras-Adm-Hospitais",
+    "Regras-Clinicas-Hospitais",
+)
+
+TABLE_FILENAME = "regra.dmn.xml"
+METADATA_FILENAME = "metadata.json"
+
+
+@dataclass(frozen=True)
+class TableRef:
+    key: str
+    code: str
+    family: str
+    group: str
+    path: str
+    metadata_path: Optional[str] = None
+
+    def load_metadata(self):
+        if self.metadata_path is None:
+            return None
+        with open(self.metadata_path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def discover(root=None, families=FAMILIES):
+    """Yield a TableRef for every decision table under root, in sorted order"""
+    root = Path(root or DEFAULT_ROOT)
+    for family in families:
+        base = root / family
+        if not base.is_dir():
+            continue
+        for dirpath, dirnames, filenames in os.walk(base):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith(".") and d != "templates")
+            rel = Path(dirpath).relative_to(root).as_posix()
+            parts = rel.split("/")
+            if TABLE_FILENAME in filenames:
+                meta = os.path.join(dirpath, METADATA_FILENAME)
+                yield TableRef(
+                    key=rel,
+                    code=parts[-1],
+                    family=family,
+                    group="/".join(parts[1:-1]),
+                    path=os.path.join(dirpath, TABLE_FILENAME),
+                    metadata_path=meta if METADATA_FILENAME in filenames else None,
+                )
+            # Standalone *.dmn tables (e.g. Regras-Clinicas-Hospitais/SYN/SYN-AKI/SYN-AKI-001.dmn)
+            for name in sorted(filenames):
+                if name.endswith(".dmn"):
+                    code = name[:-len(".dmn")]
+                    meta = f"{code}.{METADATA_FILENAME}"
+                    yield TableRef(
+                        key=f"{rel}/{code}",
+                        code=code,
+                        family=family,
+                        group="/".join(parts[1:]),
+                        path=os.path.join(dirpath, name),
+                        metadata_path=os.path.join(dirpath, meta) if meta in filenames else None,
+                    )
+
+
+class Corpus:
+    """Index of every table under a dmn/ root, compiled on first use"""
+
+    # The Metrics registry told about every table compiled (see Metrics.attach)
+    metrics = None
+
+    def __init__(self, root=None, families=FAMILIES):
+        self.root = Path(root or DEFAULT_ROOT)
+        self._refs = {}
+        self._by_code = {}
+        self._compiled = {}
+        for ref in discover(self.root, families):
+            self._add_ref(ref)
+
+    def _add_ref(self, ref):
+        self._refs[ref.key] = ref
+        self._by_code.setdefault(ref.code, []).append(ref)
+
+    def _load(self, ref):
+        """(DecisionTable, parse_table() result) for a ref"""
+        table = load_table(ref.path)
+        return table, parse_table(table)
+
+    def _compile(self, ref):
+        if self.metrics is None:
+            return compile_table(*self._load(ref))
+        started = time.perf_counter()
+        table, parsed = self._load(ref)
+        loaded = time.perf_counter()
+        compiled = compile_table(table, parsed)
+        self.metrics.compiled(ref, compiled, loaded - started, time.perf_counter() - loaded)
+        return compiled
+
+    def __len__(self):
+        return len(self._refs)
+
+    def __iter__(self):
+        return iter(self._refs.values())
+
+    def __contains__(self, key):
+        return key in self._refs or key in self._by_code
+
+    def find(self, code, group=None, family=None):
+        """All refs with this code, optionally filtered by group/family"""
+        return [
+            ref for ref in self._by_code.get(code, ())
+            if (group is None or ref.group == group) and (family is None or ref.family == family)
+        ]
+
+    def resolve(self, name, group=None, family=None):
+        """Return the single TableRef for a key or code"""
+        ref = self._refs.get(name)
+        if ref is not None:
+            return ref
+        candidates = self.find(name, group, family)
+        if not candidates:
+            raise TableNotFoundError(f"no table for {name!r}")
+        if len(candidates) > 1:
+            keys = ", ".join(r.key for r in candidates)
+            raise AmbiguousTableError(f"{name!r} matches several tables: {keys}")
+        return candidates[0]
+
+    def get(self, name, group=None, family=None):
+        """Return the CompiledTable for a key or code, compiling it on first use"""
+        ref = self.resolve(name, group, family)
+        table = self._compiled.get(ref.key)
+        if table is None:
+            table = self._compiled[ref.key] = self._compile(ref)
+        return table
+
+    def reload(self, name, group=None, family=None):
+        """Drop the compiled table so the next get() reads its file again"""
+        self._compiled.pop(self.resolve(name, group, family).key, None)
+
+    def metadata(self, name, group=None, family=None):
+        """The parsed metadata.json sidecar of a table, or None"""
+        return self.resolve(name, group, family).load_metadata()
+
+    def evaluate(self, name, ctx, group=None, family=None):
+        return self.get(name, group, family).evaluate(ctx)
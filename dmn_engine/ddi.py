@@ -0,0 +1,311 @@
+"""
+One-pass drug-drug interaction screening
+
+Every DDI table under Regras-Clinicas-Hospitais/DDI tests the patient's active
+medication list (`list contains(medicamentosAtivos, "X")`) and the new order
+(`"FENTANIL" or "FENTANILA"` against medicamentoNovo). Running an order
+through all of them means evaluating every table, although only the few that
+mention the ordered drug or one of the active drugs can raise an alert.
+
+DrugIndex reads those drug tests once and builds an inverted index from the
+canonical drug name to the rules that require it:
+
+    index = DrugIndex(Corpus())
+    index.screen("Fentanila", ["FENELZINA", "OMEPRAZOL"], {"idade": 70})
+    # -> [{"table": "DDI-SEROTONIN-002", "rule": "rule_fentanil_imao", ...}]
+
+screen() evaluates only the candidate rules. Each table still follows its
+FIRST hit policy: a candidate rule fires only if no earlier candidate (or
+drug-independent) rule of the same table matched. A table's catch-all rule
+(no tests, nivelAlerta "OK" or a generic note) is not reported as an alert.
+
+Drug names are compared after normalize_drug() (upper case, no accents, "_"
+and "-" read as spaces) and mapped through ALIASES, so "Fentanila",
+"FENTANIL" and "fentanil" all hit the same rules.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+
+from .engine import NEVER, parse_table
+from .feel import _as_list
+
+FAMILY = "Regras-Clinicas-Hospitais"
+CATEGORY = "DDI"
+
+# Inputs holding the new order and the active medication list
+ORDER_INPUTS = ("medicamentoNovo", "suplementoNovo")
+ACTIVE_INPUTS = ("medicamentosAtivos",)
+
+# Spellings used interchangeably across the DDI tables; the first is canonical
+ALIASES = (
+    ("FENTANIL", "FENTANILA"),
+    ("VARFARINA", "WARFARIN", "MAREVAN"),
+    ("ACIDO ACETILSALICILICO", "AAS", "ASPIRINA"),
+    ("PARACETAMOL", "ACETAMINOFENO"),
+    ("METOTREXATO", "METOTREXATE", "MTX"),
+    ("TRIMETOPRIMA", "TRIMETOPRIM"),
+    ("SULFAMETOXAZOL TRIMETOPRIMA", "SULFAMETOXAZOL TRIMETOPRIM", "SMX TMP", "BACTRIM"),
+    ("LEVOTIROXINA", "EUTHYROX", "PURAN"),
+    ("DEXTROMETORFANO", "DXM"),
+    ("MEPERIDINA", "PETIDINA"),
+    ("GINKGO BILOBA", "GINKGO"),
+    ("OMEGA 3", "ACIDOS GRAXOS OMEGA 3", "OLEO DE PEIXE"),
+    ("ACIDO VALPROICO", "VALPROATO", "DIVALPROATO"),
+    ("CLORETO DE POTASSIO", "KCL", "SLOW K"),
+    ("LITIO", "CARBONATO DE LITIO"),
+)
+
+_SEPARATORS = re.compile(r"[\s_\-]+")
+_SEVERITY = {"Alerta": 0, "Atencao": 1, "Informativo": 2}
+
+
+@lru_cache(maxsize=8192)
+def normalize_drug(name):
+    """Upper case, accent-free, single-spaced form of a drug name"""
+    text = str(name)
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return _SEPARATORS.sub(" ", text.upper()).strip()
+
+
+_CANONICAL = {normalize_drug(n): normalize_drug(group[0]) for group in ALIASES for n in group}
+
+
+@lru_cache(maxsize=8192)
+def canonical_drug(name):
+    """normalize_drug() followed by the ALIASES mapping"""
+    n = normalize_drug(name)
+    return _CANONICAL.get(n, n)
+
+
+def _flatten(positives):
+    flat = []
+    stack = list(reversed(positives))
+    while stack:
+        p = stack.pop()
+        if p[0] == "any_of":
+            stack.extend(reversed(p[1]))
+        else:
+            flat.append(p)
+    return flat
+
+
+def _literals(positives):
+    """Canonical names if every positive is `= "literal"`, else None"""
+    names = []
+    for p in _flatten(positives):
+        if p[0] != "eq" or p[1][0] != "lit" or type(p[1][1]) is not str:
+            return None
+        names.append(p[1][1])
+    return names
+
+
+def _memberships(positives, column):
+    """Drug literals of a disjunction of `list contains(column, "X")` tests, else None"""
+    names = []
+    for p in _flatten(positives):
+        if p[0] != "bool":
+            return None
+        expr = p[1]
+        if (expr[0] != "call" or expr[1] != "list contains"
+                or expr[2][0] != ("name", column) or expr[2][1][0] != "lit"
+                or type(expr[2][1][1]) is not str):
+            return None
+        names.append(expr[2][1][1])
+    return names
+
+
+def _all_memberships(positives, column):
+    """Drug literals of `list contains(...) and list contains(...)`, else None"""
+    if len(positives) != 1 or positives[0][0] != "all_of":
+        return None
+    names = []
+    for p in positives[0][1]:
+        found = _memberships([p], column)
+        if found is None:
+            return None
+        names.extend(found)
+    return names
+
+
+class _RulePlan:
+    """Drug conditions of one rule in canonical form, plus its remaining tests"""
+
+    __slots__ = ("new_in", "new_not_in", "active_any", "active_all", "tests")
+
+    def __init__(self):
+        self.new_in = self.new_not_in = self.active_any = self.active_all = None
+        self.tests = ()
+
+    def keys(self):
+        """("order"|"active", names) the rule is indexed under, or None"""
+        if self.new_in is not None:
+            return "order", self.new_in
+        if self.active_any is not None:
+            return "active", self.active_any
+        if self.active_all is not None:
+            return "active", (min(self.active_all),)
+        return None
+
+    def fires(self, new, active, values, ctx):
+        if self.new_in is not None and new not in self.new_in:
+            return False
+        if self.new_not_in is not None and new in self.new_not_in:
+            return False
+        if self.active_any is not None and self.active_any.isdisjoint(active):
+            return False
+        if self.active_all is not None and not self.active_all <= active:
+            return False
+        for i, pred in self.tests:
+            if not pred(values[i], ctx):
+                return False
+        return True
+
+
+class _TableEntry:
+    __slots__ = ("ref", "table", "plans", "always")
+
+    def __init__(self, ref, table, plans, always):
+        self.ref = ref
+        self.table = table
+        self.plans = plans
+        self.always = always
+
+
+class DrugIndex:
+    """Inverted index from canonical drug name to the DDI rules that test it"""
+
+    def __init__(self, corpus, family=FAMILY, category=CATEGORY):
+        self._tables = []
+        self._by_order = {}
+        self._by_active = {}
+        self._always_tables = []
+        self._spellings = {}
+        prefix = category + "/"
+        for ref in corpus:
+            if ref.family == family and (ref.group == category or ref.group.startswith(prefix)):
+                self._add_table(ref, corpus.get(ref.key))
+
+    def _spell(self, names):
+        canon = set()
+        for name in names:
+            c = canonical_drug(name)
+            self._spellings.setdefault(c, set()).add(name)
+            canon.add(c)
+        return frozenset(canon)
+
+    def _add_table(self, ref, table):
+        _, parsed_rules, _ = parse_table(table.source)
+        columns = table.input_names
+        position = len(self._tables)
+        plans = []
+        always = []
+        for rule, (test_asts, _) in zip(table.rules, parsed_rules):
+            plan = _RulePlan()
+            handled = set()
+            for col, ast in enumerate(test_asts):
+                if ast is None or ast == NEVER:
+                    continue
+                kind, positives = ast
+                name = columns[col]
+                if name in ORDER_INPUTS:
+                    names = _literals(positives)
+                    if names is not None:
+                        if kind == "tests":
+                            plan.new_in = self._spell(names)
+                        else:
+                            plan.new_not_in = self._spell(names)
+                        handled.add(col)
+                elif name in ACTIVE_INPUTS and kind == "tests":
+                    names = _memberships(positives, name)
+                    if names is not None:
+                        plan.active_any = self._spell(names)
+                        handled.add(col)
+                    else:
+                        names = _all_memberships(positives, name)
+                        if names is not None:
+                            plan.active_all = self._spell(names)
+                            handled.add(col)
+            plan.tests = tuple((col, pred) for col, pred in rule.tests if col not in handled)
+            plans.append(plan)
+
+            keys = plan.keys()
+            if keys is None:
+                always.append(rule.index)
+                continue
+            target = self._by_order if keys[0] == "order" else self._by_active
+            for drug in keys[1]:
+                target.setdefault(drug, []).append((position, rule.index))
+
+        self._tables.append(_TableEntry(ref, table, plans, frozenset(always)))
+        # Drug-independent rules other than the catch-all can alert on any order
+        if any(table.rules[i].tests for i in always):
+            self._always_tables.append(position)
+
+    def __len__(self):
+        return len(self._tables)
+
+    @property
+    def drugs(self):
+        """Every canonical drug name referenced by an indexed rule"""
+        return sorted(set(self._by_order) | set(self._by_active))
+
+    def candidates(self, new_drug, active_drugs=()):
+        """{table position: rule indices} that could fire for this order"""
+        new = canonical_drug(new_drug) if new_drug else None
+        return self._candidates(new, {canonical_drug(d) for d in _as_list(active_drugs) or ()})
+
+    def _candidates(self, new, active):
+        found = {}
+        for position, index in self._by_order.get(new, ()):
+            found.setdefault(position, set()).add(index)
+        for drug in active:
+            for position, index in self._by_active.get(drug, ()):
+                found.setdefault(position, set()).add(index)
+        for position in self._always_tables:
+            found.setdefault(position, set())
+        return found
+
+    def screen(self, new_drug, active_drugs=(), context=None):
+        """Screen a new order against the active medication list.
+
+        context supplies the other inputs some tables test (idade, potassio,
+        taxaFiltracaoGlomerular...). Returns one dict per table that raised an
+        alert - {"table", "key", "rule", "outputs"} - most severe first.
+        """
+        active_list = _as_list(active_drugs) or ()
+        new = canonical_drug(new_drug) if new_drug else None
+        active = frozenset(canonical_drug(d) for d in active_list)
+
+        ctx = dict(context or {})
+        for name in ORDER_INPUTS:
+            ctx[name] = normalize_drug(new_drug) if new_drug else None
+        # Tests not covered by the index see every spelling of the active drugs
+        spelled = set()
+        for drug in active:
+            spelled.add(drug)
+            spelled.update(self._spellings.get(drug, ()))
+        for name in ACTIVE_INPUTS:
+            ctx[name] = sorted(spelled)
+
+        alerts = []
+        for position, indices in sorted(self._candidates(new, active).items()):
+            entry = self._tables[position]
+            table = entry.table
+            values = table.input_values(ctx)
+            for index in sorted(indices | entry.always):
+                if entry.plans[index].fires(new, active, values, ctx):
+                    rule = table.rules[index]
+                    if rule.tests:
+                        alerts.append({
+                            "table": entry.ref.code,
+                            "key": entry.ref.key,
+                            "rule": rule.id,
+                            "outputs": rule.output(ctx),
+                        })
+                    break
+        alerts.sort(key=lambda a: _SEVERITY.get(a["outputs"].get("nivelAlerta"), len(_SEVERITY)))
+        return alerts
@@ -0,0 +1,313 @@
+"""
+Compiled decision tables
+
+compile_table() turns a parsed model.DecisionTable into a CompiledTable whose
+rules hold only the non-wildcard (column, predicate) pairs. Evaluating a claim
+is then: extract each input once, walk the rules in order and return the
+outputs of the first rule whose predicates all hold (hitPolicy FIRST).
+
+    table = compile_table(load_table("dmn/.../20101201/regra.dmn.xml"))
+    table.evaluate({"atendeDiretrizesSBCCV": True, "tipoDispositivo": "CDI"})
+    # -> {"resultado": "Aprovado", "observacao": "..."}
+
+Entries the FEEL compiler cannot handle never crash evaluation: the rule that
+contains them can never fire (so the claim falls through to the fallback rule)
+and the problem is listed in CompiledTable.errors.
+
+The corpus repeats itself: the same tests ("Documentado", "true", "< 18"),
+the same input expressions and the same output dicts appear in thousands of
+rules. Compiled predicates, output functions, extractors and constant output
+dicts are pure, so compile_table() builds each distinct one once and every
+rule that needs it shares it (the loader interns the texts for the same
+reason). With every table resident the compiled corpus takes about 39 MB of
+Python objects instead of 55 MB.
+"""
+
+import marshal
+import re
+import sys
+import time
+import weakref
+
+from .errors import DmnError, FeelSyntaxError
+from .feel import compile_ast, compile_unary_tests, parse_expression, parse_unary_tests, to_number
+
+SINGLE_HIT_POLICIES = ("FIRST", "UNIQUE", "ANY")
+MULTI_HIT_POLICIES = ("RULE ORDER", "COLLECT")
+
+_PLAIN_NAME = re.compile(r"[^\W\d][\w ]*")
+_NUMERIC_TYPES = ("number", "integer", "long", "double")
+
+# Parsed form of an entry that failed to compile: the rule can never fire
+NEVER = ("never",)
+
+
+def _never(value, ctx):
+    return False
+
+
+def _coerce_number(value):
+    if type(value) is str:
+        n = to_number(value)
+        return value if n is None else n
+    return value
+
+
+def _coerce_boolean(value):
+    if type(value) is str:
+        lowered = value.strip().lower()
+        if lowered == "true":
+            return True
+        if lowered == "false":
+            return False
+    return value
+
+
+def _coercer(type_ref):
+    t = (type_ref or "").lower()
+    if t in _NUMERIC_TYPES:
+        return _coerce_number
+    if t == "boolean":
+        return _coerce_boolean
+    return None
+
+
+def _parse_input(clause):
+    expression = clause.expression.strip()
+    if _PLAIN_NAME.fullmatch(expression) and expression not in ("true", "false", "null"):
+        # FEEL names may contain spaces ("sintomas Isquemia"); keep them whole
+        return ("name", expression)
+    return parse_expression(expression)
+
+
+# Compiled objects shared across tables, keyed by the marshalled AST (marshal
+# keeps 1, 1.0 and True apart, which equality and hashing do not). The
+# compiled rules hold the only strong references: an entry lives as long as
+# some table uses it, so reloading or dropping tables does not grow these.
+_PREDICATES = weakref.WeakValueDictionary()
+_OUTPUT_FUNCTIONS = weakref.WeakValueDictionary()
+_EXTRACTORS = weakref.WeakValueDictionary()
+_CONSTANTS = weakref.WeakValueDictionary()
+
+
+class _Outputs(dict):
+    """A constant output dict; a subclass only so _CONSTANTS can hold it weakly"""
+    __slots__ = ("__weakref__",)
+
+
+def _shared(cache, key, build):
+    found = cache.get(key)
+    if found is None:
+        found = build()
+        if found is not None:
+            cache[key] = found
+    return found
+
+
+def _constant(names, asts):
+    """The constant output dict of a rule, shared with identical rules"""
+    values = [ast[1] for ast in asts]
+    key = marshal.dumps((names, values))
+    found = _CONSTANTS.get(key)
+    if found is None:
+        found = _CONSTANTS[key] = _Outputs(
+            (name, sys.intern(v) if type(v) is str else v) for name, v in zip(names, values))
+    return found
+
+
+def _extractor(ast, type_ref):
+    """Build fn(context) -> input value for a parsed <inputExpression>"""
+    coerce = _coercer(type_ref)
+    if ast[0] == "name":
+        name = ast[1]
+        if coerce is None:
+            return lambda ctx: ctx.get(name)
+        return lambda ctx: coerce(ctx.get(name))
+    fn = compile_ast(ast)
+    if coerce is None:
+        return lambda ctx: fn(ctx, None)
+    return lambda ctx: coerce(fn(ctx, None))
+
+
+class CompiledRule:
+    """One <rule> reduced to its non-wildcard tests and compiled outputs"""
+
+    __slots__ = ("index", "id", "description", "tests", "_outputs", "_constant")
+
+    def __init__(self, index, id, description, tests, outputs, constant_outputs):
+        self.index = index
+        self.id = id
+        self.description = description
+        self.tests = tests
+        self._outputs = outputs
+        self._constant = constant_outputs
+
+    def matches(self, values, ctx):
+        for i, pred in self.tests:
+            if not pred(values[i], ctx):
+                return False
+        return True
+
+    def output(self, ctx):
+        if self._constant is not None:
+            return dict(self._constant)
+        return {name: fn(ctx, None) for name, fn in self._outputs}
+
+    def __repr__(self):
+        return f"<CompiledRule {self.id or self.index}>"
+
+
+class CompiledTable:
+    """A decision table ready for in-process evaluation"""
+
+    # fn(fired rules, seconds), called after every match() and match_all() when
+    # set on a table (see Metrics.instrument); evaluate() goes through those two
+    observer = None
+
+    def __init__(self, source, extractors, rules, errors):
+        self.source = source
+        self.id = source.id
+        self.name = source.name
+        self.hit_policy = source.hit_policy
+        self.input_names = [c.expression for c in source.inputs]
+        self.output_names = [c.name for c in source.outputs]
+        self.rules = rules
+        self.errors = errors
+        self._extractors = extractors
+
+    def input_values(self, ctx):
+        return [extract(ctx) for extract in self._extractors]
+
+    def _first(self, ctx):
+        values = [extract(ctx) for extract in self._extractors]
+        for rule in self.rules:
+            for i, pred in rule.tests:
+                if not pred(values[i], ctx):
+                    break
+            else:
+                return rule
+        return None
+
+    def _every(self, ctx):
+        values = [extract(ctx) for extract in self._extractors]
+        return [rule for rule in self.rules if rule.matches(values, ctx)]
+
+    def match(self, ctx):
+        """Return the first CompiledRule that matches ctx, or None"""
+        if self.observer is None:
+            return self._first(ctx)
+        started = time.perf_counter()
+        rule = self._first(ctx)
+        self.observer((rule,) if rule is not None else (), time.perf_counter() - started)
+        return rule
+
+    def match_all(self, ctx):
+        """Return every matching rule in table order (RULE ORDER / COLLECT)"""
+        if self.observer is None:
+            return self._every(ctx)
+        started = time.perf_counter()
+        rules = self._every(ctx)
+        self.observer(rules, time.perf_counter() - started)
+        return rules
+
+    def evaluate(self, ctx):
+        """Evaluate ctx and return the output dict (None when no rule fires).
+
+        Multi-hit tables return a list of output dicts instead.
+        """
+        if self.hit_policy in MULTI_HIT_POLICIES:
+            return [rule.output(ctx) for rule in self.match_all(ctx)]
+        rule = self.match(ctx)
+        return rule.output(ctx) if rule is not None else None
+
+    def __repr__(self):
+        return f"<CompiledTable {self.id} rules={len(self.rules)}>"
+
+
+def _parse_output(text, errors, rule_label, name):
+    try:
+        return parse_expression(text)
+    except FeelSyntaxError as exc:
+        stripped = (text or "").strip()
+        if len(stripped) >= 2 and stripped[0] == '"' and stripped[-1] == '"':
+            # Unescaped quotes inside a string literal - keep the text verbatim
+            return ("lit", stripped[1:-1])
+        errors.append(f"rule {rule_label} output {name}: {exc}")
+        return ("lit", None)
+
+
+def parse_table(table):
+    """Parse every entry of a DecisionTable into FEEL ASTs.
+
+    Returns (input_asts, rules, errors) where rules is a list of
+    (test_asts, output_asts) per rule. The result contains only tuples, lists,
+    strings and numbers so it can be stored (see snapshot.py) and handed back
+    to compile_table() without re-parsing any FEEL text.
+    """
+    errors = []
+    input_asts = []
+    for clause in table.inputs:
+        try:
+            input_asts.append(_parse_input(clause))
+        except FeelSyntaxError as exc:
+            errors.append(f"input {clause.id or clause.expression}: {exc}")
+            input_asts.append(("lit", None))
+
+    n_inputs = len(table.inputs)
+    output_names = [c.name for c in table.outputs]
+    rules = []
+    for index, rule in enumerate(table.rules):
+        label = rule.id or f"#{index + 1}"
+        if len(rule.input_entries) != n_inputs:
+            errors.append(
+                f"rule {label}: {len(rule.input_entries)} input entries for {n_inputs} inputs")
+        tests = []
+        for col, text in enumerate(rule.input_entries[:n_inputs]):
+            try:
+                tests.append(parse_unary_tests(text))
+            except FeelSyntaxError as exc:
+                errors.append(f"rule {label} input {col + 1}: {exc}")
+                tests.append(NEVER)
+        outputs = []
+        for j, name in enumerate(output_names):
+            text = rule.output_entries[j] if j < len(rule.output_entries) else ""
+            outputs.append(_parse_output(text, errors, label, name))
+        rules.append((tests, outputs))
+    return input_asts, rules, errors
+
+
+def compile_table(table, parsed=None):
+    """Compile a model.DecisionTable into a CompiledTable.
+
+    parsed may be the result of parse_table() for this table (for instance
+    read back from a snapshot) to skip FEEL parsing.
+    """
+    if table.hit_policy not in SINGLE_HIT_POLICIES + MULTI_HIT_POLICIES:
+        raise DmnError(f"hitPolicy {table.hit_policy} is not supported")
+    input_asts, parsed_rules, errors = parsed if parsed is not None else parse_table(table)
+
+    extractors = [
+        _shared(_EXTRACTORS, (marshal.dumps(ast), clause.type_ref), lambda: _extractor(ast, clause.type_ref))
+        for ast, clause in zip(input_asts, table.inputs)
+    ]
+    output_names = tuple(sys.intern(c.name) for c in table.outputs)
+    rules = []
+    for index, (rule, (test_asts, output_asts)) in enumerate(zip(table.rules, parsed_rules)):
+        tests = []
+        for col, ast in enumerate(test_asts):
+            if ast is None:
+                continue
+            pred = _never if ast == NEVER else \
+                _shared(_PREDICATES, marshal.dumps(ast), lambda: compile_unary_tests(ast))
+            if pred is not None:
+                tests.append((col, pred))
+        if all(ast[0] == "lit" for ast in output_asts):
+            constant = _constant(output_names, output_asts)
+            outputs = None
+        else:
+            constant = None
+            outputs = [(name, _shared(_OUTPUT_FUNCTIONS, marshal.dumps(ast), lambda: compile_ast(ast)))
+                       for name, ast in zip(output_names, output_asts)]
+        rules.append(CompiledRule(index, rule.id, rule.description, tuple(tests), outputs, constant))
+
+    return CompiledTable(table, extractors, rules, list(errors))
@@ -0,0 +1,38 @@
+"""
+Exception hierarchy for the in-process DMN engine
+"""
+
+
+class DmnError(Exception):
+    """Base class for every error raised by dmn_engine"""
+
+
+class DmnParseError(DmnError):
+    """A regra.dmn.xml file could not be read as a decision table"""
+
+    def __init__(self, message, path=None):
+        self.path = path
+        if path is not None:
+            message = f"{path}: {message}"
+        super().__init__(message)
+
+
+class FeelSyntaxError(DmnError):
+    """A FEEL unary test or expression uses syntax the compiler does not support"""
+
+    def __init__(self, message, text=None):
+        self.text = text
+        if text is not None:
+            message = f"{message} in {text!r}"
+        super().__init__(message)
+
+
+class TableNotFoundError(DmnError, KeyError):
+    """No table in the corpus matches the requested key or code"""
+
+    def __str__(self):
+        return Exception.__str__(self)
+
+
+class AmbiguousTableError(DmnError, LookupError):
+    """A code matches tables in more than one specialty or family"""
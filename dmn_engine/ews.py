@@ -0,0 +1,244 @@
+"""
+Streaming early-warning evaluation with per-patient delta re-checks
+
+Bedside monitors send a reading every few seconds per bed, and usually only
+one or two parameters change between readings. EwsMonitor keeps, for each
+patient and each EWS table (NEWS2, MEWS, PEWS, qSOFA), the last input values
+and the result of every rule test, so a reading only re-runs the tests that
+depend on the variables it changed:
+
+    monitor = EwsMonitor(Corpus())
+    monitor.observe("leito-12", {"news2ScoreTotal": 3, "hasParametroScore3": False,
+                                 "idadePaciente": 71, "cuidadosPaliativos": False})
+    # -> [{"patient": "leito-12", "table": ".../EWS-NEWS-001", "previous": None,
+    #      "nivelAlerta": "Baixo", ...}]
+    monitor.observe("leito-12", {"news2ScoreTotal": 5})
+    # -> [] unless nivelAlerta changed
+
+An alert is emitted only when a table's nivelAlerta changes (including the
+first time a table can be evaluated, when previous is None). A table is
+evaluated once every one of its inputs is known for the patient - readings
+are merged into the patient's context - so a table fed by derived scores
+waits for them instead of falling into its default rule.
+
+The tests depend on the names they read: the input column's variable plus
+any variable referenced inside the entry (`> limiteSuperior`). For each
+changed name only those tests are re-run; each rule keeps a count of its
+failing tests, and the winning rule is the first with none, exactly what
+CompiledTable.match() returns for the merged context (hitPolicy FIRST).
+
+One monitor holds the state of every patient it has seen; discharge() drops
+a patient. It is not thread-safe: give each consumer thread its own monitor
+or shard patients between them.
+"""
+
+from .engine import NEVER, parse_table
+from .errors import DmnError
+
+GROUP = "EWS"
+LEVEL_OUTPUT = "nivelAlerta"
+
+
+def _names(node, found):
+    """Add the variable names a FEEL AST reads to found"""
+    if isinstance(node, tuple):
+        if len(node) == 2 and node[0] == "name" and isinstance(node[1], str):
+            found.add(node[1])
+            return found
+        for child in node[1:]:
+            _names(child, found)
+    elif isinstance(node, list):
+        for child in node:
+            _names(child, found)
+    return found
+
+
+def _same(a, b):
+    return a == b and type(a) is type(b)
+
+
+class _Test:
+    __slots__ = ("slot", "rule", "col", "pred")
+
+    def __init__(self, slot, rule, col, pred):
+        self.slot = slot
+        self.rule = rule
+        self.col = col
+        self.pred = pred
+
+
+class _EwsTable:
+    """A compiled table with its tests indexed by the variables they read"""
+
+    def __init__(self, key, code, table, level_output):
+        self.key = key
+        self.code = code
+        self.table = table
+        self.level_output = level_output
+        input_asts, parsed_rules, _ = parse_table(table.source)
+        column_names = [_names(ast, set()) for ast in input_asts]
+        self.required = frozenset().union(*column_names)
+        self.tests = []
+        by_name = {}
+        for rule in table.rules:
+            test_asts = parsed_rules[rule.index][0]
+            for col, pred in rule.tests:
+                test = _Test(len(self.tests), rule.index, col, pred)
+                self.tests.append(test)
+                ast = test_asts[col]
+                names = column_names[col] | (set() if ast == NEVER else _names(ast, set()))
+                for name in names:
+                    by_name.setdefault(name, ([], []))
+                    by_name[name][1].append(test)
+        for name, (cols, _) in by_name.items():
+            cols.extend(c for c, names in enumerate(column_names) if name in names)
+        self.by_name = {name: (tuple(cols), tuple(tests)) for name, (cols, tests) in by_name.items()}
+
+    def known(self, ctx):
+        return all(ctx.get(name) is not None for name in self.required)
+
+    def start(self, ctx):
+        """Evaluate every test: (values, passed, failing)"""
+        values = self.table.input_values(ctx)
+        passed = bytearray(len(self.tests))
+        failing = [0] * len(self.table.rules)
+        for test in self.tests:
+            if test.pred(values[test.col], ctx):
+                passed[test.slot] = 1
+            else:
+                failing[test.rule] += 1
+        return [values, passed, failing]
+
+    def update(self, state, ctx, changed):
+        """Re-run the tests that read a changed name; True if any result flipped"""
+        values, passed, failing = state
+        extractors = self.table._extractors
+        tests = set()
+        for name in changed:
+            entry = self.by_name.get(name)
+            if entry is not None:
+                for col in entry[0]:
+                    values[col] = extractors[col](ctx)
+                tests.update(entry[1])
+        flipped = False
+        for test in tests:
+            now = 1 if test.pred(values[test.col], ctx) else 0
+            if now != passed[test.slot]:
+                passed[test.slot] = now
+                failing[test.rule] += -1 if now else 1
+                flipped = True
+        return flipped
+
+    def winner(self, state):
+        failing = state[2]
+        for index, count in enumerate(failing):
+            if count == 0:
+                return self.table.rules[index]
+        return None
+
+
+class _Patient:
+    __slots__ = ("ctx", "states", "levels", "rules")
+
+    def __init__(self):
+        self.ctx = {}
+        self.states = {}
+        self.levels = {}
+        self.rules = {}
+
+
+class EwsMonitor:
+    """Per-patient incremental evaluation of the early-warning tables"""
+
+    def __init__(self, corpus, tables=None, level_output=LEVEL_OUTPUT):
+        self.corpus = corpus
+        if tables is None:
+            refs = [ref for ref in corpus if ref.group.split("/", 1)[0] == GROUP]
+        else:
+            refs = [corpus.resolve(name) for name in tables]
+        if not refs:
+            raise DmnError("no early-warning tables to monitor")
+        self.tables = [_EwsTable(ref.key, ref.code, corpus.get(ref.key), level_output)
+                       for ref in refs]
+        self._by_name = {}
+        for entry in self.tables:
+            for name in entry.by_name.keys() | entry.required:
+                self._by_name.setdefault(name, []).append(entry)
+        self._patients = {}
+
+    def __len__(self):
+        return len(self._patients)
+
+    def observe(self, patient, reading, at=None):
+        """Merge a reading into the patient's context; return the level changes"""
+        state = self._patients.get(patient)
+        if state is None:
+            state = self._patients[patient] = _Patient()
+        ctx = state.ctx
+        changed = []
+        for name, value in reading.items():
+            if name not in ctx or not _same(ctx[name], value):
+                ctx[name] = value
+                changed.append(name)
+        if not changed:
+            return []
+
+        affected = {}
+        for name in changed:
+            for entry in self._by_name.get(name, ()):
+                affected[entry.key] = entry
+        alerts = []
+        for entry in affected.values():
+            table_state = state.states.get(entry.key)
+            if table_state is not None:
+                if not entry.known(ctx):
+                    # An input was cleared; wait until it is known again
+                    del state.states[entry.key]
+                    continue
+                if not entry.update(table_state, ctx, changed):
+                    continue
+            elif entry.known(ctx):
+                table_state = state.states[entry.key] = entry.start(ctx)
+            else:
+                continue
+            rule = entry.winner(table_state)
+            if rule is None or rule.index == state.rules.get(entry.key):
+                continue
+            state.rules[entry.key] = rule.index
+            outputs = rule.output(ctx)
+            level = outputs.get(entry.level_output)
+            previous = state.levels.get(entry.key)
+            if entry.key in state.levels and level == previous:
+                continue
+            state.levels[entry.key] = level
+            alert = {"patient": patient, "table": entry.key, "code": entry.code,
+                     "rule": rule.id, "previous": previous, entry.level_output: level}
+            for name, value in outputs.items():
+                alert.setdefault(name, value)
+            if at is not None:
+                alert["at"] = at
+            alerts.append(alert)
+        return alerts
+
+    def stream(self, readings, patient_field="paciente", time_field=None):
+        """Yield the alerts of an iterable of reading dicts that carry the patient id"""
+        for reading in readings:
+            patient = reading.get(patient_field)
+            if patient is None:
+                raise DmnError(f"reading without {patient_field!r}")
+            values = {k: v for k, v in reading.items() if k != patient_field and k != time_field}
+            at = reading.get(time_field) if time_field else None
+            yield from self.observe(patient, values, at)
+
+    def levels(self, patient):
+        """{table key: current nivelAlerta} of a patient"""
+        state = self._patients.get(patient)
+        return dict(state.levels) if state is not None else {}
+
+    def context(self, patient):
+        state = self._patients.get(patient)
+        return dict(state.ctx) if state is not None else {}
+
+    def discharge(self, patient):
+        """Forget a patient; returns True if it was known"""
+        return self._patients.pop(patient, None) is not None
@@ -0,0 +1,851 @@
+"""
+FEEL subset compiler for the regra.dmn.xml corpus
+
+Input entries (unary tests) and output entries are parsed once into a small
+tuple-based AST and then compiled into native Python closures, so evaluating
+a rule is a handful of function calls instead of re-interpreting text.
+
+Unary test AST (what parse_unary_tests returns):
+    None                                  "-" or empty entry (matches anything)
+    ("tests", [positive, ...])            comma separated disjunction
+    ("not", [positive, ...])              not(...) negation
+
+Positive tests:
+    ("eq", expr)                          input = expr
+    ("cmp", op, expr)                     < <= > >= against expr
+    ("range", lo_closed, lo, hi, hi_closed)
+    ("bool", expr)                        boolean expression (list contains, matches...)
+    ("any_of", [positive, ...])           "A" or "B"  (lenient, not standard FEEL)
+    ("all_of", [positive, ...])           X and Y
+    ("negate", [positive, ...])           not(...) nested inside a list
+
+Expression AST:
+    ("lit", value) | ("name", name) | ("input",) | ("path", expr, name)
+    ("call", fname, [expr, ...]) | ("list", [expr, ...]) | ("neg", expr)
+    ("arith", op, l, r) | ("cmp", op, l, r) | ("and", l, r) | ("or", l, r)
+
+The compiler is deliberately lenient where the corpus is sloppy: numbers with
+unit suffixes ("> 20mm"), "&gt;" left escaped, bare words used as string
+literals ("presente") and quoted literals joined with "or" all compile to the
+obvious intent instead of failing the whole table.
+"""
+
+import html
+import re
+import sys
+
+from .errors import FeelSyntaxError
+
+_TOKEN_RE = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<str>"(?:[^"\\]|\\.)*")
+  | (?P<num>\d+(?:\.\d+)?)(?P<unit>[^\W\d]\w*)?
+  | (?P<name>[^\W\d]\w*)
+  | (?P<op>\.\.|<=|>=|!=|==|[-+*/<>=(),\[\]?.])
+''', re.VERBOSE)
+
+_MULTIWORD_FUNCTIONS = {
+    ("list", "contains"): "list contains",
+    ("starts", "with"): "starts with",
+    ("ends", "with"): "ends with",
+    ("string", "length"): "string length",
+    ("upper", "case"): "upper case",
+    ("lower", "case"): "lower case",
+    ("string", "join"): "string join",
+}
+
+_COMPARISON_OPS = ("<", "<=", ">", ">=", "=", "==", "!=")
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer and parser
+# ---------------------------------------------------------------------------
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if m is None:
+            raise FeelSyntaxError(f"unexpected character {text[pos]!r}", text)
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "ws":
+            continue
+        if kind == "str":
+            tokens.append(("str", sys.intern(_unquote(m.group("str")))))
+        elif kind in ("num", "unit"):
+            raw = m.group("num")
+            tokens.append(("num", float(raw) if "." in raw else int(raw)))
+        elif kind == "name":
+            tokens.append(("name", sys.intern(m.group("name"))))
+        else:
+            tokens.append(("op", m.group("op")))
+    tokens.append(("end", None))
+    return tokens
+
+
+def _unquote(literal):
+    body = literal[1:-1]
+    if "\\" in body:
+        body = re.sub(r'\\(.)', r'\1', body)
+    return body
+
+
+class _Parser:
+
+    def __init__(self, text):
+        self.text = text
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    # -- helpers ----------------------------------------------------------
+
+    def peek(self, offset=0):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def advance(self):
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def at_op(self, *ops):
+        kind, value = self.peek()
+        return kind == "op" and value in ops
+
+    def at_keyword(self, word):
+        kind, value = self.peek()
+        return kind == "name" and value == word
+
+    def expect_op(self, op):
+        if not self.at_op(op):
+            raise FeelSyntaxError(f"expected {op!r}", self.text)
+        self.advance()
+
+    def expect_end(self):
+        if self.peek()[0] != "end":
+            raise FeelSyntaxError(f"unexpected token {self.peek()[1]!r}", self.text)
+
+    # -- unary tests ------------------------------------------------------
+
+    def unary_tests(self):
+        positives = self.positive_tests()
+        self.expect_end()
+        if all(p[0] == "negate" for p in positives):
+            # not(A, B) and the corpus idiom not(A), not(B) both mean "none of"
+            return ("not", [t for p in positives for t in p[1]])
+        return ("tests", positives)
+
+    def positive_tests(self):
+        tests = [self.positive_test()]
+        while self.at_op(","):
+            self.advance()
+            tests.append(self.positive_test())
+        return tests
+
+    def positive_test(self):
+        test = self.simple_positive_test()
+        # "< 50 or > 120", ">= 18.5 and <= 35": tests joined like expressions
+        while self.at_keyword("or") or self.at_keyword("and"):
+            combinator = "any_of" if self.advance()[1] == "or" else "all_of"
+            test = (combinator, [test, self.simple_positive_test()])
+        return test
+
+    def simple_positive_test(self):
+        if self.at_keyword("not") and self.peek(1) == ("op", "("):
+            self.advance()
+            self.advance()
+            inner = self.positive_tests()
+            self.expect_op(")")
+            return ("negate", inner)
+        kind, value = self.peek()
+        if kind == "op" and value in ("<", "<=", ">", ">="):
+            self.advance()
+            return ("cmp", value, self.additive())
+        if kind == "op" and value in ("=", "=="):
+            self.advance()
+            return ("eq", self.additive())
+        if kind == "op" and value == "!=":
+            self.advance()
+            return ("bool", ("cmp", "!=", ("input",), self.additive()))
+        if kind == "op" and value in ("[", "(", "]") and self._looks_like_range():
+            return self.interval()
+        expr = self.conjunction()
+        if self.at_op(".."):
+            # Bare "C00".."C97" without brackets: read as a closed range
+            self.advance()
+            return ("range", True, expr, self.additive(), True)
+        return _expression_to_test(expr)
+
+    def _looks_like_range(self):
+        depth = 0
+        i = self.pos + 1
+        while True:
+            kind, value = self.tokens[i]
+            if kind == "end":
+                return False
+            if kind == "op":
+                if value == ".." and depth == 0:
+                    return True
+                if value in ("(", "["):
+                    depth += 1
+                elif value in (")", "]"):
+                    if depth == 0:
+                        return False
+                    depth -= 1
+                elif value == "," and depth == 0:
+                    return False
+            i += 1
+
+    def interval(self):
+        opener = self.advance()[1]
+        lo = self.additive()
+        self.expect_op("..")
+        hi = self.additive()
+        if not self.at_op("]", ")", "["):
+            raise FeelSyntaxError("unterminated range", self.text)
+        closer = self.advance()[1]
+        if self.peek()[0] == "name" and self.peek()[1] not in ("and", "or"):
+            self.advance()  # unit suffix such as "[7..14]dias"
+        return ("range", opener == "[", lo, hi, closer == "]")
+
+    # -- expressions ------------------------------------------------------
+
+    def expression(self):
+        return self.disjunction()
+
+    def disjunction(self):
+        node = self.conjunction()
+        while self.at_keyword("or"):
+            self.advance()
+            node = ("or", node, self.conjunction())
+        return node
+
+    def conjunction(self):
+        node = self.comparison()
+        while self.at_keyword("and"):
+            self.advance()
+            node = ("and", node, self.comparison())
+        return node
+
+    def comparison(self):
+        node = self.additive()
+        kind, value = self.peek()
+        if kind == "op" and value in _COMPARISON_OPS:
+            self.advance()
+            op = "=" if value == "==" else value
+            node = ("cmp", op, node, self.additive())
+        return node
+
+    def additive(self):
+        node = self.multiplicative()
+        while self.at_op("+", "-"):
+            op = self.advance()[1]
+            node = ("arith", op, node, self.multiplicative())
+        return node
+
+    def multiplicative(self):
+        node = self.unary()
+        while self.at_op("*", "/"):
+            op = self.advance()[1]
+            node = ("arith", op, node, self.unary())
+        return node
+
+    def unary(self):
+        if self.at_keyword("not") and self.peek(1) != ("op", "("):
+            # "not temAutorizacao": prefix negation the corpus uses for booleans
+            self.advance()
+            return ("call", "not", [self.unary()])
+        if self.at_op("-"):
+            self.advance()
+            operand = self.unary()
+            if operand[0] == "lit" and isinstance(operand[1], (int, float)):
+                return ("lit", -operand[1])
+            return ("neg", operand)
+        return self.postfix()
+
+    def postfix(self):
+        node = self.primary()
+        while self.at_op(".") and self.peek(1)[0] == "name":
+            self.advance()
+            node = ("path", node, self.advance()[1])
+        return node
+
+    def primary(self):
+        kind, value = self.advance()
+        if kind == "str":
+            return ("lit", value)
+        if kind == "num":
+            return ("lit", value)
+        if kind == "op":
+            if value == "(":
+                node = self.expression()
+                self.expect_op(")")
+                return node
+            if value == "[":
+                items = []
+                if not self.at_op("]"):
+                    items.append(self.expression())
+                    while self.at_op(","):
+                        self.advance()
+                        items.append(self.expression())
+                self.expect_op("]")
+                return ("list", items)
+            if value in ("?", "."):
+                return ("input",)
+            raise FeelSyntaxError(f"unexpected {value!r}", self.text)
+        if kind == "name":
+            if value == "true":
+                return ("lit", True)
+            if value == "false":
+                return ("lit", False)
+            if value == "null":
+                return ("lit", None)
+            nxt = self.peek()
+            if nxt[0] == "name" and (value, nxt[1]) in _MULTIWORD_FUNCTIONS \
+                    and self.peek(1) == ("op", "("):
+                self.advance()
+                value = _MULTIWORD_FUNCTIONS[(value, nxt[1])]
+            if self.at_op("("):
+                self.advance()
+                args = []
+                if not self.at_op(")"):
+                    args.append(self.expression())
+                    while self.at_op(","):
+                        self.advance()
+                        args.append(self.expression())
+                self.expect_op(")")
+                if value not in _FUNCTIONS:
+                    raise FeelSyntaxError(f"unknown function {value!r}", self.text)
+                return ("call", value, args)
+            return ("name", value)
+        raise FeelSyntaxError("unexpected end of input", self.text)
+
+
+def _expression_to_test(expr):
+    tag = expr[0]
+    if tag == "or":
+        return ("any_of", [_expression_to_test(expr[1]), _expression_to_test(expr[2])])
+    if tag == "and":
+        return ("all_of", [_expression_to_test(expr[1]), _expression_to_test(expr[2])])
+    if tag in ("call", "cmp"):
+        return ("bool", expr)
+    return ("eq", expr)
+
+
+def _clean(text):
+    if text is None:
+        return ""
+    text = text.strip()
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+def parse_unary_tests(text):
+    """Parse an <inputEntry> text. Returns None for the "-" wildcard."""
+    text = _clean(text)
+    if text in ("", "-", "*"):
+        return None
+    return _Parser(text).unary_tests()
+
+
+def parse_expression(text):
+    """Parse an <outputEntry> or <inputExpression> text into an expression AST"""
+    text = _clean(text)
+    if text == "":
+        return ("lit", None)
+    parser = _Parser(text)
+    node = parser.expression()
+    parser.expect_end()
+    return node
+
+
+# ---------------------------------------------------------------------------
+# Runtime helpers
+# ---------------------------------------------------------------------------
+
+def to_number(value):
+    """Best-effort numeric coercion; None when the value is not a number"""
+    t = type(value)
+    if t is int or t is float:
+        return value
+    if t is str:
+        try:
+            return float(value.strip().replace(",", "."))
+        except ValueError:
+            return None
+    if t is bool or value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def feel_equals(a, b):
+    if a is None or b is None:
+        return a is None and b is None
+    ta, tb = type(a), type(b)
+    if ta is bool or tb is bool:
+        return ta is tb and a is b
+    if ta is str and tb is str:
+        return a == b
+    if ta is str or tb is str:
+        na, nb = to_number(a), to_number(b)
+        return na is not None and nb is not None and na == nb
+    try:
+        return a == b
+    except Exception:
+        return False
+
+
+def feel_compare(op, a, b):
+    """Ordered comparison following FEEL typing: mismatched types yield None"""
+    if a is None or b is None:
+        return None
+    if op == "=":
+        return feel_equals(a, b)
+    if op == "!=":
+        return not feel_equals(a, b)
+    if type(a) is str and type(b) is str:
+        pass
+    else:
+        a, b = to_number(a), to_number(b)
+        if a is None or b is None:
+            return None
+    if op == "<":
+        return a < b
+    if op == "<=":
+        return a <= b
+    if op == ">":
+        return a > b
+    return a >= b
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return value
+    if isinstance(value, str):
+        return [part.strip() for part in re.split(r"[,;|]", value) if part.strip()]
+    return None
+
+
+def _fn_contains(s, sub):
+    if isinstance(s, str) and isinstance(sub, str):
+        return sub in s
+    return None
+
+
+def _fn_list_contains(lst, item):
+    items = _as_list(lst)
+    if items is None:
+        return None
+    return any(feel_equals(x, item) for x in items)
+
+
+def _fn_starts_with(s, prefix):
+    if isinstance(s, str) and isinstance(prefix, str):
+        return s.startswith(prefix)
+    return None
+
+
+def _fn_ends_with(s, suffix):
+    if isinstance(s, str) and isinstance(suffix, str):
+        return s.endswith(suffix)
+    return None
+
+
+_REGEX_CACHE = {}
+
+
+def _regex(pattern, flags=None):
+    key = (pattern, flags)
+    rx = _REGEX_CACHE.get(key)
+    if rx is None:
+        f = re.IGNORECASE if flags and "i" in flags else 0
+        rx = _REGEX_CACHE[key] = re.compile(pattern, f)
+    return rx
+
+
+def _fn_matches(s, pattern, flags=None):
+    if isinstance(s, str) and isinstance(pattern, str):
+        try:
+            return _regex(pattern, flags).search(s) is not None
+        except re.error:
+            return None
+    return None
+
+
+def _fn_not(value):
+    if value is True:
+        return False
+    if value is False:
+        return True
+    return None
+
+
+def _fn_number(value, *_):
+    return to_number(value)
+
+
+def _fn_string(value):
+    if value is None:
+        return None
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    return str(value)
+
+
+def _fn_count(value):
+    items = _as_list(value)
+    return None if items is None else len(items)
+
+
+def _fn_string_length(value):
+    return len(value) if isinstance(value, str) else None
+
+
+def _fn_upper(value):
+    return value.upper() if isinstance(value, str) else None
+
+
+def _fn_lower(value):
+    return value.lower() if isinstance(value, str) else None
+
+
+def _fn_string_join(value, sep=""):
+    items = _as_list(value)
+    if items is None or not isinstance(sep, str):
+        return None
+    return sep.join(str(x) for x in items if x is not None)
+
+
+def _numbers(args):
+    if len(args) == 1:
+        args = _as_list(args[0]) or ()
+    nums = [to_number(a) for a in args]
+    return None if not nums or any(n is None for n in nums) else nums
+
+
+def _fn_sum(*args):
+    nums = _numbers(args)
+    return None if nums is None else sum(nums)
+
+
+def _fn_min(*args):
+    nums = _numbers(args)
+    return None if nums is None else min(nums)
+
+
+def _fn_max(*args):
+    nums = _numbers(args)
+    return None if nums is None else max(nums)
+
+
+def _fn_abs(value):
+    n = to_number(value)
+    return None if n is None else abs(n)
+
+
+_FUNCTIONS = {
+    "contains": _fn_contains,
+    "list contains": _fn_list_contains,
+    "starts with": _fn_starts_with,
+    "ends with": _fn_ends_with,
+    "matches": _fn_matches,
+    "not": _fn_not,
+    "number": _fn_number,
+    "string": _fn_string,
+    "count": _fn_count,
+    "string length": _fn_string_length,
+    "upper case": _fn_upper,
+    "lower case": _fn_lower,
+    "string join": _fn_string_join,
+    "sum": _fn_sum,
+    "min": _fn_min,
+    "max": _fn_max,
+    "abs": _fn_abs,
+}
+
+
+# ---------------------------------------------------------------------------
+# Expression compiler: AST -> fn(context, input_value)
+# ---------------------------------------------------------------------------
+
+def compile_ast(node):
+    tag = node[0]
+    if tag == "lit":
+        value = node[1]
+        return lambda ctx, v: value
+    if tag == "name":
+        name = node[1]
+        return lambda ctx, v: ctx.get(name)
+    if tag == "input":
+        return lambda ctx, v: v
+    if tag == "path":
+        base = compile_ast(node[1])
+        key = node[2]
+
+        def path(ctx, v):
+            obj = base(ctx, v)
+            return obj.get(key) if isinstance(obj, dict) else None
+        return path
+    if tag == "list":
+        items = [compile_ast(n) for n in node[1]]
+        return lambda ctx, v: [f(ctx, v) for f in items]
+    if tag == "neg":
+        operand = compile_ast(node[1])
+
+        def neg(ctx, v):
+            n = to_number(operand(ctx, v))
+            return None if n is None else -n
+        return neg
+    if tag == "call":
+        return _compile_call(node[1], node[2])
+    if tag == "arith":
+        return _compile_arith(node[1], compile_ast(node[2]), compile_ast(node[3]))
+    if tag == "cmp":
+        op = node[1]
+        left, right = compile_ast(node[2]), compile_ast(node[3])
+        return lambda ctx, v: feel_compare(op, left(ctx, v), right(ctx, v))
+    if tag == "and":
+        left, right = compile_ast(node[1]), compile_ast(node[2])
+
+        def conj(ctx, v):
+            a = left(ctx, v)
+            if a is False:
+                return False
+            b = right(ctx, v)
+            if b is False:
+                return False
+            return True if a is True and b is True else None
+        return conj
+    if tag == "or":
+        left, right = compile_ast(node[1]), compile_ast(node[2])
+
+        def disj(ctx, v):
+            a = left(ctx, v)
+            if a is True:
+                return True
+            b = right(ctx, v)
+            if b is True:
+                return True
+            return False if a is False and b is False else None
+        return disj
+    raise FeelSyntaxError(f"cannot compile node {tag!r}")
+
+
+def _compile_call(fname, arg_nodes):
+    func = _FUNCTIONS[fname]
+    # Precompile literal regex patterns so matches() never hits the cache lookup
+    if fname == "matches" and len(arg_nodes) == 2 and arg_nodes[1][0] == "lit" \
+            and isinstance(arg_nodes[1][1], str):
+        try:
+            rx = re.compile(arg_nodes[1][1])
+        except re.error as exc:
+            raise FeelSyntaxError(f"invalid regex: {exc}", arg_nodes[1][1])
+        subject = compile_ast(arg_nodes[0])
+
+        def matches(ctx, v):
+            s = subject(ctx, v)
+            return rx.search(s) is not None if isinstance(s, str) else None
+        return matches
+    args = [compile_ast(n) for n in arg_nodes]
+    if len(args) == 1:
+        a0 = args[0]
+        return lambda ctx, v: func(a0(ctx, v))
+    if len(args) == 2:
+        a0, a1 = args
+        return lambda ctx, v: func(a0(ctx, v), a1(ctx, v))
+    return lambda ctx, v: func(*[a(ctx, v) for a in args])
+
+
+def _compile_arith(op, left, right):
+
+    def arith(ctx, v):
+        a, b = left(ctx, v), right(ctx, v)
+        if op == "+" and (isinstance(a, str) or isinstance(b, str)):
+            if a is None or b is None:
+                return None
+            return f"{_fn_string(a)}{_fn_string(b)}"
+        a, b = to_number(a), to_number(b)
+        if a is None or b is None:
+            return None
+        if op == "+":
+            return a + b
+        if op == "-":
+            return a - b
+        if op == "*":
+            return a * b
+        return a / b if b else None
+    return arith
+
+
+def compile_expression(text):
+    """Compile an expression text into fn(context, input_value=None)"""
+    fn = compile_ast(parse_expression(text))
+    return lambda ctx, v=None: fn(ctx, v)
+
+
+# ---------------------------------------------------------------------------
+# Unary test compiler: AST -> predicate(input_value, context) -> bool
+# ---------------------------------------------------------------------------
+
+def compile_unary_tests(tests):
+    """Compile a parsed unary test into predicate(value, context) -> bool.
+
+    Accepts either the AST from parse_unary_tests or raw entry text.
+    Returns None for wildcards so callers can drop the column entirely.
+    """
+    if isinstance(tests, str):
+        tests = parse_unary_tests(tests)
+    if tests is None:
+        return None
+    kind, positives = tests
+    pred = _compile_disjunction(positives)
+    if kind == "not":
+        return lambda v, ctx: not pred(v, ctx)
+    return pred
+
+
+def _list_contains_literal(test):
+    """(subject AST, item) for a `list contains(x, "literal")` test, else None"""
+    if test[0] == "bool" and test[1][0] == "call" and test[1][1] == "list contains":
+        subject, item = test[1][2]
+        if item[0] == "lit" and type(item[1]) is str:
+            return subject, item[1]
+    return None
+
+
+def _compile_membership(subject, items):
+    fn = compile_ast(subject)
+    choices = frozenset(items)
+
+    def any_member(v, ctx):
+        lst = fn(ctx, v)
+        if type(lst) is str:
+            lst = _as_list(lst)
+        elif not isinstance(lst, (list, tuple, set, frozenset)):
+            return False
+        return not choices.isdisjoint(lst)
+    return any_member
+
+
+def _compile_disjunction(positives):
+    flat = []
+    stack = list(reversed(positives))
+    while stack:
+        p = stack.pop()
+        if p[0] == "any_of":
+            stack.extend(reversed(p[1]))
+        else:
+            flat.append(p)
+
+    strings = []
+    memberships = {}
+    others = []
+    for p in flat:
+        if p[0] == "eq" and p[1][0] == "lit" and type(p[1][1]) is str:
+            strings.append(p[1][1])
+            continue
+        lc = _list_contains_literal(p)
+        if lc is not None:
+            memberships.setdefault(lc[0], []).append(lc[1])
+            continue
+        others.append(_compile_positive(p))
+
+    preds = []
+    if len(strings) == 1:
+        s = strings[0]
+        preds.append(lambda v, ctx: v == s)
+    elif strings:
+        choices = frozenset(strings)
+        preds.append(lambda v, ctx: type(v) is str and v in choices)
+    for subject, items in memberships.items():
+        preds.append(_compile_membership(subject, items))
+    preds.extend(others)
+    if len(preds) == 1:
+        return preds[0]
+    return lambda v, ctx: any(p(v, ctx) for p in preds)
+
+
+def _compile_positive(test):
+    tag = test[0]
+    if tag == "eq":
+        return _compile_equality(test[1])
+    if tag == "cmp":
+        return _compile_comparison(test[1], test[2])
+    if tag == "range":
+        return _compile_range(*test[1:])
+    if tag == "bool":
+        lc = _list_contains_literal(test)
+        if lc is not None:
+            return _compile_membership(*lc)
+        fn = compile_ast(test[1])
+        return lambda v, ctx: fn(ctx, v) is True
+    if tag == "any_of":
+        return _compile_disjunction(test[1])
+    if tag == "all_of":
+        preds = [_compile_positive(p) for p in test[1]]
+        return lambda v, ctx: all(p(v, ctx) for p in preds)
+    if tag == "negate":
+        pred = _compile_disjunction(test[1])
+        return lambda v, ctx: not pred(v, ctx)
+    raise FeelSyntaxError(f"cannot compile test {tag!r}")
+
+
+def _compile_equality(expr):
+    if expr[0] == "lit":
+        lit = expr[1]
+        if lit is None:
+            return lambda v, ctx: v is None
+        if lit is True or lit is False:
+            return lambda v, ctx: v is lit
+        if type(lit) is str:
+            return lambda v, ctx: v == lit
+        return lambda v, ctx: to_number(v) == lit
+    if expr[0] == "name":
+        # Bare words such as `presente` are almost always meant as string
+        # literals; only treat them as variables when the context has them.
+        name = expr[1]
+        return lambda v, ctx: feel_equals(v, ctx.get(name, name))
+    fn = compile_ast(expr)
+    return lambda v, ctx: feel_equals(v, fn(ctx, v))
+
+
+def _compile_comparison(op, expr):
+    if expr[0] == "lit" and isinstance(expr[1], (int, float)) and type(expr[1]) is not bool:
+        n = expr[1]
+        if op == "<":
+            return lambda v, ctx: (x := to_number(v)) is not None and x < n
+        if op == "<=":
+            return lambda v, ctx: (x := to_number(v)) is not None and x <= n
+        if op == ">":
+            return lambda v, ctx: (x := to_number(v)) is not None and x > n
+        return lambda v, ctx: (x := to_number(v)) is not None and x >= n
+    fn = compile_ast(expr)
+    return lambda v, ctx: feel_compare(op, v, fn(ctx, v)) is True
+
+
+def _compile_range(lo_closed, lo, hi, hi_closed):
+    if lo[0] == "lit" and hi[0] == "lit" and all(
+            isinstance(x, (int, float)) and type(x) is not bool for x in (lo[1], hi[1])):
+        a, b = lo[1], hi[1]
+        if lo_closed and hi_closed:
+            return lambda v, ctx: (x := to_number(v)) is not None and a <= x <= b
+        if lo_closed:
+            return lambda v, ctx: (x := to_number(v)) is not None and a <= x < b
+        if hi_closed:
+            return lambda v, ctx: (x := to_number(v)) is not None and a < x <= b
+        return lambda v, ctx: (x := to_number(v)) is not None and a < x < b
+    lo_fn, hi_fn = compile_ast(lo), compile_ast(hi)
+    lo_op = ">=" if lo_closed else ">"
+    hi_op = "<=" if hi_closed else "<"
+
+    def in_range(v, ctx):
+        return feel_compare(lo_op, v, lo_fn(ctx, v)) is True \
+            and feel_compare(hi_op, v, hi_fn(ctx, v)) is True
+    return in_range
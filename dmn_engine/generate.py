@@ -0,0 +1,236 @@
+"""
+Incremental generation of regra.dmn.xml files from procedure specs
+
+A specialty that generates its tables keeps the inputs in a `_generator/`
+directory next to the TUSS directories:
+
+    ginecologia-e-obstetricia/_generator/
+        spec.json            templates + one entry per TUSS code
+        *.xml.tmpl           str.format templates (document and rule blocks)
+        manifest.json        hashes of what was last generated (written by us)
+
+spec.json:
+
+    {
+      "templates": {"document": "document.xml.tmpl", "input": "input.xml.tmpl",
+                    "rule_1x5_desc": "rule_1x5_desc.xml.tmpl", ...},
+      "output": "{tuss}/regra.dmn.xml",
+      "defaults": {"notes": [], "diagram": []},
+      "procedures": {
+        "31303153": {
+          "title": "Traquelectomia",
+          "name": "Indicação de Traquelectomia",
+          "inputs": [{"template": "input", "id": "Input_1", "label": "CID", ...}],
+          "rules": [{"template": "rule_1x5_desc", "id": "Rule_31303153_1",
+                     "inputs": ["\"N84.1\""], "outputs": ["\"Aprovado\"", ...]}]
+        }
+      }
+    }
+
+A procedure value that is a list of {"template": ...} items is a block: it is
+rendered item by item (each item sees the procedure fields, its own fields
+and `tuss`) and joined with newlines, and an empty list renders as nothing.
+The document template then receives every field. Templates may index list
+fields ("{inputs[0]}"). "defaults" holds fields every procedure gets unless
+it sets them itself.
+
+generate() only writes a file when the hash of its spec entry or of the
+templates changed since the manifest was written, or when the file is
+missing. Files the manifest does not know about, or that were edited by hand
+after generation, are left alone unless force=True. Writes are atomic (temp
+file + rename, no .bak copies) and rendering runs on a thread pool.
+"""
+
+import difflib
+import hashlib
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .corpus import DEFAULT_ROOT
+from .errors import DmnError
+
+GENERATOR_DIR = "_generator"
+SPEC_FILENAME = "spec.json"
+MANIFEST_FILENAME = "manifest.json"
+DEFAULT_OUTPUT = "{tuss}/regra.dmn.xml"
+
+# Per-file outcomes reported by generate()
+WRITTEN = "written"
+UNCHANGED = "unchanged"
+UNMANAGED = "unmanaged"
+MODIFIED = "modified"
+
+
+def _sha1(data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha1(data).hexdigest()
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+def find_specs(root=None):
+    """Every _generator/spec.json under root, in sorted order"""
+    root = Path(root or DEFAULT_ROOT)
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith("."))
+        if Path(dirpath).name == GENERATOR_DIR and SPEC_FILENAME in filenames:
+            found.append(Path(dirpath) / SPEC_FILENAME)
+    return found
+
+
+class Spec:
+    """A loaded spec.json with its templates"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.dir = self.path.parent
+        self.base = self.dir.parent
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.output = data.get("output", DEFAULT_OUTPUT)
+        self.defaults = data.get("defaults", {})
+        self.procedures = data.get("procedures", {})
+        self.templates = {}
+        for name, filename in sorted(data.get("templates", {}).items()):
+            with open(self.dir / filename, encoding="utf-8") as f:
+                self.templates[name] = f.read()
+        if "document" not in self.templates:
+            raise DmnError(f"{self.path}: templates must define 'document'")
+        self.template_hash = _sha1(_canonical(self.templates) + _canonical(self.output)
+                                   + _canonical(self.defaults))
+
+    def render(self, tuss):
+        """The file content for one procedure"""
+        proc = {**self.defaults, **self.procedures[tuss]}
+        fields = {k: v for k, v in proc.items() if not _is_block(v)}
+        fields["tuss"] = tuss
+        values = dict(fields)
+        for key, value in proc.items():
+            if _is_block(value):
+                values[key] = "\n".join(self._render_item(item, fields, tuss) for item in value)
+        try:
+            return self.templates["document"].format(**values)
+        except (KeyError, IndexError, ValueError) as exc:
+            raise DmnError(f"{self.path}: {tuss}: document template: {exc!r}") from None
+
+    def _render_item(self, item, fields, tuss):
+        name = item["template"]
+        template = self.templates.get(name)
+        if template is None:
+            raise DmnError(f"{self.path}: {tuss}: unknown template {name!r}")
+        try:
+            return template.format(**{**fields, **item})
+        except (KeyError, IndexError, ValueError) as exc:
+            raise DmnError(f"{self.path}: {tuss}: template {name}: {exc!r}") from None
+
+    def spec_hash(self, tuss):
+        return _sha1(_canonical(self.procedures[tuss]))
+
+    def output_path(self, tuss):
+        return self.base / self.output.format(tuss=tuss)
+
+
+def _is_block(value):
+    # An empty list is an empty block: it renders as ""
+    return isinstance(value, list) and all(isinstance(i, dict) and "template" in i for i in value)
+
+
+def _load_manifest(spec):
+    path = spec.dir / MANIFEST_FILENAME
+    if not path.is_file():
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_atomic(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def _plan(spec, tuss, recorded, force):
+    """(status, current text, new text or None, manifest entry) for one procedure"""
+    path = spec.output_path(tuss)
+    entry = {"spec": spec.spec_hash(tuss), "template": spec.template_hash}
+    try:
+        with open(path, encoding="utf-8", newline="") as f:
+            current = f.read()
+    except FileNotFoundError:
+        current = None
+
+    if current is not None and not force:
+        if recorded is None:
+            return UNMANAGED, current, None, recorded
+        if _sha1(current) != recorded.get("output"):
+            return MODIFIED, current, None, recorded
+        if recorded.get("spec") == entry["spec"] and recorded.get("template") == entry["template"]:
+            return UNCHANGED, current, None, recorded
+
+    text = spec.render(tuss)
+    entry["output"] = _sha1(text)
+    if text == current:
+        return UNCHANGED, current, None, entry
+    return WRITTEN, current, text, entry
+
+
+def _run(spec, tuss, recorded, force, dry_run):
+    status, current, text, entry = _plan(spec, tuss, recorded, force)
+    patch = None
+    if status == WRITTEN:
+        path = spec.output_path(tuss)
+        if dry_run:
+            patch = _unified_diff(path, current, text)
+        else:
+            _write_atomic(path, text)
+    return status, entry, patch
+
+
+def generate(root=None, specs=None, dry_run=False, force=False, workers=None, diff=None):
+    """Regenerate the outputs of every spec (or the given spec.json paths).
+
+    Returns a list of (path, status) for every procedure. With dry_run=True
+    nothing is written and, if diff is a callable, it receives the unified
+    diff of each file that would change, in procedure order.
+    """
+    specs = [Spec(p) for p in (specs or find_specs(root))]
+    report = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for spec in specs:
+            manifest = _load_manifest(spec)
+            codes = sorted(spec.procedures)
+            jobs = pool.map(lambda c: _run(spec, c, manifest.get(c), force, dry_run), codes)
+            new_manifest = {}
+            for tuss, (status, entry, patch) in zip(codes, jobs):
+                if entry is not None:
+                    new_manifest[tuss] = entry
+                if patch is not None and diff is not None:
+                    diff(patch)
+                report.append((spec.output_path(tuss), status))
+            if not dry_run and new_manifest != manifest:
+                _write_atomic(spec.dir / MANIFEST_FILENAME,
+                              json.dumps(new_manifest, indent=2, sort_keys=True) + "\n")
+    return report
+
+
+def _unified_diff(path, current, text):
+    return "".join(difflib.unified_diff(
+        (current or "").splitlines(keepends=True),
+        text.splitlines(keepends=True),
+        fromfile=f"a/{os.path.relpath(path)}",
+        tofile=f"b/{os.path.relpath(path)}",
+    ))
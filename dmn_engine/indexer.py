@@ -0,0 +1,397 @@
+"""
+Incremental rebuild of the family index files
+
+Three families ship a hand-maintained JSON index that drifted from the tree
+(totalRules 0 in _index.json, 50 DDI rules listed for 68 tables, stale
+dmnFile paths). rebuild_indexes() regenerates the computed parts of
+
+    Regras-Audit-Operadora/_index.json
+    Regras-Adm-Hospitais/HOSPITAL_RULES_INDEX.json
+    Regras-Clinicas-Hospitais/CLINICAL_ALERTS_INDEX.json
+
+from the tables on disk - rule counts, input variables, hit policy - and
+leaves every hand-written field (titles, compliance, descriptions) alone.
+
+Each table entry records the sha1 of its regra.dmn.xml and metadata.json, so
+the index file itself is the hash cache: a table whose hashes match its
+previous entry is not parsed again, and a file is only rewritten (with a new
+generatedAt) when its content actually changes. The rewrite splices the
+changed values into the original text, so the layout of the hand-written
+parts (inline arrays, accented text) is kept byte for byte.
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .corpus import DEFAULT_ROOT, discover
+from .errors import DmnParseError
+from .loader import load_table
+
+INDEX_FILES = {
+    "Regras-Audit-Operadora": "_index.json",
+    "Regras-Adm-Hospitais": "HOSPITAL_RULES_INDEX.json",
+    "Regras-Clinicas-Hospitais": "CLINICAL_ALERTS_INDEX.json",
+}
+
+# Fields of a table entry that are derived from the files and reused on a hash hit
+_SUMMARY_FIELDS = ("inputs", "inputVariables", "outputs", "hitPolicy", "decisionRules")
+
+
+def _sha1(path):
+    if path is None:
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _metadata_name(metadata):
+    if not isinstance(metadata, dict):
+        return None
+    for key in ("name", "ruleName", "nome", "title", "titulo"):
+        value = metadata.get(key)
+        if isinstance(value, str) and value:
+            return value
+    return None
+
+
+class _Summarizer:
+    """Builds table entries, reusing previous ones whose hashes still match"""
+
+    def __init__(self, previous):
+        self.previous = previous
+        self.parsed = 0
+        self.reused = 0
+
+    def entry(self, ref, relpath):
+        sha1 = _sha1(ref.path)
+        meta_sha1 = _sha1(ref.metadata_path)
+        old = self.previous.get(relpath) or {}
+        entry = {}
+        if (old.get("sha1") == sha1 and old.get("metadataSha1") == meta_sha1
+                and all(k in old for k in _SUMMARY_FIELDS) and old.get("status") != "invalid"):
+            self.reused += 1
+            for k in ("name", "status") + _SUMMARY_FIELDS:
+                if k in old:
+                    entry[k] = old[k]
+        else:
+            self.parsed += 1
+            entry.update(self._summarize(ref, old))
+        entry["sha1"] = sha1
+        entry["metadataSha1"] = meta_sha1
+        return entry
+
+    def _summarize(self, ref, old):
+        metadata = None
+        try:
+            metadata = ref.load_metadata()
+        except ValueError:
+            pass
+        status = metadata.get("status") if isinstance(metadata, dict) else None
+        try:
+            table = load_table(ref.path)
+        except DmnParseError as exc:
+            return {"name": old.get("name") or ref.code, "status": "invalid", "error": str(exc)}
+        return {
+            "name": old.get("name") or _metadata_name(metadata) or table.name or ref.code,
+            "status": status if isinstance(status, str) else "active",
+            "inputs": len(table.inputs),
+            "inputVariables": [c.expression for c in table.inputs],
+            "outputs": len(table.outputs),
+            "hitPolicy": table.hit_policy,
+            "decisionRules": len(table.rules),
+        }
+
+
+def _tables(root, family):
+    """(ref, path relative to the family directory) for every table of a family"""
+    base = Path(root) / family
+    for ref in discover(root, (family,)):
+        yield ref, Path(ref.path).relative_to(base).as_posix()
+
+
+def _count_active(entries):
+    return sum(1 for e in entries if e.get("status") == "active")
+
+
+def _update_audit(doc, root, family):
+    previous = {}
+    for spec in doc.get("specialties", []):
+        for e in spec.get("rules", []):
+            previous[e.get("path")] = e
+    summarizer = _Summarizer(previous)
+
+    by_slug = {}
+    for ref, relpath in _tables(root, family):
+        slug = ref.group.split("/", 1)[0]
+        entry = {"code": ref.code, "path": relpath}
+        entry.update(summarizer.entry(ref, relpath))
+        by_slug.setdefault(slug, []).append(entry)
+
+    specialties = doc.setdefault("specialties", [])
+    known = {s.get("slug") for s in specialties}
+    for slug in sorted(by_slug):
+        if slug not in known:
+            specialties.append({
+                "name": slug.replace("-", " ").title(),
+                "slug": slug,
+                "path": f"{slug}/",
+                "rulesCount": 0,
+            })
+    for spec in specialties:
+        rules = by_slug.get(spec.get("slug"), [])
+        spec["rulesCount"] = len(rules)
+        spec["rules"] = rules
+    doc["totalSpecialties"] = len(specialties)
+    doc["totalRules"] = sum(s["rulesCount"] for s in specialties)
+    return summarizer
+
+
+def _update_adm(doc, root, family):
+    previous = {}
+    for cat in doc.get("categories", {}).values():
+        for sub in cat.get("rules", {}).values():
+            for e in sub.get("rules", []):
+                previous[e.get("path")] = e
+    summarizer = _Summarizer(previous)
+
+    tree = {}
+    for ref, relpath in _tables(root, family):
+        cat, sub = (ref.group.split("/") + [""])[:2]
+        entry = {"id": ref.code}
+        entry.update(summarizer.entry(ref, relpath))
+        entry["path"] = relpath
+        tree.setdefault(cat, {}).setdefault(sub, []).append(entry)
+
+    categories = doc.setdefault("categories", {})
+    for cat in sorted(tree):
+        info = categories.setdefault(cat, {"name": cat, "path": f"{cat}/"})
+        old_subs = info.get("rules", {})
+        subs = {}
+        for sub in sorted(tree[cat]):
+            rules = tree[cat][sub]
+            subs[sub] = {
+                "description": old_subs.get(sub, {}).get("description", sub),
+                "count": len(rules),
+                "rules": rules,
+            }
+        info["count"] = sum(s["count"] for s in subs.values())
+        info["subcategories"] = len(subs)
+        info["subcategoryList"] = sorted(subs)
+        info["rules"] = subs
+    for cat in list(categories):
+        if cat not in tree:
+            del categories[cat]
+    entries = [e for c in tree.values() for rules in c.values() for e in rules]
+    doc["totalRules"] = len(entries)
+    doc["activeRules"] = _count_active(entries)
+    return summarizer
+
+
+def _clinical_subcategory(category, group):
+    parts = group.split("/")
+    sub = parts[1] if len(parts) > 1 else ""
+    prefix = category + "-"
+    return sub[len(prefix):] if sub.startswith(prefix) else sub
+
+
+def _update_clinical(doc, root, family):
+    previous = {e.get("dmnFile"): e for e in doc.get("allRulesList", [])}
+    summarizer = _Summarizer(previous)
+
+    rules = []
+    for ref, relpath in _tables(root, family):
+        category = ref.group.split("/", 1)[0]
+        entry = {
+            "code": ref.code,
+            "category": category,
+            "subcategory": _clinical_subcategory(category, ref.group),
+        }
+        entry.update(summarizer.entry(ref, relpath))
+        entry["dmnFile"] = relpath
+        rules.append(entry)
+
+    categories = doc.setdefault("categories", {})
+    by_cat = {}
+    for e in rules:
+        by_cat.setdefault(e["category"], []).append(e)
+    for cat in sorted(by_cat):
+        entries = by_cat[cat]
+        info = categories.setdefault(cat, {"name": cat, "path": f"{cat}/"})
+        subs = sorted({e["subcategory"] for e in entries if e["subcategory"]})
+        info["count"] = len(entries)
+        info["subcategories"] = len(subs)
+        info["activeRules"] = _count_active(entries)
+        info["subcategoryList"] = subs
+
+    doc["totalRules"] = len(rules)
+    doc["activeRules"] = _count_active(rules)
+    status = doc.get("implementationStatus")
+    if isinstance(status, dict):
+        status["totalDirectories"] = len(rules)
+        status["dmnFilesCreated"] = len(rules)
+        status["metadataFilesCreated"] = sum(1 for e in rules if e["metadataSha1"] is not None)
+    doc["allRulesList"] = rules
+    return summarizer
+
+
+_UPDATERS = {
+    "Regras-Audit-Operadora": _update_audit,
+    "Regras-Adm-Hospitais": _update_adm,
+    "Regras-Clinicas-Hospitais": _update_clinical,
+}
+
+
+_DECODER = json.JSONDecoder()
+_SPACE = re.compile(r"[ \t\r\n]*")
+
+
+def _skip(text, pos):
+    return _SPACE.match(text, pos).end()
+
+
+def _members(text, pos):
+    """Value spans of the object or array at text[pos]: {key: (start, end)} or [(start, end)]"""
+    is_object = text[pos] == "{"
+    closing = "}" if is_object else "]"
+    spans = {} if is_object else []
+    pos = _skip(text, pos + 1)
+    if text[pos] == closing:
+        return spans
+    while True:
+        if is_object:
+            key, pos = _DECODER.raw_decode(text, pos)
+            pos = _skip(text, _skip(text, pos) + 1)  # past the ":"
+        start = pos
+        _, pos = _DECODER.raw_decode(text, pos)
+        if is_object:
+            spans[key] = (start, pos)
+        else:
+            spans.append((start, pos))
+        pos = _skip(text, pos)
+        if text[pos] != ",":
+            return spans
+        pos = _skip(text, pos + 1)
+
+
+def _indent(text, pos):
+    """Leading whitespace of the line holding text[pos]"""
+    line_start = text.rfind("\n", 0, pos) + 1
+    return text[line_start:_SPACE.match(text, line_start).end()].replace("\n", "")
+
+
+def _render(value, text, start, end):
+    """JSON for value in the layout of the text it replaces"""
+    if "\n" not in text[start:end]:
+        # Kept on one line, like the inline arrays of the hand-written files
+        return json.dumps(value, ensure_ascii=False)
+    indent = _indent(text, start)
+    if isinstance(value, list) and value and text[start] == "[":
+        spans = _members(text, start)
+        if spans and all("\n" not in text[s:e] for s, e in spans):
+            # One element per line, as in allRulesList of CLINICAL_ALERTS_INDEX.json
+            item_indent = _indent(text, spans[0][0])
+            items = ",\n".join(item_indent + json.dumps(v, ensure_ascii=False) for v in value)
+            return f"[\n{items}\n{indent}]"
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + indent)
+
+
+def _same(a, b):
+    return a == b and json.dumps(a) == json.dumps(b)
+
+
+def _edits(text, start, end, old, new, edits):
+    """Collect (start, end, replacement) for the values of new that differ from old"""
+    if _same(old, new):
+        return
+    if isinstance(old, dict) and isinstance(new, dict) and old \
+            and list(new)[:len(old)] == list(old):
+        # Same keys, possibly with new ones appended: edit in place, insert the rest
+        spans = _members(text, start)
+        for key in old:
+            _edits(text, *spans[key], old[key], new[key], edits)
+        last = max(e for _, e in spans.values())
+        indent = _indent(text, min(s for s, _ in spans.values()))
+        added = "".join(
+            f",\n{indent}{json.dumps(key, ensure_ascii=False)}: "
+            + json.dumps(new[key], indent=2, ensure_ascii=False).replace("\n", "\n" + indent)
+            for key in list(new)[len(old):])
+        if added:
+            edits.append((last, last, added))
+    elif isinstance(old, list) and isinstance(new, list) and len(old) == len(new):
+        for (s, e), a, b in zip(_members(text, start), old, new):
+            _edits(text, s, e, a, b, edits)
+    else:
+        edits.append((start, end, _render(new, text, start, end)))
+
+
+def _dump(doc, original):
+    """original with only the values doc changed rewritten; the rest keeps its bytes"""
+    start = _skip(original, 0)
+    _, end = _DECODER.raw_decode(original, start)
+    edits = []
+    _edits(original, start, end, json.loads(original), doc, edits)
+    parts = []
+    pos = 0
+    for s, e, replacement in sorted(edits):
+        parts.append(original[pos:s])
+        parts.append(replacement)
+        pos = e
+    parts.append(original[pos:])
+    return "".join(parts)
+
+
+def _write_atomic(path, text):
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", dir=path.parent)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def rebuild_index(family, root=None, write=True):
+    """Rebuild the index file of one family.
+
+    Returns a dict with the index path, whether its content changed and how
+    many tables were parsed versus reused from their recorded hashes. With
+    write=False nothing is written (used by `index --check`).
+    """
+    root = Path(root or DEFAULT_ROOT)
+    path = root / family / INDEX_FILES[family]
+    with open(path, encoding="utf-8") as f:
+        original = f.read()
+    doc = json.loads(original)
+    summarizer = _UPDATERS[family](doc, root, family)
+
+    # generatedAt is untouched by the updaters, so an unchanged tree compares equal
+    changed = _dump(doc, original) != original
+    if changed:
+        if "generatedAt" in doc:
+            doc["generatedAt"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        if write:
+            _write_atomic(path, _dump(doc, original))
+    return {
+        "path": str(path),
+        "changed": changed,
+        "parsed": summarizer.parsed,
+        "reused": summarizer.reused,
+        "tables": summarizer.parsed + summarizer.reused,
+    }
+
+
+def rebuild_indexes(root=None, families=tuple(INDEX_FILES), write=True):
+    """Rebuild every family index file; returns one result dict per family"""
+    root = Path(root or DEFAULT_ROOT)
+    return [
+        rebuild_index(family, root, write)
+        for family in families
+        if (root / family / INDEX_FILES[family]).is_file()
+    ]
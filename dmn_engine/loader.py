@@ -0,0 +1,174 @@
+"""
+XML loader for regra.dmn.xml files
+
+Reads DMN 1.1/1.3 documents (with or without the OMG namespace) into the
+plain model.DecisionTable objects. A number of corpus files are not
+well-formed XML - raw "<" inside descriptions such as "PTI recente (<12 meses)"
+or a camunda: attribute without its xmlns declaration. Those are repaired in
+memory and the table is flagged with repaired=True instead of being dropped.
+"""
+
+import re
+import sys
+import xml.etree.ElementTree as ET
+
+from .errors import DmnParseError
+from .model import DecisionTable, InputClause, OutputClause, Rule
+
+_KNOWN_PREFIXES = {
+    "camunda": "http://camunda.org/schema/1.0/dmn",
+    "dmndi": "https://www.omg.org/spec/DMN/20191111/DMNDI/",
+    "dc": "http://www.omg.org/spec/DMN/20180521/DC/",
+    "di": "http://www.omg.org/spec/DMN/20180521/DI/",
+    "biodi": "http://bpmn.io/schema/dmn/biodi/2.0",
+}
+
+_STRAY_LT = re.compile(rb"<(?![A-Za-z_/!?])")
+_TEXT_BODY = re.compile(rb"(<(text|description)>)(.*?)(</\2>)", re.DOTALL)
+_BODY_LT = re.compile(rb"<(?!!\[CDATA\[)")
+_STRAY_AMP = re.compile(rb"&(?!#?\w+;)")
+_ROOT_TAG = re.compile(rb"<definitions\b")
+
+
+def _local(tag):
+    return tag.rsplit("}", 1)[-1] if tag[:1] == "{" else tag
+
+
+def _child(elem, name):
+    for c in elem:
+        if _local(c.tag) == name:
+            return c
+    return None
+
+
+def _children(elem, name):
+    return [c for c in elem if _local(c.tag) == name]
+
+
+def _text(elem):
+    """Text of the <text> child of elem, or None.
+
+    Entry texts repeat across thousands of rules ("-", "true", the same
+    observacao), so they are interned: every copy is one string object.
+    """
+    if elem is None:
+        return None
+    t = _child(elem, "text")
+    if t is None:
+        return None
+    return sys.intern(t.text.strip()) if t.text else ""
+
+
+def _attr(elem, name):
+    value = elem.get(name) if elem is not None else None
+    return sys.intern(value) if value is not None else None
+
+
+def repair_xml(data):
+    """Best-effort fix for the malformations found in the corpus"""
+    data = _TEXT_BODY.sub(
+        lambda m: m.group(1) + _BODY_LT.sub(b"&lt;", m.group(3)) + m.group(4), data)
+    data = _STRAY_LT.sub(b"&lt;", data)
+    data = _STRAY_AMP.sub(b"&amp;", data)
+    m = _ROOT_TAG.search(data)
+    if m:
+        head_end = data.find(b">", m.end())
+        head = data[m.start():head_end]
+        decls = b"".join(
+            b' xmlns:%s="%s"' % (prefix.encode(), uri.encode())
+            for prefix, uri in _KNOWN_PREFIXES.items()
+            if (prefix.encode() + b":") in data and (b"xmlns:" + prefix.encode() + b"=") not in head
+        )
+        if decls:
+            data = data[:m.end()] + decls + data[m.end():]
+    return data
+
+
+def parse_dmn(data, path=None):
+    """Parse DMN XML bytes into a DecisionTable"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    repaired = False
+    try:
+        root = ET.fromstring(data)
+    except ET.ParseError as first_error:
+        try:
+            root = ET.fromstring(repair_xml(data))
+        except ET.ParseError:
+            raise DmnParseError(f"malformed XML ({first_error})", path) from None
+        repaired = True
+
+    if _local(root.tag) != "definitions":
+        raise DmnParseError(f"root element is <{_local(root.tag)}>, expected <definitions>", path)
+
+    table_elem = decision = None
+    extra = []
+    for d in _children(root, "decision"):
+        dt = _child(d, "decisionTable")
+        if dt is None:
+            continue
+        if table_elem is None:
+            decision, table_elem = d, dt
+        else:
+            extra.append(d.get("id"))
+    if table_elem is None:
+        raise DmnParseError("no <decisionTable> found", path)
+
+    inputs = []
+    for inp in _children(table_elem, "input"):
+        expr = _child(inp, "inputExpression")
+        inputs.append(InputClause(
+            id=inp.get("id"),
+            label=inp.get("label"),
+            expression=_text(expr) or "",
+            type_ref=_attr(expr, "typeRef"),
+            input_values=_text(_child(inp, "inputValues")),
+        ))
+
+    outputs = []
+    for out in _children(table_elem, "output"):
+        outputs.append(OutputClause(
+            id=out.get("id"),
+            name=out.get("name") or out.get("label") or out.get("id") or "",
+            label=out.get("label"),
+            type_ref=_attr(out, "typeRef"),
+            output_values=_text(_child(out, "outputValues")),
+        ))
+
+    rules = []
+    for r in _children(table_elem, "rule"):
+        desc = _child(r, "description")
+        if desc is not None and desc.text:
+            desc = sys.intern(desc.text.strip())
+        else:
+            desc = None
+        rules.append(Rule(
+            id=r.get("id"),
+            description=desc,
+            input_entries=[_text(e) or "" for e in _children(r, "inputEntry")],
+            output_entries=[_text(e) or "" for e in _children(r, "outputEntry")],
+        ))
+
+    return DecisionTable(
+        id=table_elem.get("id"),
+        name=decision.get("name"),
+        decision_id=decision.get("id"),
+        hit_policy=(table_elem.get("hitPolicy") or "UNIQUE").upper(),
+        inputs=inputs,
+        outputs=outputs,
+        rules=rules,
+        path=str(path) if path is not None else None,
+        repaired=repaired,
+        definitions_name=root.get("name"),
+        extra_decisions=extra,
+    )
+
+
+def load_table(path):
+    """Read and parse a regra.dmn.xml file"""
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError as exc:
+        raise DmnParseError(str(exc), path) from None
+    return parse_dmn(data, path)
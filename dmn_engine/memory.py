@@ -0,0 +1,434 @@
+"""
+Similarity search over the .swarm rule memory
+
+Regras-Adm-Hospitais/.swarm and Regras-Clinicas-Hospitais/.swarm hold a
+memory.db (schema.sql) whose memory_entries rows carry a 384-dimension
+embedding of each note about the rules, stored as a JSON text array. Finding
+"the existing entries closest to this one" used to mean decoding every array.
+
+RuleMemory packs the embeddings into float32 BLOBs and keeps a vector file
+next to the database that it memory-maps for search:
+
+    memory = RuleMemory("dmn/Regras-Adm-Hospitais/.swarm")
+    memory.migrate()                                # JSON arrays -> float32 BLOBs
+    memory.similar_to("tier1-opme-rules", k=3)      # neighbours of an entry
+    memory.similar(vector, namespace="hospital-rules-intel", status="active")
+    memory.search("OPME sem registro ANVISA")       # needs embed=
+
+migrate() adds the embedding_blob and embedding_packed_at columns when they
+are missing and packs every row whose JSON embedding is newer than its BLOB.
+The JSON text stays in place for the readers of the embedding column;
+migrate(keep_json=False) clears it, which cannot be undone. Running it
+again only packs rows the memory tool wrote since.
+
+The vector file (vectors.f32, little endian):
+
+    header   magic "DMNVEC01", dimensions, row count, signature
+    rowids   int64[count], ascending memory_entries rowids
+    vectors  float32[count][dimensions], L2-normalized
+
+Its signature is the (count, max updated_at, rowid sum) of the rows with an
+embedding. The file is rebuilt from the BLOBs, or from the JSON of rows not
+packed yet, when the database no longer matches it; the signature is only
+recomputed after another connection wrote to the database. namespace, status and
+type filters run as SQL on the indexed columns; only the vectors of the
+matching rowids are scored, so a filtered query never reads the other rows.
+
+hnsw.index next to memory.db is the memory tool's own redb store, not a
+graph this module can read. The search is exact: a cosine scan over the
+mapped rows, one matrix product with numpy and a plain loop without it.
+Text queries need an embed callable that returns a vector from the same
+model (embedding_model "onnx", all-MiniLM style, 384 dimensions).
+"""
+
+import heapq
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import sys
+import tempfile
+from array import array
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from .corpus import DEFAULT_ROOT
+from .errors import DmnError
+
+SWARM_DIR = ".swarm"
+DATABASE_FILENAME = "memory.db"
+VECTORS_FILENAME = "vectors.f32"
+
+MAGIC = b"DMNVEC01"
+_HEADER = struct.Struct("<8sIIqqq")
+
+_ENTRY_FIELDS = ("id", "key", "namespace", "type", "status", "content")
+
+
+def find_memories(root=None):
+    """Every .swarm directory with a memory.db under root, in sorted order"""
+    root = Path(root or DEFAULT_ROOT)
+    found = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d == SWARM_DIR or not d.startswith("."))
+        if Path(dirpath).name == SWARM_DIR and DATABASE_FILENAME in filenames:
+            found.append(Path(dirpath))
+    return found
+
+
+def pack_embedding(values):
+    """float32 little-endian bytes of a vector"""
+    packed = array("f", values)
+    if sys.byteorder != "little":
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def unpack_embedding(blob):
+    """The list of floats stored by pack_embedding()"""
+    values = array("f")
+    values.frombytes(blob)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values.tolist()
+
+
+def _normalized(values):
+    norm = sum(v * v for v in values) ** 0.5
+    return [v / norm for v in values] if norm else list(values)
+
+
+def _write_atomic(path, chunks):
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=path.parent)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class RuleMemory:
+    """A .swarm memory.db with its memory-mapped vector file"""
+
+    def __init__(self, path, embed=None):
+        path = Path(path)
+        self.dir = path if path.is_dir() else path.parent
+        self.db_path = path / DATABASE_FILENAME if path.is_dir() else path
+        if not self.db_path.is_file():
+            raise DmnError(f"{self.db_path}: no such memory database")
+        self.vectors_path = self.dir / VECTORS_FILENAME
+        self.embed = embed
+        self._db = sqlite3.connect(str(self.db_path))
+        self._file = self._mm = None
+        self._rowids = self._vectors = None
+        self.dimensions = self.count = 0
+        self._signature = None
+        self._data_version = None
+
+    def close(self):
+        self._unmap()
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ------------------------------------------------------------------
+    # Migration
+    # ------------------------------------------------------------------
+
+    def _columns(self):
+        return {row[1] for row in self._db.execute("PRAGMA table_info(memory_entries)")}
+
+    def migrate(self, keep_json=True):
+        """Pack JSON embeddings into float32 BLOBs; {"packed", "invalid"}.
+
+        keep_json=False also sets the JSON embedding column to NULL.
+        """
+        with self._db:
+            columns = self._columns()
+            if "embedding_blob" not in columns:
+                self._db.execute("ALTER TABLE memory_entries ADD COLUMN embedding_blob BLOB")
+            if "embedding_packed_at" not in columns:
+                self._db.execute(
+                    "ALTER TABLE memory_entries ADD COLUMN embedding_packed_at INTEGER")
+            rows = self._db.execute(
+                "SELECT rowid, embedding, updated_at FROM memory_entries"
+                " WHERE embedding IS NOT NULL AND (embedding_blob IS NULL"
+                " OR embedding_packed_at IS NOT updated_at OR ?)",
+                (not keep_json,)).fetchall()
+            packed = invalid = 0
+            for rowid, text, updated_at in rows:
+                try:
+                    values = json.loads(text)
+                    blob = pack_embedding(values)
+                except (TypeError, ValueError, OverflowError):
+                    invalid += 1
+                    continue
+                self._db.execute(
+                    "UPDATE memory_entries SET embedding_blob = ?, embedding_packed_at = ?,"
+                    " embedding_dimensions = ?, embedding = ? WHERE rowid = ?",
+                    (blob, updated_at, len(values), text if keep_json else None, rowid))
+                packed += 1
+        self.refresh(force=True)
+        return {"packed": packed, "invalid": invalid}
+
+    # ------------------------------------------------------------------
+    # Vector file
+    # ------------------------------------------------------------------
+
+    def _has_blobs(self):
+        return "embedding_blob" in self._columns()
+
+    def _current_signature(self):
+        where = "embedding IS NOT NULL"
+        if self._has_blobs():
+            where += " OR embedding_blob IS NOT NULL"
+        count, updated, rowids = self._db.execute(
+            f"SELECT count(*), max(updated_at), total(rowid) FROM memory_entries WHERE {where}"
+        ).fetchone()
+        return count, updated or 0, int(rowids)
+
+    def _embeddings(self):
+        """Yield (rowid, list of floats) for every row with an embedding"""
+        if self._has_blobs():
+            query = ("SELECT rowid, embedding_blob, embedding, embedding_packed_at IS updated_at"
+                     " FROM memory_entries WHERE embedding IS NOT NULL"
+                     " OR embedding_blob IS NOT NULL ORDER BY rowid")
+        else:
+            query = ("SELECT rowid, NULL, embedding, 0 FROM memory_entries"
+                     " WHERE embedding IS NOT NULL ORDER BY rowid")
+        for rowid, blob, text, current in self._db.execute(query):
+            if blob is not None and (current or text is None):
+                yield rowid, unpack_embedding(blob)
+                continue
+            try:
+                yield rowid, json.loads(text)
+            except (TypeError, ValueError):
+                continue
+
+    def build(self):
+        """Write the vector file from the database; returns the row count"""
+        signature = self._current_signature()
+        rows = list(self._embeddings())
+        sizes = {}
+        for _, values in rows:
+            sizes[len(values)] = sizes.get(len(values), 0) + 1
+        # Rows embedded by another model (other dimensions) are left out
+        dimensions = max(sizes, key=sizes.get) if sizes else 0
+        rows = [(rowid, values) for rowid, values in rows if len(values) == dimensions]
+        rowids = array("q", [rowid for rowid, _ in rows])
+        if sys.byteorder != "little":
+            rowids.byteswap()
+        header = _HEADER.pack(MAGIC, dimensions, len(rows), *signature)
+        _write_atomic(self.vectors_path, [header, rowids.tobytes()]
+                      + [pack_embedding(_normalized(values)) for _, values in rows])
+        return len(rows)
+
+    def _unmap(self):
+        if isinstance(self._vectors, memoryview):
+            self._vectors.release()
+        self._rowids = self._vectors = None
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _map(self):
+        self._unmap()
+        self._file = open(self.vectors_path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size < _HEADER.size:
+            self._unmap()
+            return False
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, dimensions, count, *signature = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or size != _HEADER.size + 8 * count + 4 * count * dimensions:
+            self._unmap()
+            return False
+        self.dimensions, self.count = dimensions, count
+        self._signature = tuple(signature)
+        start = _HEADER.size + 8 * count
+        if np is not None:
+            self._rowids = np.frombuffer(self._mm, dtype="<i8", count=count, offset=_HEADER.size)
+            self._vectors = np.frombuffer(self._mm, dtype="<f4", count=count * dimensions,
+                                          offset=start).reshape(count, dimensions)
+        else:
+            self._rowids = list(struct.unpack_from(f"<{count}q", self._mm, _HEADER.size))
+            if sys.byteorder == "little":
+                self._vectors = memoryview(self._mm)[start:].cast("f")
+        return True
+
+    def refresh(self, force=False):
+        """Map the vector file, rebuilding it when the database changed.
+
+        PRAGMA data_version tells whether another connection committed since
+        the last check, so the signature query only runs after a write.
+        """
+        version = self._db.execute("PRAGMA data_version").fetchone()[0]
+        if not force and self._mm is not None and version == self._data_version:
+            return
+        self._data_version = version
+        current = self._current_signature()
+        if not force and self._mm is not None and self._signature == current:
+            return
+        if force or not (self.vectors_path.is_file() and self._map()) \
+                or self._signature != current:
+            self._unmap()
+            self.build()
+            self._map()
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def _candidates(self, namespace, status, type):
+        """Rowids allowed by the filters, or None for every row"""
+        clauses, params = [], []
+        for column, value in (("namespace", namespace), ("status", status), ("type", type)):
+            if value is not None:
+                # Without ANALYZE statistics SQLite would pick idx_memory_status,
+                # which matches nearly every row; the unary + keeps it on the
+                # namespace index when there is one to use
+                if clauses:
+                    column = "+" + column
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if not clauses:
+            return None
+        return [r for (r,) in self._db.execute(
+            f"SELECT rowid FROM memory_entries WHERE {' AND '.join(clauses)}", params)]
+
+    def _top(self, query, rowids, n):
+        """The n best [(score, rowid)] among rowids (every row if None), best first"""
+        if np is not None:
+            if rowids is None:
+                matrix, ids = self._vectors, self._rowids
+            else:
+                wanted = np.asarray(rowids, dtype="<i8")
+                positions = np.minimum(np.searchsorted(self._rowids, wanted), self.count - 1)
+                positions = positions[self._rowids[positions] == wanted]
+                ids = self._rowids[positions]
+                if 4 * len(positions) < self.count:
+                    matrix = self._vectors[positions]
+                else:
+                    # Gathering most of the rows costs more than scoring them all
+                    matrix = None
+                    scores = (self._vectors @ np.asarray(query, dtype="<f4"))[positions]
+            if matrix is not None:
+                scores = matrix @ np.asarray(query, dtype="<f4")
+            if n < len(scores):
+                best = np.argpartition(-scores, n)[:n]
+            else:
+                best = np.arange(len(scores))
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return list(zip(scores[best].tolist(), ids[best].tolist()))
+
+        dims = self.dimensions
+        if self._vectors is None:  # big endian host: unpack row by row
+            def row(i):
+                start = _HEADER.size + 8 * self.count + 4 * dims * i
+                return unpack_embedding(self._mm[start:start + 4 * dims])
+        else:
+            def row(i):
+                return self._vectors[i * dims:(i + 1) * dims]
+        positions = {rowid: i for i, rowid in enumerate(self._rowids)}
+        wanted = self._rowids if rowids is None else [r for r in rowids if r in positions]
+        scored = ((sum(a * b for a, b in zip(query, row(positions[r]))), r) for r in wanted)
+        return heapq.nlargest(n, scored, key=lambda pair: pair[0])
+
+    def similar(self, vector, k=5, namespace=None, status="active", type=None, exclude=()):
+        """The k entries closest to vector by cosine similarity, best first.
+
+        Each result is {"id", "key", "namespace", "type", "status", "content",
+        "score"}. status=None searches archived and deleted entries too.
+        """
+        self.refresh()
+        if not self.count:
+            return []
+        if len(vector) != self.dimensions:
+            raise DmnError(f"query has {len(vector)} dimensions, the memory {self.dimensions}")
+        excluded = set(exclude)
+        candidates = self._candidates(namespace, status, type)
+        results = []
+        for score, rowid in self._top(_normalized(vector), candidates, k + len(excluded)):
+            if rowid in excluded:
+                continue
+            entry = self._entry(rowid)
+            entry["score"] = round(score, 6)
+            results.append(entry)
+            if len(results) >= k:
+                break
+        return results
+
+    def _entry(self, rowid):
+        row = self._db.execute(
+            f"SELECT {', '.join(_ENTRY_FIELDS)} FROM memory_entries WHERE rowid = ?",
+            (rowid,)).fetchone()
+        return dict(zip(_ENTRY_FIELDS, row))
+
+    def similar_to(self, key, k=5, namespace=None, status="active", type=None):
+        """The k entries closest to an existing entry (found by key or id)"""
+        self.refresh()
+        params = [key, key]
+        where = "(key = ? OR id = ?)"
+        if namespace is not None:
+            where += " AND namespace = ?"
+            params.append(namespace)
+        rows = self._db.execute(
+            f"SELECT rowid FROM memory_entries WHERE {where}", params).fetchall()
+        if not rows:
+            raise DmnError(f"no memory entry {key!r}")
+        if len(rows) > 1:
+            raise DmnError(f"{key!r} exists in several namespaces; pass namespace")
+        rowid = rows[0][0]
+        vector = self.vector(rowid)
+        if vector is None:
+            raise DmnError(f"memory entry {key!r} has no embedding")
+        return self.similar(vector, k, namespace, status, type, exclude=(rowid,))
+
+    def vector(self, rowid):
+        """The stored (normalized) embedding of a row, or None"""
+        self.refresh()
+        if np is not None:
+            i = int(np.searchsorted(self._rowids, rowid))
+            if i < self.count and self._rowids[i] == rowid:
+                return self._vectors[i].tolist()
+            return None
+        for i, r in enumerate(self._rowids):
+            if r == rowid:
+                start = _HEADER.size + 8 * self.count + 4 * self.dimensions * i
+                return unpack_embedding(self._mm[start:start + 4 * self.dimensions])
+        return None
+
+    def search(self, text, k=5, namespace=None, status="active", type=None):
+        """The k entries closest to a free-text description (needs embed)"""
+        if self.embed is None:
+            raise DmnError("text search needs an embed callable returning the model's vector")
+        return self.similar(list(self.embed(text)), k, namespace, status, type)
+
+    def stats(self):
+        self.refresh()
+        return {
+            "database": str(self.db_path),
+            "vectors": str(self.vectors_path),
+            "rows": self.count,
+            "dimensions": self.dimensions,
+            "bytes": self.vectors_path.stat().st_size,
+            "packed": self._has_blobs(),
+        }
@@ -0,0 +1,325 @@
+"""
+Rule hit counters and evaluation/compile timers in OpenMetrics text format
+
+Metrics.attach() instruments a Corpus: every table it compiles from then on
+(and every one it already holds) counts the rules that fire on each match()
+or match_all() - and so on each evaluate() - and times the call, through the
+CompiledTable.observer hook. The corpus reports the load and compile time of
+each table, and a ResultCache over it counts the results it serves.
+
+    metrics = Metrics(tags={"worker": "auditoria-tuss"})
+    corpus = metrics.attach(Corpus())
+    corpus.get("20101201").match(claim)
+    metrics.write("dmn.prom")                  # or metrics.serve(9464)
+
+The names follow the Micrometer meters that the Java BaseWorker publishes
+(worker.execution.time, worker.executions.total) as the Prometheus registry
+renders them: dots become underscores, timers are reported in seconds, and
+the constructor tags play the role of Micrometer common tags.
+
+    dmn_rule_hits_total{table, code, rule, resultado}
+        rules that fired; rule="none" counts matches where no rule did. A
+        multi-hit table counts every rule of a match_all().
+        resultado is the rule's constant resultado/decisao/nivelAlerta output,
+        so Rule_Fallback_* and "Pendente" show up directly
+    dmn_evaluation_time_seconds{table, code}
+        histogram of match() latency (buckets from 5 us to 10 ms), with _max
+    dmn_cache_hits_total{table, code}
+        results a ResultCache served without evaluating the table
+    dmn_table_load_time_seconds{table, code, phase}
+        phase="parse" (XML and FEEL parsing, or unmarshal from a snapshot)
+        and phase="compile" (building the predicates), with _max
+
+Counting costs about a microsecond per match; only attached corpora pay it.
+Results that ResultCache serves from memory are not matches: they count in
+dmn_cache_hits_total, not in the rule hits or the histogram. Each process
+keeps its own registry; snapshot() and merge() combine them (run_audit does
+this for its workers).
+"""
+
+import os
+import tempfile
+import threading
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from .errors import DmnError
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Upper bounds (seconds) of the evaluation histogram buckets; +Inf is implied
+DEFAULT_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 1e-2)
+
+# Outputs whose constant value labels a rule hit, in order of preference
+OUTCOME_OUTPUTS = ("resultado", "Resultado", "decisao", "nivelAlerta")
+
+NO_RULE = "none"
+
+
+def _outcome(rule):
+    constant = rule._constant
+    if constant is None:
+        return ""
+    for name in OUTCOME_OUTPUTS:
+        value = constant.get(name)
+        if value is not None:
+            return str(value)
+    return ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(pairs):
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class _TableStats:
+    """Counters of one table; updated under its lock"""
+
+    __slots__ = ("code", "hits", "buckets", "count", "sum", "max", "cached", "lock")
+
+    def __init__(self, code, n_buckets):
+        self.code = code
+        self.hits = {}
+        self.buckets = [0] * (n_buckets + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.cached = 0
+        self.lock = threading.Lock()
+
+
+class Metrics:
+    """Registry of rule hits and timings for the tables of attached corpora"""
+
+    def __init__(self, tags=None, buckets=DEFAULT_BUCKETS):
+        self.tags = tuple(sorted((tags or {}).items()))
+        self.buckets = tuple(buckets)
+        self._tables = {}
+        self._loads = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, key, code):
+        stats = self._tables.get(key)
+        if stats is None:
+            with self._lock:
+                stats = self._tables.setdefault(key, _TableStats(code, len(self.buckets)))
+        return stats
+
+    def attach(self, corpus):
+        """Instrument corpus (a Corpus or Snapshot) and return it"""
+        corpus.metrics = self
+        for key, table in list(corpus._compiled.items()):
+            self.instrument(table, key, corpus.resolve(key).code)
+        return corpus
+
+    def compiled(self, ref, table, parse_seconds, compile_seconds):
+        """Called by an attached corpus for every table it compiles"""
+        self.record_load(ref.key, ref.code, "parse", parse_seconds)
+        self.record_load(ref.key, ref.code, "compile", compile_seconds)
+        self.instrument(table, ref.key, ref.code)
+
+    def instrument(self, table, key, code=None):
+        """Make table count and time its match() and match_all() calls"""
+        stats = self._stats(key, code or key.rsplit("/", 1)[-1])
+        labels = {rule.index: (rule.id or f"#{rule.index + 1}", _outcome(rule))
+                  for rule in table.rules}
+        miss = (NO_RULE, "")
+        bounds = self.buckets
+
+        def observe(rules, elapsed):
+            with stats.lock:
+                hits = stats.hits
+                if not rules:
+                    hits[miss] = hits.get(miss, 0) + 1
+                for rule in rules:
+                    label = labels[rule.index]
+                    hits[label] = hits.get(label, 0) + 1
+                stats.buckets[bisect_left(bounds, elapsed)] += 1
+                stats.count += 1
+                stats.sum += elapsed
+                if elapsed > stats.max:
+                    stats.max = elapsed
+
+        table.observer = observe
+        return table
+
+    def record_cache_hit(self, key, code):
+        """Count a result a ResultCache served for table key"""
+        stats = self._stats(key, code)
+        with stats.lock:
+            stats.cached += 1
+
+    def record_load(self, key, code, phase, seconds):
+        with self._lock:
+            entry = self._loads.get((key, phase))
+            if entry is None:
+                entry = self._loads[(key, phase)] = [code, 0, 0.0, 0.0]
+            entry[1] += 1
+            entry[2] += seconds
+            entry[3] = max(entry[3], seconds)
+
+    # ------------------------------------------------------------------
+    # Aggregation
+    # ------------------------------------------------------------------
+
+    def snapshot(self):
+        """Picklable copy of every counter, for merge() in another process"""
+        tables = {}
+        for key, s in list(self._tables.items()):
+            with s.lock:
+                tables[key] = (s.code, dict(s.hits), list(s.buckets), s.count, s.sum, s.max,
+                               s.cached)
+        with self._lock:
+            loads = {k: tuple(v) for k, v in self._loads.items()}
+        return {"buckets": self.buckets, "tables": tables, "loads": loads}
+
+    def merge(self, snapshot):
+        """Add the counters of another registry's snapshot() to this one"""
+        if tuple(snapshot["buckets"]) != self.buckets:
+            raise DmnError("cannot merge metrics with different histogram buckets")
+        for key, (code, hits, buckets, count, total, peak, cached) in \
+                snapshot["tables"].items():
+            s = self._stats(key, code)
+            with s.lock:
+                s.cached += cached
+                for label, n in hits.items():
+                    s.hits[label] = s.hits.get(label, 0) + n
+                s.buckets = [a + b for a, b in zip(s.buckets, buckets)]
+                s.count += count
+                s.sum += total
+                s.max = max(s.max, peak)
+        with self._lock:
+            for (key, phase), (code, count, total, peak) in snapshot["loads"].items():
+                entry = self._loads.setdefault((key, phase), [code, 0, 0.0, 0.0])
+                entry[1] += count
+                entry[2] += total
+                entry[3] = max(entry[3], peak)
+
+    def hits(self, name=None):
+        """{table key: {(rule, resultado): count}}, or one table's dict"""
+        if name is not None:
+            stats = self._tables.get(name)
+            return dict(stats.hits) if stats is not None else {}
+        return {key: dict(s.hits) for key, s in self._tables.items()}
+
+    def top(self, n=10):
+        """The n tables with the most evaluation time: [(key, seconds, count)]"""
+        ranked = sorted(self._tables.items(), key=lambda item: -item[1].sum)
+        return [(key, s.sum, s.count) for key, s in ranked[:n]]
+
+    # ------------------------------------------------------------------
+    # Export
+    # ------------------------------------------------------------------
+
+    def openmetrics(self):
+        """The registry in OpenMetrics text format, ending with # EOF"""
+        snap = self.snapshot()
+        tags = self.tags
+        lines = [
+            "# TYPE dmn_rule_hits counter",
+            "# HELP dmn_rule_hits Decision table rules that fired.",
+        ]
+        for key, (code, hits, *_) in sorted(snap["tables"].items()):
+            for (rule, resultado), n in sorted(hits.items()):
+                labels = _labels(tags + (("table", key), ("code", code), ("rule", rule),
+                                         ("resultado", resultado)))
+                lines.append(f"dmn_rule_hits_total{labels} {n}")
+
+        lines += [
+            "# TYPE dmn_evaluation_time_seconds histogram",
+            "# UNIT dmn_evaluation_time_seconds seconds",
+            "# HELP dmn_evaluation_time_seconds Decision table match time.",
+        ]
+        bounds = [_number(b) for b in self.buckets] + ["+Inf"]
+        maxima = []
+        for key, (code, _, buckets, count, total, peak, _) in sorted(snap["tables"].items()):
+            base = tags + (("table", key), ("code", code))
+            cumulative = 0
+            for le, n in zip(bounds, buckets):
+                cumulative += n
+                lines.append(f"dmn_evaluation_time_seconds_bucket{_labels(base + (('le', le),))} "
+                             f"{cumulative}")
+            lines.append(f"dmn_evaluation_time_seconds_count{_labels(base)} {count}")
+            lines.append(f"dmn_evaluation_time_seconds_sum{_labels(base)} {_number(total)}")
+            maxima.append(f"dmn_evaluation_time_seconds_max{_labels(base)} {_number(peak)}")
+        lines += [
+            "# TYPE dmn_evaluation_time_seconds_max gauge",
+            "# HELP dmn_evaluation_time_seconds_max Slowest decision table match.",
+        ] + maxima
+
+        lines += [
+            "# TYPE dmn_cache_hits counter",
+            "# HELP dmn_cache_hits Results served by a ResultCache without evaluating.",
+        ]
+        for key, (code, *_, cached) in sorted(snap["tables"].items()):
+            if cached:
+                labels = _labels(tags + (("table", key), ("code", code)))
+                lines.append(f"dmn_cache_hits_total{labels} {cached}")
+
+        lines += [
+            "# TYPE dmn_table_load_time_seconds summary",
+            "# UNIT dmn_table_load_time_seconds seconds",
+            "# HELP dmn_table_load_time_seconds Decision table parse and compile time.",
+        ]
+        maxima = []
+        for (key, phase), (code, count, total, peak) in sorted(snap["loads"].items()):
+            labels = _labels(tags + (("table", key), ("code", code), ("phase", phase)))
+            lines.append(f"dmn_table_load_time_seconds_count{labels} {count}")
+            lines.append(f"dmn_table_load_time_seconds_sum{labels} {_number(total)}")
+            maxima.append(f"dmn_table_load_time_seconds_max{labels} {_number(peak)}")
+        lines += [
+            "# TYPE dmn_table_load_time_seconds_max gauge",
+            "# HELP dmn_table_load_time_seconds_max Slowest decision table parse or compile.",
+        ] + maxima
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write openmetrics() to path atomically (for a textfile collector)"""
+        path = Path(path)
+        fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp",
+                                   dir=path.parent if str(path.parent) else ".")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.openmetrics())
+            os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def serve(self, port, host=""):
+        """Serve openmetrics() at http://host:port/metrics from a daemon thread.
+
+        Returns the server; call shutdown() on it to stop.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = metrics.openmetrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, name="dmn-metrics", daemon=True).start()
+        return server
@@ -0,0 +1,51 @@
+"""
+Parsed (not yet compiled) representation of a regra.dmn.xml decision table
+
+These objects mirror the XML one-to-one and keep every entry as raw text so
+they can be re-compiled, analysed or serialized without touching the file
+again. Compilation into predicates lives in engine.py.
+"""
+
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class InputClause:
+    id: Optional[str]
+    label: Optional[str]
+    expression: str
+    type_ref: Optional[str] = None
+    input_values: Optional[str] = None
+
+
+@dataclass
+class OutputClause:
+    id: Optional[str]
+    name: str
+    label: Optional[str] = None
+    type_ref: Optional[str] = None
+    output_values: Optional[str] = None
+
+
+@dataclass
+class Rule:
+    id: Optional[str]
+    description: Optional[str]
+    input_entries: List[str]
+    output_entries: List[str]
+
+
+@dataclass
+class DecisionTable:
+    id: Optional[str]
+    name: Optional[str]
+    decision_id: Optional[str]
+    hit_policy: str
+    inputs: List[InputClause]
+    outputs: List[OutputClause]
+    rules: List[Rule]
+    path: Optional[str] = None
+    repaired: bool = False
+    definitions_name: Optional[str] = None
+    extra_decisions: List[str] = field(default_factory=list)
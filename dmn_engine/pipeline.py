@@ -0,0 +1,280 @@
+"""
+Revenue-cycle pipeline over Regras-Adm-Hospitais
+
+Every table in Regras-Adm-Hospitais answers with the same five outputs
+(resultado, observacao, acaoRecomendada, alertasConformidade, riscoDenial),
+so a hospital account can be run through all of them as one check:
+
+    pipeline = RevenuePipeline(Corpus())
+    report = pipeline.run({
+        "operadora": "UNIMED", "temAutorizacao": True, ...,     # account inputs
+        "itens": [                                              # line items
+            {"codigoAnvisaValido": True, "loteRegistradoProntuario": True, ...},
+            {"classificadoAltoCusto": True, "protocoloClinicoStatus": "APROVADO", ...},
+        ],
+    })
+    report["resultado"]            # worst resultado: Bloquear > Revisar > Alertar > Prosseguir
+    report["findings"]             # every result other than Prosseguir, with its table/item
+
+The categories run in STAGES order, which follows the execution phases of
+docs/RULE_TAXONOMY.json (billing before the TISS/ANS checks that depend on
+it, denial prevention before submission, receivables last). A stage whose
+results include a BLOCKING resultado ends the run; the later stages are
+listed in "skipped". Within a stage the subcategories (BILL/OPME, BILL/MED,
+BILL/MATERIAL, ...) do not depend on each other and are evaluated
+concurrently on a thread pool.
+
+A table applies to the account when the account supplies every one of its
+inputs, and to a line item when the item supplies at least one of them and
+the item and account together supply the rest. Tables whose inputs are not
+all known are skipped rather than evaluated into their "Revisar" default.
+Which tables apply is worked out once per distinct set of item fields, so an
+account with thousands of items of a few kinds costs one table match per
+applicable (item, table) pair.
+
+Every table is compiled when the pipeline is built. On CPython the threads
+share the GIL, so the fan-out overlaps work but does not add CPU; large
+accounts stay fast because the per-item work is a dict merge and the matches
+of the tables that apply.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .errors import DmnError
+
+FAMILY = "Regras-Adm-Hospitais"
+
+# Stage name -> the categories ("BILL") or subcategories ("COMP/DEADLINE") it
+# runs; a subcategory listed by name belongs to that stage, not its category's
+STAGES = (
+    ("credentialing", ("CRED",)),
+    ("authorization", ("AUTH", "PRIOR")),
+    ("coding", ("EDIT",)),
+    ("pricing", ("PRICE",)),
+    ("billing", ("BILL",)),
+    ("compliance", ("COMP",)),
+    ("denial", ("DENY",)),
+    ("submission", ("COMP/DEADLINE",)),
+    ("appeal", ("APPEAL",)),
+    ("receivables", ("RECV", "CASH")),
+)
+
+# The stages that make sense before the account is sent to the payer
+PRE_SUBMISSION = ("credentialing", "authorization", "coding", "pricing", "billing",
+                  "compliance", "denial")
+
+BLOCKING = ("Bloquear",)
+
+# Worst first
+RESULTADO_ORDER = ("Bloquear", "Revisar", "Alertar", "Prosseguir")
+RISK_ORDER = ("BAIXO", "MEDIO", "ALTO", "CRITICO")
+NO_ALERT = "NENHUM"
+
+# Account fields tried, in order, for the list of line items
+ITEM_FIELDS = ("itens", "items", "lineItems")
+
+_OUTPUTS = ("resultado", "observacao", "acaoRecomendada", "alertasConformidade", "riscoDenial")
+_RESULTADO_RANK = {r: i for i, r in enumerate(RESULTADO_ORDER)}
+_RISK_RANK = {r: i for i, r in enumerate(RISK_ORDER)}
+
+
+def _stage_of(group):
+    """Name of the stage that runs a subcategory, or None"""
+    category = group.split("/", 1)[0]
+    fallback = None
+    for name, members in STAGES:
+        if group in members:
+            return name
+        if fallback is None and category in members:
+            fallback = name
+    return fallback
+
+
+def _present(ctx):
+    return frozenset(k for k, v in ctx.items() if v is not None)
+
+
+class _Table:
+    __slots__ = ("key", "table", "names")
+
+    def __init__(self, key, table):
+        self.key = key
+        self.table = table
+        self.names = frozenset(table.input_names)
+
+
+class _Group:
+    """The tables of one subcategory, with the applicability memo for its inputs"""
+
+    def __init__(self, name, tables):
+        self.name = name
+        self.tables = tables
+        self._account = {}
+        self._item = {}
+
+    def for_account(self, fields):
+        found = self._account.get(fields)
+        if found is None:
+            found = self._account[fields] = [t for t in self.tables if t.names <= fields]
+        return found
+
+    def for_item(self, item_fields, account_fields):
+        key = (item_fields, account_fields)
+        found = self._item.get(key)
+        if found is None:
+            known = item_fields | account_fields
+            found = self._item[key] = [
+                t for t in self.tables if t.names <= known and not t.names.isdisjoint(item_fields)
+            ]
+        return found
+
+
+def _finding(stage, entry, item, rule, outputs):
+    finding = {"stage": stage, "table": entry.key, "item": item, "rule": rule.id}
+    for name in _OUTPUTS:
+        finding[name] = outputs.get(name)
+    return finding
+
+
+class RevenuePipeline:
+    """Runs a hospital account through the Regras-Adm-Hospitais stages"""
+
+    def __init__(self, corpus, stages=None, workers=None, item_fields=ITEM_FIELDS):
+        self.corpus = corpus
+        self.item_fields = item_fields
+        wanted = tuple(stages) if stages is not None else tuple(name for name, _ in STAGES)
+        unknown = set(wanted) - {name for name, _ in STAGES}
+        if unknown:
+            raise DmnError(f"unknown stages: {', '.join(sorted(unknown))}")
+
+        by_group = {}
+        for ref in corpus:
+            if ref.family == FAMILY and _stage_of(ref.group) in wanted:
+                by_group.setdefault(ref.group, []).append(_Table(ref.key, corpus.get(ref.key)))
+        self.stages = []
+        for name, _ in STAGES:
+            if name in wanted:
+                groups = [_Group(g, by_group[g]) for g in sorted(by_group) if _stage_of(g) == name]
+                self.stages.append((name, groups))
+        self._pool = ThreadPoolExecutor(max_workers=workers) if workers != 0 else None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def tables(self, stage=None):
+        """Keys of the tables the pipeline runs, optionally for one stage"""
+        return [t.key for name, groups in self.stages if stage in (None, name)
+                for g in groups for t in g.tables]
+
+    def _split(self, account):
+        for field in self.item_fields:
+            items = account.get(field)
+            if items is not None:
+                ctx = {k: v for k, v in account.items() if k != field}
+                return ctx, items
+        return account, ()
+
+    def _run_group(self, stage, group, ctx, account_fields, items):
+        """(evaluated, {resultado: count}, findings) of one subcategory"""
+        evaluated = 0
+        counts = {}
+        findings = []
+
+        def record(entry, item, context):
+            rule = entry.table.match(context)
+            if rule is None:
+                return
+            outputs = rule.output(context)
+            resultado = outputs.get("resultado")
+            counts[resultado] = counts.get(resultado, 0) + 1
+            if resultado != "Prosseguir":
+                findings.append(_finding(stage, entry, item, rule, outputs))
+
+        for entry in group.for_account(account_fields):
+            evaluated += 1
+            record(entry, None, ctx)
+        for index, fields, item_ctx in items:
+            for entry in group.for_item(fields, account_fields):
+                evaluated += 1
+                record(entry, index, item_ctx)
+        return evaluated, counts, findings
+
+    def run(self, account):
+        """Evaluate an account dict and return the merged report"""
+        started = time.perf_counter()
+        ctx, raw_items = self._split(account)
+        account_fields = _present(ctx)
+        items = []
+        for index, item in enumerate(raw_items):
+            fields = _present(item)
+            if fields:
+                items.append((index, fields, {**ctx, **item}))
+
+        report = {"stages": [], "findings": [], "skipped": []}
+        stopped = None
+        for name, groups in self.stages:
+            if stopped is not None:
+                report["skipped"].append(name)
+                continue
+            if self._pool is not None and len(groups) > 1:
+                jobs = [self._pool.submit(self._run_group, name, g, ctx, account_fields, items)
+                        for g in groups]
+                results = [job.result() for job in jobs]
+            else:
+                results = [self._run_group(name, g, ctx, account_fields, items) for g in groups]
+
+            evaluated = 0
+            counts = {}
+            for group_evaluated, group_counts, findings in results:
+                evaluated += group_evaluated
+                for resultado, n in group_counts.items():
+                    counts[resultado] = counts.get(resultado, 0) + n
+                report["findings"].extend(findings)
+            report["stages"].append({
+                "stage": name,
+                "resultado": _worst(counts),
+                "evaluated": evaluated,
+                "resultados": counts,
+            })
+            if any(r in counts for r in BLOCKING):
+                stopped = name
+
+        findings = report["findings"]
+        alerts = set()
+        risk = None
+        for f in findings:
+            alert = f["alertasConformidade"]
+            if alert and alert != NO_ALERT:
+                alerts.add(alert)
+            if _RISK_RANK.get(f["riscoDenial"], -1) > _RISK_RANK.get(risk, -1):
+                risk = f["riscoDenial"]
+        overall = {}
+        for stage in report["stages"]:
+            for resultado, n in stage["resultados"].items():
+                overall[resultado] = overall.get(resultado, 0) + n
+
+        report.update({
+            "resultado": _worst(overall),
+            "blocked": stopped is not None,
+            "blockedAt": stopped,
+            "riscoDenial": risk,
+            "alertasConformidade": sorted(alerts),
+            "items": len(raw_items),
+            "seconds": round(time.perf_counter() - started, 6),
+        })
+        return report
+
+
+def _worst(counts):
+    """The worst resultado present in a {resultado: count} dict"""
+    if not counts:
+        return None
+    return min(counts, key=lambda r: _RESULTADO_RANK.get(r, len(RESULTADO_ORDER)))
@@ -0,0 +1,125 @@
+"""
+Shadow evaluation of a candidate corpus after the live one
+
+A rule release (a generator version bump, the fixes listed in metadata.json)
+changes a few hundred tables out of thousands. Shadow pairs every live table
+with the table of the same key in a candidate corpus and answers, for a
+context the live table was just evaluated on, what the candidate decides:
+
+    shadow = Shadow(Corpus(), Corpus("/srv/dmn-next"))
+    shadow.match("Regras-Audit-Operadora/cardiologia/20101201", claim)
+    # -> UNCHANGED, or (rule, outputs) from the candidate table
+
+    python -m dmn_engine audit guias.jsonl -o resultados.jsonl \\
+        --shadow /srv/dmn-next --divergences divergencias.jsonl
+
+A pair is classified once, on first use, by the sha1 of the two regra.dmn.xml
+files (a Snapshot gives its recorded hash). When the bytes are equal the
+candidate cannot decide differently, so match() returns UNCHANGED without
+evaluating anything; only the changed tables cost a second evaluation. The
+claim itself - JSON decoding, TUSS normalization, routing, the choice of
+context - is done once by the Auditor for both versions (see audit.py).
+
+Both versions are evaluated back to back, the candidate right after the
+live table, in the same process; the audit worker processes evaluate claims
+concurrently, each holding both corpora. stats() counts the pairs and the
+seconds spent in the candidate tables, the extra cost of shadow mode; the
+audit summary reports them under "shadow". Pairs are not re-checked, so restart to pick up a new candidate.
+A Shadow is not thread-safe; give each worker its own.
+"""
+
+import hashlib
+import time
+
+from .errors import DmnError
+
+UNCHANGED = "unchanged"
+
+
+def table_digest(corpus, ref):
+    """sha1 of the regra.dmn.xml bytes a corpus table was loaded from"""
+    content_hash = getattr(corpus, "content_hash", None)
+    if content_hash is not None:
+        return content_hash(ref.key)
+    with open(ref.path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+class _Pair:
+    __slots__ = ("ref", "table", "error")
+
+    def __init__(self, ref=None, table=None, error=None):
+        self.ref = ref
+        self.table = table
+        self.error = error
+
+
+class Shadow:
+    """The tables of a candidate corpus, paired with a live corpus by key"""
+
+    def __init__(self, live, candidate):
+        self.live = live
+        self.candidate = candidate
+        self._pairs = {}
+        # Keys whose candidate table is byte-identical: the fast path of match()
+        self._unchanged = set()
+        self.unchanged = self.evaluated = self.missing = 0
+        self.seconds = 0.0
+
+    def _pair(self, key):
+        ref = self.live.resolve(key)
+        try:
+            candidate_ref = self.candidate.resolve(ref.key)
+        except DmnError:
+            return _Pair(error=f"no table {ref.key} in the candidate corpus")
+        if table_digest(self.live, ref) == table_digest(self.candidate, candidate_ref):
+            self._unchanged.add(key)
+            return _Pair(candidate_ref)
+        try:
+            return _Pair(candidate_ref, self.candidate.get(candidate_ref.key))
+        except DmnError as exc:
+            return _Pair(candidate_ref, error=str(exc))
+
+    def changed(self, key):
+        """True when the candidate table differs from the live one (or is missing)"""
+        if key not in self._pairs:
+            self._pairs[key] = self._pair(key)
+        return key not in self._unchanged
+
+    def match(self, key, ctx):
+        """UNCHANGED, or (candidate rule, its outputs) for a live table key.
+
+        Raises DmnError when the candidate lacks the table or cannot load it.
+        """
+        if key in self._unchanged:
+            self.unchanged += 1
+            return UNCHANGED
+        pair = self._pairs.get(key)
+        if pair is None:
+            pair = self._pairs[key] = self._pair(key)
+            if key in self._unchanged:
+                self.unchanged += 1
+                return UNCHANGED
+        if pair.error is not None:
+            self.missing += 1
+            raise DmnError(pair.error)
+        self.evaluated += 1
+        started = time.perf_counter()
+        rule = pair.table.match(ctx)
+        outputs = rule.output(ctx) if rule is not None else None
+        self.seconds += time.perf_counter() - started
+        return rule, outputs
+
+    def changed_tables(self):
+        """Keys of the live tables the candidate changes or lacks (loads every pair)"""
+        return [ref.key for ref in self.live if self.changed(ref.key)]
+
+    def stats(self):
+        """Claims compared, split by outcome, and the seconds spent in the candidate"""
+        return {
+            "compared": self.unchanged + self.evaluated + self.missing,
+            "unchanged": self.unchanged,
+            "evaluated": self.evaluated,
+            "missing": self.missing,
+            "seconds": self.seconds,
+        }
@@ -0,0 +1,214 @@
+"""
+Shared-fragment composition: evaluate the cross-cutting rules once per claim
+
+dmn/cross-cutting/shared-rules holds the fragments the specialty tables copy:
+documentation-gate.dmn.xml (documentacaoClinica) and
+contraindications-universal.dmn.xml (expectativaVidaSuperior1Ano,
+consentimentoInformado, infeccaoAtivaNaoControlada, ecogStatus,
+pacienteGravida). Each specialty copies only the inputs that apply to it, and
+every copy re-tests them for every table a claim touches.
+
+In composition mode a specialty table becomes a decision that depends on the
+fragments, as a DRD with knowledge requirements would model it:
+
+    shared = SharedFragments(corpus)
+    claim = shared.claim(ctx)           # fragment tests run at most once per claim
+    claim.match("20101201")             # {"rule", "outputs", "source"}
+    claim.match("31101055")             # reuses the fragment results
+    claim.fragments()                   # the fragments' own decisions
+
+A table depends on a fragment rule when one of its own rules is a copy of
+it: the same tests on the same inputs, whatever the outputs say. That copy
+keeps its place in the table. When the table reaches it, the fragment
+rule's cached result is used instead of testing it again, and the copy's
+own outputs are returned. Blocking rules are everything except the
+pass-through rules listed in PASS_THROUGH; only they are shared.
+
+FIRST order is therefore unchanged and a composed table returns the same
+rule and outputs as the table evaluated on its own. Only the source tells
+that a fragment decided. Copies that drifted from the fragment (another
+value, an extra test) are not copies and are evaluated as usual.
+"""
+
+from pathlib import Path
+
+from .engine import NEVER, _coercer, compile_table, parse_table
+from .loader import load_table
+
+SHARED_DIR = "cross-cutting/shared-rules"
+FRAGMENTS = ("documentation-gate", "contraindications-universal")
+
+# Fragment rules that let the claim proceed to the specialty table
+PASS_THROUGH = {
+    "documentation-gate": ("Rule_Documentation_Complete", "Rule_Default_Documentation"),
+    "contraindications-universal": ("Rule_No_Contraindications", "Rule_Default_Contraindications"),
+}
+
+
+class _Fragment:
+    """A compiled fragment and the inputs each of its blocking rules tests"""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.table = compile_table(load_table(path))
+        input_asts, parsed_rules, _ = parse_table(self.table.source)
+        self.inputs = self.table.input_names
+        passing = PASS_THROUGH.get(name, ())
+        self.blocking = []
+        for rule, (test_asts, _) in zip(self.table.rules, parsed_rules):
+            if rule.id in passing or not rule.tests:
+                continue
+            tests = frozenset(
+                (self.inputs[col], _type_key(self.table.source.inputs[col].type_ref), _freeze(ast))
+                for col, ast in enumerate(test_asts) if ast is not None
+            )
+            needs = frozenset(self.inputs[col] for col, _ in rule.tests)
+            self.blocking.append((rule, needs, tests))
+
+
+def _type_key(type_ref):
+    """Input types that coerce the same way compare equal"""
+    coerce = _coercer(type_ref)
+    return None if coerce is None else coerce.__name__
+
+
+def _freeze(ast):
+    """Hashable copy of a parsed test (lists become tuples)"""
+    if isinstance(ast, (list, tuple)):
+        return tuple(_freeze(a) for a in ast)
+    return ast
+
+
+class _Plan:
+    """How one table composes with the fragments"""
+
+    __slots__ = ("key", "table", "depends", "shared")
+
+    def __init__(self, key, table, depends, shared):
+        self.key = key
+        self.table = table
+        self.depends = depends
+        self.shared = shared
+
+
+class SharedFragments:
+    """The shared fragments of a corpus and the tables that depend on them"""
+
+    def __init__(self, corpus, root=None, fragments=FRAGMENTS):
+        self.corpus = corpus
+        base = Path(root or corpus.root) / SHARED_DIR
+        self.fragments = [_Fragment(name, base / f"{name}.dmn.xml") for name in fragments]
+        self._plans = {}
+
+    def plan(self, name):
+        """The composed form of a table (cached)"""
+        ref = self.corpus.resolve(name)
+        plan = self._plans.get(ref.key)
+        if plan is None:
+            plan = self._plans[ref.key] = self._plan(ref.key)
+        return plan
+
+    def _plan(self, key):
+        table = self.corpus.get(key)
+        declared = set(table.input_names)
+        copies = {}
+        for fragment in self.fragments:
+            for rule, needs, tests in fragment.blocking:
+                if needs <= declared:
+                    copies.setdefault(tests, (fragment, rule))
+        if not copies:
+            return _Plan(key, table, (), {})
+
+        input_asts, parsed_rules, _ = parse_table(table.source)
+        clauses = table.source.inputs
+        depends = []
+        shared = {}
+        for rule, (test_asts, _) in zip(table.rules, parsed_rules):
+            if not rule.tests:
+                continue
+            tests = frozenset(
+                (table.input_names[col], _type_key(clauses[col].type_ref), _freeze(ast))
+                for col, ast in enumerate(test_asts)
+                if ast is not None and ast != NEVER and input_asts[col][0] == "name"
+            )
+            copy = copies.get(tests) if len(tests) == len(rule.tests) else None
+            if copy is not None:
+                shared[rule.index] = copy
+                if copy not in depends:
+                    depends.append(copy)
+        return _Plan(key, table, tuple(depends), shared)
+
+    def dependencies(self, name):
+        """Ids of the fragment rules a table depends on, as "fragment:rule" """
+        return [f"{fragment.name}:{rule.id}" for fragment, rule in self.plan(name).depends]
+
+    def claim(self, ctx):
+        """Start the composed evaluation of one claim"""
+        return ClaimEvaluation(self, ctx)
+
+
+class ClaimEvaluation:
+    """One claim's fragment results, shared by every table it is matched against"""
+
+    def __init__(self, shared, ctx):
+        self.shared = shared
+        self.ctx = ctx
+        self._values = {}
+        self._holds = {}
+
+    def _fragment_values(self, fragment):
+        values = self._values.get(fragment.name)
+        if values is None:
+            values = self._values[fragment.name] = fragment.table.input_values(self.ctx)
+        return values
+
+    def _rule_holds(self, fragment, rule):
+        key = (fragment.name, rule.index)
+        held = self._holds.get(key)
+        if held is None:
+            held = self._holds[key] = rule.matches(self._fragment_values(fragment), self.ctx)
+        return held
+
+    def fragments(self):
+        """{fragment name: {"rule", "outputs"}} for the fragments themselves"""
+        result = {}
+        for fragment in self.shared.fragments:
+            fired = next((rule for rule in fragment.table.rules
+                          if not rule.tests or self._rule_holds(fragment, rule)), None)
+            result[fragment.name] = {
+                "rule": fired.id if fired is not None else None,
+                "outputs": fired.output(self.ctx) if fired is not None else None,
+            }
+        return result
+
+    def match(self, name):
+        """{"rule", "outputs", "source"} of a table under composition.
+
+        rule and outputs are those of the table evaluated on its own. source
+        is "fragment-name" when the rule that fired is a copy of a blocking
+        fragment rule, otherwise the table key.
+        """
+        plan = self.shared.plan(name)
+        values = None
+        source = plan.key
+        fired = None
+        for rule in plan.table.rules:
+            copy = plan.shared.get(rule.index)
+            if copy is not None:
+                if self._rule_holds(*copy):
+                    fired, source = rule, copy[0].name
+                    break
+                continue
+            if values is None:
+                values = plan.table.input_values(self.ctx)
+            if rule.matches(values, self.ctx):
+                fired = rule
+                break
+        return {
+            "rule": fired.id if fired is not None else None,
+            "outputs": fired.output(self.ctx) if fired is not None else None,
+            "source": source,
+        }
+
+    def evaluate(self, name):
+        return self.match(name)["outputs"]
@@ -0,0 +1,202 @@
+"""
+Pre-parsed binary snapshot of the whole corpus
+
+Parsing 2,400+ XML files and their metadata.json sidecars on every worker boot
+is the dominant cold-start cost. build_snapshot() does it once and writes a
+single file; Snapshot memory-maps that file, reads only the offset table and
+materializes (unmarshals + compiles) a table the first time it is requested.
+
+File layout (little endian):
+
+    header   magic "DMNSNAP1", python major/minor, table count,
+             index offset, index length
+    records  one marshal blob per table:
+             (table fields, parse_table() result, metadata or None)
+    index    marshal of (root, [(key, code, family, group, relpath,
+             metadata relpath or None, offset, length, sha1), ...])
+
+marshal is used because the records are plain tuples/lists/dicts and it is the
+fastest stdlib codec for them; its format is tied to the Python version, so
+the header records the version that wrote the file and Snapshot refuses others.
+"""
+
+import hashlib
+import marshal
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from pathlib import Path
+
+from .corpus import DEFAULT_ROOT, FAMILIES, Corpus, TableRef, discover
+from .engine import parse_table
+from .errors import DmnError, DmnParseError
+from .loader import parse_dmn
+from .model import DecisionTable, InputClause, OutputClause, Rule
+
+MAGIC = b"DMNSNAP1"
+_HEADER = struct.Struct("<8sHHIQQ")
+
+
+def _table_to_tuple(table, root):
+    path = table.path
+    if path is not None:
+        path = Path(path).resolve().relative_to(Path(root).resolve()).as_posix()
+    return (
+        table.id, table.name, table.decision_id, table.hit_policy,
+        [(c.id, c.label, c.expression, c.type_ref, c.input_values) for c in table.inputs],
+        [(c.id, c.name, c.label, c.type_ref, c.output_values) for c in table.outputs],
+        [(r.id, r.description, r.input_entries, r.output_entries) for r in table.rules],
+        path, table.repaired, table.definitions_name, table.extra_decisions,
+    )
+
+
+def _table_from_tuple(data, root):
+    (id_, name, decision_id, hit_policy, inputs, outputs, rules,
+     path, repaired, definitions_name, extra) = data
+    return DecisionTable(
+        id=id_,
+        name=name,
+        decision_id=decision_id,
+        hit_policy=hit_policy,
+        inputs=[InputClause(*c) for c in inputs],
+        outputs=[OutputClause(*c) for c in outputs],
+        rules=[Rule(*r) for r in rules],
+        path=str(Path(root) / path) if path is not None else None,
+        repaired=repaired,
+        definitions_name=definitions_name,
+        extra_decisions=extra,
+    )
+
+
+def build_snapshot(output, root=None, families=FAMILIES):
+    """Parse the corpus under root and write a snapshot file to output.
+
+    Returns (count, errors) where errors lists "key: message" for tables that
+    could not be parsed and were left out. The file is written to a temporary
+    name and renamed, so readers never see a half-written snapshot.
+    """
+    root = Path(root or DEFAULT_ROOT)
+    output = Path(output)
+    errors = []
+    entries = []
+    fd, tmp = tempfile.mkstemp(prefix=output.name + ".", dir=output.parent or ".")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            out.write(b"\0" * _HEADER.size)
+            offset = _HEADER.size
+            for ref in discover(root, families):
+                with open(ref.path, "rb") as f:
+                    data = f.read()
+                try:
+                    table = parse_dmn(data, ref.path)
+                except DmnParseError as exc:
+                    errors.append(f"{ref.key}: {exc}")
+                    continue
+                metadata = None
+                if ref.metadata_path is not None:
+                    try:
+                        metadata = ref.load_metadata()
+                    except ValueError as exc:
+                        errors.append(f"{ref.key}: metadata.json: {exc}")
+                blob = marshal.dumps((_table_to_tuple(table, root), parse_table(table), metadata))
+                out.write(blob)
+                entries.append((
+                    ref.key, ref.code, ref.family, ref.group,
+                    Path(ref.path).relative_to(root).as_posix(),
+                    Path(ref.metadata_path).relative_to(root).as_posix() if metadata is not None else None,
+                    offset, len(blob),
+                    hashlib.sha1(data).hexdigest(),
+                ))
+                offset += len(blob)
+            index = marshal.dumps((str(root), entries))
+            out.write(index)
+            out.seek(0)
+            out.write(_HEADER.pack(MAGIC, sys.version_info[0], sys.version_info[1],
+                                   len(entries), offset, len(index)))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, output)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return len(entries), errors
+
+
+class Snapshot(Corpus):
+    """A Corpus backed by a memory-mapped snapshot file instead of the XML tree"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._refs = {}
+        self._by_code = {}
+        self._compiled = {}
+        self._entries = {}
+        self._file = open(self.path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, major, minor, count, index_offset, index_length = \
+                _HEADER.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise DmnError(f"{path} is not a dmn_engine snapshot")
+            if (major, minor) != sys.version_info[:2]:
+                raise DmnError(
+                    f"{path} was built with Python {major}.{minor}; rebuild it for "
+                    f"{sys.version_info[0]}.{sys.version_info[1]}")
+            root, entries = marshal.loads(self._mm[index_offset:index_offset + index_length])
+        except BaseException:
+            self.close()
+            raise
+        self.root = Path(root)
+        join = os.path.join
+        for key, code, family, group, relpath, metapath, offset, length, sha1 in entries:
+            self._add_ref(TableRef(
+                key=key, code=code, family=family, group=group, path=join(root, relpath),
+                metadata_path=join(root, metapath) if metapath is not None else None,
+            ))
+            self._entries[key] = (offset, length, sha1)
+
+    def _record(self, key):
+        offset, length, _ = self._entries[key]
+        return marshal.loads(self._mm[offset:offset + length])
+
+    def _load(self, ref):
+        table_data, parsed, _ = self._record(ref.key)
+        return _table_from_tuple(table_data, self.root), parsed
+
+    def content_hash(self, name, group=None, family=None):
+        """sha1 of the regra.dmn.xml bytes the snapshot was built from"""
+        return self._entries[self.resolve(name, group, family).key][2]
+
+    def metadata(self, name, group=None, family=None):
+        return self._record(self.resolve(name, group, family).key)[2]
+
+    def close(self):
+        mm = getattr(self, "_mm", None)
+        if mm is not None:
+            mm.close()
+            self._mm = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def describe(path):
+    """Summary dict of a snapshot file, for `snapshot info`"""
+    with Snapshot(path) as snap:
+        families = {}
+        for ref in snap:
+            families[ref.family] = families.get(ref.family, 0) + 1
+        return {
+            "path": str(path),
+            "root": str(snap.root),
+            "tables": len(snap),
+            "bytes": os.path.getsize(path),
+            "families": families,
+        }
@@ -0,0 +1,185 @@
+"""
+In-memory stand-in for the Camunda 7 external-task REST API
+
+Enough of /engine-rest for worker.py to run against without an engine:
+fetchAndLock (with long polling, priorities and lock expiry), complete,
+failure (retries, retryTimeout, incidents at zero retries) and bpmnError.
+
+    engine = StubEngine()
+    url = await engine.start()                       # http://127.0.0.1:<port>/engine-rest
+    engine.add_task("ews-news2", {"frequenciaRespiratoria": 26, ...})
+    ...
+    engine.completed                                 # {task id: output variables}
+
+fail_next(n) makes the next n requests answer 503, to exercise the worker's
+retries and circuit breaker.
+"""
+
+import asyncio
+import itertools
+import json
+import time
+
+from .worker import to_camunda
+
+
+class StubEngine:
+    """The external tasks of one fake process engine, served over HTTP/1.1"""
+
+    def __init__(self, prefix="/engine-rest"):
+        self.prefix = prefix.rstrip("/")
+        self.tasks = {}
+        self.completed = {}
+        self.bpmn_errors = {}
+        self.incidents = {}
+        self.failures = 0
+        self.requests = 0
+        self._ids = itertools.count(1)
+        self._fail = 0
+        self._fail_status = 503
+        self._changed = None
+        self._server = None
+        self._connections = {}
+
+    def add_task(self, topic, variables=None, priority=0, retries=None):
+        """Queue an external task; variables are plain values. Returns its id"""
+        task_id = f"task-{next(self._ids)}"
+        self.tasks[task_id] = {
+            "id": task_id, "topicName": topic, "priority": priority, "retries": retries,
+            "variables": to_camunda(variables or {}), "workerId": None, "lockExpiration": 0.0,
+            "errorMessage": None,
+        }
+        if self._changed is not None:
+            self._changed.set()
+        return task_id
+
+    def fail_next(self, n, status=503):
+        self._fail = n
+        self._fail_status = status
+
+    @property
+    def pending(self):
+        return len(self.tasks)
+
+    async def start(self, host="127.0.0.1", port=0):
+        """Start serving; returns the base URL"""
+        self._changed = asyncio.Event()
+        self._server = await asyncio.start_server(self._serve, host, port)
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{port}{self.prefix}"
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await asyncio.gather(*self._connections.values(), return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+
+    # -- HTTP ------------------------------------------------------------
+
+    async def _serve(self, reader, writer):
+        self._connections[writer] = asyncio.current_task()
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, path, _ = line.decode("latin-1").split(" ", 2)
+                length = 0
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    if name.strip().lower() == "content-length":
+                        length = int(value)
+                body = json.loads(await reader.readexactly(length)) if length else None
+                status, data = await self._dispatch(method, path, body)
+                payload = b"" if data is None else json.dumps(data).encode("utf-8")
+                head = f"HTTP/1.1 {status} X\r\n"
+                if status != 204:
+                    # Like Tomcat: a 204 carries no Content-Length
+                    head += f"Content-Length: {len(payload)}\r\n"
+                if data is not None:
+                    head += "Content-Type: application/json\r\n"
+                writer.write(head.encode("ascii") + b"\r\n" + payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.pop(writer, None)
+            writer.close()
+
+    async def _dispatch(self, method, path, body):
+        self.requests += 1
+        if self._fail > 0:
+            self._fail -= 1
+            return self._fail_status, {"type": "RestException", "message": "injected failure"}
+        if method != "POST" or not path.startswith(self.prefix + "/external-task/"):
+            return 404, {"type": "RestException", "message": f"no route {method} {path}"}
+        parts = path[len(self.prefix) + len("/external-task/"):].split("/")
+        if parts == ["fetchAndLock"]:
+            return 200, await self._fetch(body)
+        if len(parts) == 2 and parts[1] in ("complete", "failure", "bpmnError"):
+            return self._finish(parts[0], parts[1], body)
+        return 404, {"type": "RestException", "message": f"no route {method} {path}"}
+
+    # -- External tasks --------------------------------------------------
+
+    def _lockable(self, topics, now):
+        for task in self.tasks.values():
+            if task["lockExpiration"] <= now and task["topicName"] in topics \
+                    and task["retries"] != 0:
+                yield task
+
+    async def _fetch(self, body):
+        topics = {t["topicName"]: t for t in body["topics"]}
+        deadline = time.monotonic() + body.get("asyncResponseTimeout", 0) / 1000.0
+        while True:
+            now = time.monotonic()
+            found = list(self._lockable(topics, now))
+            if found or now >= deadline:
+                break
+            self._changed.clear()
+            try:
+                await asyncio.wait_for(self._changed.wait(), deadline - now)
+            except asyncio.TimeoutError:
+                pass
+        if body.get("usePriority"):
+            found.sort(key=lambda t: -t["priority"])
+        locked = []
+        for task in found[:body["maxTasks"]]:
+            topic = topics[task["topicName"]]
+            task["workerId"] = body["workerId"]
+            task["lockExpiration"] = now + topic["lockDuration"] / 1000.0
+            wanted = topic.get("variables")
+            variables = task["variables"] if wanted is None else \
+                {k: v for k, v in task["variables"].items() if k in wanted}
+            locked.append({k: v for k, v in task.items() if k != "lockExpiration"}
+                          | {"variables": variables})
+        return locked
+
+    def _finish(self, task_id, action, body):
+        task = self.tasks.get(task_id)
+        if task is None:
+            return 404, {"type": "RestException",
+                         "message": f"External task with id {task_id} does not exist"}
+        if task["workerId"] != body.get("workerId") or task["lockExpiration"] <= time.monotonic():
+            return 400, {"type": "BadUserRequestException",
+                         "message": f"External task {task_id} is not locked by this worker"}
+        if action == "complete":
+            del self.tasks[task_id]
+            self.completed[task_id] = body.get("variables") or {}
+        elif action == "bpmnError":
+            del self.tasks[task_id]
+            self.bpmn_errors[task_id] = body
+        else:
+            self.failures += 1
+            task["retries"] = body.get("retries")
+            task["errorMessage"] = body.get("errorMessage")
+            task["lockExpiration"] = time.monotonic() + body.get("retryTimeout", 0) / 1000.0
+            if task["retries"] == 0:
+                self.incidents[task_id] = body
+        return 204, None
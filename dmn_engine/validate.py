@@ -0,0 +1,507 @@
+"""
+Consistency check of every regra.dmn.xml against its metadata.json
+
+validate() reads each table with an incremental XML parser (rules are
+checked and dropped as they are read, so memory does not grow with the
+file), fans the files out to a process pool and yields the findings of
+every table:
+
+    for ref, findings in validate(families=["Regras-Clinicas-Hospitais"]):
+        ...   # [{"severity": "warning", "code": "feel-nonstandard",
+              #   "rule": "Rule_SS_Fentanil", "column": "medicamentoNovo",
+              #   "message": '"FENTANIL" or "FENTANILA": ...'}]
+
+    python -m dmn_engine validate                       # exit 1 when a table has errors
+    python -m dmn_engine validate --family Regras-Audit-Operadora --all
+
+Errors are what makes the engine reject a table or a rule at load time:
+malformed XML that repair_xml() cannot fix, no decision table, an
+unsupported hitPolicy, rules with the wrong number of input entries, FEEL
+that does not parse (the rule can then never fire), and audit tables
+without the output column that the family _index.json outputStandard
+requires. A metadata.json that is not JSON is an error too (Corpus.metadata()
+raises on it).
+Warnings are what loads but is wrong, slow or not portable to another DMN
+engine:
+
+    xml-repaired        not well-formed; the loader parses it twice
+    extra-decision      decisions after the first are ignored
+    output-shape        a rule with fewer or more output entries than outputs
+                        (the missing outputs are null)
+    feel-nonstandard    "A" or "B" / X and Y as unary tests, bare words used
+                        as string literals (the engine is lenient, FEEL is not)
+    input-undeclared    DMN input missing from metadata.json inputs
+    input-unused        metadata.json input the DMN does not read
+    input-type          DMN typeRef and metadata type disagree
+    allowed-values      metadata allowedValues and DMN inputValues differ
+    value-not-allowed   a test literal outside the declared values
+    output-value        a resultado outside outputStandard values
+    metadata-invalid    metadata.json is JSON but not an object
+
+A table without metadata.json is only checked against itself.
+
+Results are cached by content: the sha1 of the DMN bytes, the metadata bytes
+and the family outputStandard. With a cache file, a run only re-reads the
+tables that changed since the last one.
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+from .analyzer import input_specs
+from .corpus import DEFAULT_ROOT, FAMILIES, discover
+from .engine import MULTI_HIT_POLICIES, SINGLE_HIT_POLICIES, _parse_input
+from .errors import FeelSyntaxError
+from .feel import parse_expression, parse_unary_tests
+from .indexer import INDEX_FILES
+from .loader import _local, repair_xml
+from .model import InputClause
+
+# Bump when the checks change, so cached results are not reused
+VERSION = 2
+
+ERROR = "error"
+WARNING = "warning"
+
+_NUMERIC_TYPES = ("number", "integer", "long", "double")
+_DATE_TYPES = ("date", "datetime", "date and time", "time")
+_READ_SIZE = 1 << 16
+
+
+def _kind(type_name):
+    """Type family for comparing a DMN typeRef with a metadata type"""
+    t = (type_name or "").strip().lower()
+    if t in _NUMERIC_TYPES:
+        return "number"
+    if t in _DATE_TYPES:
+        return "date"
+    return t or None
+
+
+def _finding(severity, code, message, rule=None, column=None):
+    finding = {"severity": severity, "code": code}
+    if rule is not None:
+        finding["rule"] = rule
+    if column is not None:
+        finding["column"] = column
+    finding["message"] = message
+    return finding
+
+
+def output_standards(root=None):
+    """{family: outputStandard} from the family index files that declare one"""
+    root = Path(root or DEFAULT_ROOT)
+    standards = {}
+    for family, name in INDEX_FILES.items():
+        try:
+            with open(root / family / name, encoding="utf-8") as f:
+                standard = json.load(f).get("outputStandard")
+        except (OSError, ValueError):
+            continue
+        if isinstance(standard, dict) and standard.get("name"):
+            standards[family] = standard
+    return standards
+
+
+# ---------------------------------------------------------------------------
+# Incremental read of one DMN file
+# ---------------------------------------------------------------------------
+
+def _text(elem):
+    for child in elem:
+        if _local(child.tag) == "text":
+            return (child.text or "").strip()
+    return None
+
+
+def _events(source):
+    """iterparse-style (event, elem) pairs from a file object or bytes"""
+    parser = ET.XMLPullParser(events=("start", "end"))
+    if isinstance(source, bytes):
+        parser.feed(source)
+        yield from parser.read_events()
+    else:
+        while True:
+            chunk = source.read(_READ_SIZE)
+            if not chunk:
+                break
+            parser.feed(chunk)
+            yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+class _Reader:
+    """Collects the clauses of the first decision table and hands out its rules"""
+
+    def __init__(self, on_rule):
+        self.on_rule = on_rule
+        self.decisions = 0
+        self.hit_policy = None
+        self.inputs = []
+        self.outputs = []
+        self.rules = 0
+        self._in_table = False
+
+    def read(self, source):
+        on_rule = self.on_rule
+        for event, elem in _events(source):
+            tag = _local(elem.tag)
+            if event == "start":
+                if tag == "decisionTable":
+                    self.decisions += 1
+                    self._in_table = self.decisions == 1
+                    if self._in_table:
+                        self.hit_policy = (elem.get("hitPolicy") or "UNIQUE").upper()
+                continue
+            if not self._in_table:
+                if tag == "rule":
+                    elem.clear()
+                continue
+            if tag == "input":
+                expr = None
+                values = None
+                for child in elem:
+                    name = _local(child.tag)
+                    if name == "inputExpression":
+                        expr = child
+                    elif name == "inputValues":
+                        values = _text(child)
+                self.inputs.append(InputClause(
+                    id=elem.get("id"), label=elem.get("label"),
+                    expression=(_text(expr) or "") if expr is not None else "",
+                    type_ref=expr.get("typeRef") if expr is not None else None,
+                    input_values=values))
+            elif tag == "output":
+                self.outputs.append((elem.get("name") or elem.get("label") or elem.get("id") or "",
+                                     elem.get("typeRef")))
+            elif tag == "rule":
+                inputs, outputs = [], []
+                for child in elem:
+                    name = _local(child.tag)
+                    if name == "inputEntry":
+                        inputs.append(_text(child) or "")
+                    elif name == "outputEntry":
+                        outputs.append(_text(child) or "")
+                on_rule(self.rules, elem.get("id"), inputs, outputs)
+                self.rules += 1
+                elem.clear()
+            elif tag == "decisionTable":
+                self._in_table = False
+
+
+# ---------------------------------------------------------------------------
+# Checks
+# ---------------------------------------------------------------------------
+
+def _lenient(ast, names, found):
+    """Describe the parts of a unary-test AST only this engine accepts, once each"""
+    for test in ast[1]:
+        tag = test[0]
+        problem = None
+        if tag == "any_of" or tag == "all_of":
+            # The parser nests chains ("A" or "B" or "C"): describe them once
+            problem = ("tests joined with " + ("or" if tag == "any_of" else "and")
+                       + ' (standard FEEL: a comma list, or "?" in an expression)')
+        elif tag == "eq" and test[1][0] == "name" and test[1][1] not in names:
+            problem = f"bare word {test[1][1]!r} compared as a string"
+        if problem is not None and problem not in found:
+            found.append(problem)
+        if tag in ("any_of", "all_of", "negate"):
+            _lenient((None, test[1]), names, found)
+    return found
+
+
+def _literals(ast, found):
+    """String and number literals an equality/list test compares the input with"""
+    for test in ast[1]:
+        tag = test[0]
+        if tag == "eq" and test[1][0] == "lit" and test[1][1] is not None \
+                and not isinstance(test[1][1], bool):
+            found.append(test[1][1])
+        elif tag in ("any_of", "negate"):
+            _literals((None, test[1]), found)
+    return found
+
+
+def _declared_values(text):
+    """Literal values of an <inputValues>, or None"""
+    if not text:
+        return None
+    try:
+        ast = parse_unary_tests(text)
+    except FeelSyntaxError:
+        return None
+    if ast is None or ast[0] != "tests" or not all(
+            p[0] == "eq" and p[1][0] == "lit" for p in ast[1]):
+        return None
+    return [p[1][1] for p in ast[1]]
+
+
+def _same_values(a, b):
+    return {(type(v) is str, v) for v in a} == {(type(v) is str, v) for v in b}
+
+
+class _TableCheck:
+    def __init__(self, metadata, standard):
+        self.findings = []
+        self.metadata = metadata
+        self.standard = standard
+        self.columns = None
+
+    def add(self, severity, code, message, rule=None, column=None):
+        self.findings.append(_finding(severity, code, message, rule, column))
+
+    def start(self, reader):
+        """Check the clauses once the first rule (or the end) is reached"""
+        specs = input_specs(self.metadata) if isinstance(self.metadata, dict) else {}
+        declared = isinstance(self.metadata, dict) and bool(specs)
+        self.columns = []
+        names = set()
+        for col, clause in enumerate(reader.inputs):
+            label = clause.expression or clause.id or f"input {col + 1}"
+            try:
+                ast = _parse_input(clause)
+            except FeelSyntaxError as exc:
+                self.add(ERROR, "feel-syntax", f"input expression: {exc}", column=label)
+                ast = None
+            name = ast[1] if ast is not None and ast[0] == "name" else None
+            if name is not None:
+                names.add(name)
+            domain = _declared_values(clause.input_values)
+            spec = specs.get(name) if name is not None else None
+            if declared and name is not None and spec is None:
+                self.add(WARNING, "input-undeclared",
+                         f"{name} is not among the metadata.json inputs", column=name)
+            if spec is not None:
+                dmn_kind, meta_kind = _kind(clause.type_ref), _kind(spec.get("type"))
+                if dmn_kind and meta_kind and dmn_kind != meta_kind:
+                    self.add(WARNING, "input-type",
+                             f"typeRef {clause.type_ref} but metadata type {spec.get('type')}",
+                             column=name)
+                allowed = [v for v in spec.get("allowedValues") or ()
+                           if not isinstance(v, (list, dict))]
+                if allowed and domain is not None and not _same_values(allowed, domain):
+                    self.add(WARNING, "allowed-values",
+                             f"allowedValues {allowed} but inputValues {domain}", column=name)
+                if domain is None and allowed:
+                    domain = allowed
+            self.columns.append((label, domain))
+        if declared:
+            for name in specs:
+                if name not in names:
+                    self.add(WARNING, "input-unused",
+                             f"metadata.json input {name} is not a DMN input", column=name)
+        self.names = names
+        self.result_column = None
+        if self.standard is not None:
+            output_names = [name for name, _ in reader.outputs]
+            if self.standard["name"] in output_names:
+                self.result_column = output_names.index(self.standard["name"])
+            else:
+                self.add(ERROR, "output-standard",
+                         f"no {self.standard['name']} output (outputStandard of the family)")
+
+    def rule(self, reader, index, rule_id, inputs, outputs):
+        if self.columns is None:
+            self.start(reader)
+        label = rule_id or f"#{index + 1}"
+        if len(inputs) != len(reader.inputs):
+            self.add(ERROR, "rule-shape",
+                     f"{len(inputs)} input entries for {len(reader.inputs)} inputs", rule=label)
+        if len(outputs) != len(reader.outputs):
+            self.add(WARNING, "output-shape",
+                     f"{len(outputs)} output entries for {len(reader.outputs)} outputs", rule=label)
+        for col, text in enumerate(inputs[:len(self.columns)]):
+            column, domain = self.columns[col]
+            try:
+                ast = parse_unary_tests(text)
+            except FeelSyntaxError as exc:
+                self.add(ERROR, "feel-syntax", f"{text!r}: {exc} (the rule never fires)",
+                         rule=label, column=column)
+                continue
+            if ast is None:
+                continue
+            for problem in _lenient(ast, self.names, []):
+                self.add(WARNING, "feel-nonstandard", f"{text}: {problem}",
+                         rule=label, column=column)
+            if domain is not None and ast[0] == "tests":
+                outside = [v for v in _literals(ast, []) if not any(
+                    v == d and (type(v) is str) == (type(d) is str) for d in domain)]
+                if outside:
+                    self.add(WARNING, "value-not-allowed",
+                             f"{text} tests {outside}, not in {domain}", rule=label, column=column)
+        for j, text in enumerate(outputs[:len(reader.outputs)]):
+            name = reader.outputs[j][0]
+            try:
+                ast = parse_expression(text) if text else ("lit", None)
+            except FeelSyntaxError as exc:
+                stripped = text.strip()
+                if len(stripped) >= 2 and stripped[0] == stripped[-1] == '"':
+                    ast = ("lit", stripped[1:-1])
+                else:
+                    self.add(ERROR, "feel-syntax", f"{text!r}: {exc}", rule=label, column=name)
+                    continue
+            if j == self.result_column and ast[0] == "lit" and ast[1] is not None \
+                    and ast[1] not in self.standard.get("values", (ast[1],)):
+                self.add(WARNING, "output-value",
+                         f"{name} {ast[1]!r} is not one of {self.standard['values']}",
+                         rule=label, column=name)
+
+
+def check_table(path, metadata_path=None, output_standard=None):
+    """Findings for one DMN file, its metadata.json and the family outputStandard"""
+    metadata = None
+    findings = []
+    if metadata_path is not None:
+        try:
+            with open(metadata_path, encoding="utf-8") as f:
+                metadata = json.load(f)
+        except ValueError as exc:
+            findings.append(_finding(ERROR, "metadata-invalid", f"metadata.json: {exc}"))
+        else:
+            if not isinstance(metadata, dict):
+                findings.append(_finding(WARNING, "metadata-invalid",
+                                         "metadata.json is not a JSON object"))
+                metadata = None
+
+    def run(source):
+        check = _TableCheck(metadata, output_standard)
+        reader = _Reader(lambda *rule: check.rule(reader, *rule))
+        reader.read(source)
+        if check.columns is None:
+            check.start(reader)
+        return reader, check
+
+    try:
+        with open(path, "rb") as f:
+            try:
+                reader, check = run(f)
+            except ET.ParseError as first_error:
+                f.seek(0)
+                try:
+                    reader, check = run(repair_xml(f.read()))
+                except ET.ParseError:
+                    return findings + [_finding(ERROR, "xml-malformed", str(first_error))]
+                findings.append(_finding(WARNING, "xml-repaired",
+                                         f"{first_error}; repaired in memory, parsed twice"))
+    except OSError as exc:
+        return findings + [_finding(ERROR, "xml-malformed", str(exc))]
+
+    if reader.decisions == 0:
+        return findings + [_finding(ERROR, "no-decision-table", "no <decisionTable> found")]
+    if reader.decisions > 1:
+        findings.append(_finding(WARNING, "extra-decision",
+                                 f"{reader.decisions - 1} more decision tables are ignored"))
+    if reader.hit_policy not in SINGLE_HIT_POLICIES + MULTI_HIT_POLICIES:
+        findings.append(_finding(ERROR, "hit-policy",
+                                 f"hitPolicy {reader.hit_policy} is not supported"))
+    return findings + check.findings
+
+
+# ---------------------------------------------------------------------------
+# Corpus runs
+# ---------------------------------------------------------------------------
+
+def _digest(path, metadata_path, standard):
+    h = hashlib.sha1(f"{VERSION}\0".encode())
+    for p in (path, metadata_path):
+        h.update(b"\0")
+        if p is not None:
+            try:
+                with open(p, "rb") as f:
+                    h.update(f.read())
+            except OSError:
+                h.update(b"\1missing")
+    h.update(json.dumps(standard, sort_keys=True).encode())
+    return h.hexdigest()
+
+
+def _check_task(task):
+    key, path, metadata_path, standard = task
+    return key, check_table(path, metadata_path, standard)
+
+
+def read_cache(path):
+    """{table key: [digest, findings]} from a cache file (empty if unusable)"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != VERSION:
+        return {}
+    return data.get("tables") or {}
+
+
+def write_cache(path, tables):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp",
+                               dir=path.parent if str(path.parent) else ".")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"version": VERSION, "tables": tables}, f, ensure_ascii=False)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def validate(root=None, families=FAMILIES, names=None, workers=None, cache=None, stats=None):
+    """Yield (TableRef, findings) for every table, in corpus order.
+
+    names keeps the tables with these keys or codes. workers is the number
+    of processes (default: CPU count, 0 = inline). cache is the path of a
+    cache file, read before and written after the run. stats, if given, is a
+    dict that receives "tables", "checked" and "cached" counts.
+    """
+    root = Path(root or DEFAULT_ROOT)
+    standards = output_standards(root)
+    refs = list(discover(root, families))
+    if names:
+        wanted = set(names)
+        refs = [ref for ref in refs if ref.key in wanted or ref.code in wanted]
+    cached = read_cache(cache) if cache else {}
+    kept = {} if not names and tuple(families) == FAMILIES else dict(cached)
+
+    digests = {}
+    todo = []
+    for ref in refs:
+        standard = standards.get(ref.family)
+        digest = digests[ref.key] = _digest(ref.path, ref.metadata_path, standard)
+        entry = cached.get(ref.key)
+        if entry is None or entry[0] != digest:
+            todo.append((ref.key, ref.path, ref.metadata_path, standard))
+    if stats is not None:
+        stats.update(tables=len(refs), checked=len(todo), cached=len(refs) - len(todo))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    pool = None
+    if workers > 0 and len(todo) > 1:
+        pool = multiprocessing.get_context().Pool(min(workers, len(todo)))
+        results = pool.imap(_check_task, todo, chunksize=16)
+    else:
+        results = map(_check_task, todo)
+    pending = iter(results)
+    checked = {task[0] for task in todo}
+    try:
+        for ref in refs:
+            if ref.key in checked:
+                key, findings = next(pending)
+            else:
+                findings = cached[ref.key][1]
+            kept[ref.key] = [digests[ref.key], findings]
+            yield ref, findings
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    if cache:
+        write_cache(cache, kept)
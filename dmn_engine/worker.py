@@ -0,0 +1,544 @@
+"""
+asyncio external-task worker for the Camunda 7 REST API
+
+The Java workers follow RN-BaseWorker (Regras de Negocio (PT-BR)/02_Workers):
+fetch and lock, process, complete, retry with exponential backoff, BPMN error
+when the retries run out, and a circuit breaker around the work. The DMN
+decisions do not need a thread per task, so this worker does the same with
+one event loop:
+
+    worker = ExternalTaskWorker("http://camunda:8080/engine-rest", [
+        Subscription("autorizacao-tuss", audit_handler(Auditor(corpus))),
+        Subscription("ews-news2", table_handler(corpus, "EWS-NEWS-001")),
+    ], max_tasks=200, concurrency=32)
+    asyncio.run(worker.run())
+
+    python -m dmn_engine worker --url http://camunda:8080/engine-rest \\
+        --topic autorizacao-tuss --topic ews-news2=EWS-NEWS-001
+
+Each round long-polls fetchAndLock (asyncResponseTimeout) for as many tasks as
+there is room for, evaluates them in-process - a table match takes
+microseconds, so handlers run on the loop - and sends the completions
+concurrently. Camunda 7 has no bulk complete endpoint: the completions of a
+batch go out together over a pool of keep-alive connections, at most
+`concurrency` at a time, while the next fetch is already waiting.
+
+Failures follow BaseWorker. A handler exception reports /failure with
+retries - 1 and a retryTimeout of 2^(default_retries - retries) seconds; at
+zero retries it throws the BPMN error WORKER_FAILURE instead. A handler that
+raises BpmnError throws its code straight away. REST calls are retried three
+times with backoff, and a count-based CircuitBreaker (window 10, 5 calls
+minimum, 50% failures, 60 s open, 3 half-open probes - the workerCircuitBreaker
+settings) stops the worker from hammering an engine that is down; while it is
+open the worker waits instead of fetching. A completion that is finally lost
+is redelivered by the engine when its lock expires. A 400 on complete,
+failure or bpmnError means the worker no longer holds the lock; the task is
+dropped (worker.locks.lost) and the call counts as a success for the breaker,
+as every 4xx does.
+
+The HTTP client is a small HTTP/1.1 keep-alive pool on asyncio streams, so
+the worker needs nothing outside the standard library. stub.py is an
+in-memory engine with the same endpoints for local runs.
+"""
+
+import asyncio
+import collections
+import inspect
+import json
+import os
+import socket
+import ssl
+import time
+from urllib.parse import quote, urlsplit
+
+from .errors import DmnError
+
+DEFAULT_RETRIES = 3
+WORKER_FAILURE = "WORKER_FAILURE"
+
+# Java BaseWorker meter names; stats() reports the same counters
+_STATS = ("worker.executions.total.success", "worker.executions.total.failure",
+          "worker.retries.total", "worker.bpmn_errors.total",
+          "worker.circuit_breaker.activations", "worker.completions.lost",
+          "worker.locks.lost", "worker.fetches")
+
+
+class BpmnError(DmnError):
+    """Raised by a handler to throw a BPMN error instead of retrying"""
+
+    def __init__(self, code, message=None, variables=None):
+        super().__init__(message or code)
+        self.code = code
+        self.variables = variables or {}
+
+
+class EngineError(DmnError):
+    """The engine answered a REST call with an error status"""
+
+    def __init__(self, status, message):
+        super().__init__(f"HTTP {status}: {message}")
+        self.status = status
+
+
+class CircuitOpenError(DmnError):
+    """A REST call was refused because the circuit breaker is open"""
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+
+class HttpPool:
+    """JSON over HTTP/1.1 with at most `size` keep-alive connections to one host"""
+
+    def __init__(self, base_url, size=8, timeout=30.0):
+        parts = urlsplit(base_url)
+        if parts.scheme not in ("http", "https"):
+            raise DmnError(f"unsupported URL {base_url!r}")
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == "https" else 80)
+        self.ssl = ssl.create_default_context() if parts.scheme == "https" else None
+        self.prefix = parts.path.rstrip("/")
+        self.timeout = timeout
+        self._host_header = parts.netloc.rsplit("@", 1)[-1]
+        self._slots = asyncio.Semaphore(size)
+        self._idle = []
+
+    async def _open(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        sock = writer.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return reader, writer
+
+    async def request(self, method, path, body=None, timeout=None):
+        """(status, decoded JSON body or None)"""
+        payload = b"" if body is None else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        head = (f"{method} {self.prefix}{path} HTTP/1.1\r\n"
+                f"Host: {self._host_header}\r\n"
+                "Accept: application/json\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(payload)}\r\n\r\n").encode("ascii")
+        async with self._slots:
+            while True:
+                reused = bool(self._idle)
+                conn = self._idle.pop() if reused else await self._open()
+                try:
+                    status, data, keep = await asyncio.wait_for(
+                        self._exchange(conn, head + payload, method), timeout or self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                    conn[1].close()
+                    if reused:
+                        continue  # the server closed an idle connection; use a fresh one
+                    raise ConnectionError(str(exc)) from None
+                except BaseException:
+                    conn[1].close()
+                    raise
+                if keep:
+                    self._idle.append(conn)
+                else:
+                    conn[1].close()
+                return status, data
+
+    async def _exchange(self, conn, request, method="POST"):
+        reader, writer = conn
+        writer.write(request)
+        await writer.drain()
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionError("connection closed")
+            version, status = status_line.split(None, 2)[:2]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            # 1xx responses are interim and have no body; the final one follows
+            if not 100 <= int(status) < 200:
+                break
+        if method == "HEAD" or int(status) in (204, 304):
+            # No body, whatever the headers say (Tomcat sends no Content-Length on 204)
+            raw = b""
+        elif headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b";")[0], 16)
+                if size == 0:
+                    await reader.readline()
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readline()
+            raw = b"".join(chunks)
+        elif "content-length" in headers:
+            raw = await reader.readexactly(int(headers["content-length"]))
+        else:
+            raw = await reader.read()
+            headers["connection"] = "close"
+        keep = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        data = None
+        if raw and "json" in headers.get("content-type", "json"):
+            data = json.loads(raw)
+        return int(status), data, keep
+
+    async def close(self):
+        while self._idle:
+            self._idle.pop()[1].close()
+
+
+# ---------------------------------------------------------------------------
+# Resilience
+# ---------------------------------------------------------------------------
+
+class CircuitBreaker:
+    """Count-based breaker with the states of Resilience4j (CLOSED/OPEN/HALF_OPEN)"""
+
+    CLOSED, OPEN, HALF_OPEN = "CLOSED", "OPEN", "HALF_OPEN"
+
+    def __init__(self, window=10, minimum_calls=5, failure_rate=50.0, wait_open=60.0,
+                 half_open_calls=3, clock=time.monotonic):
+        self.window = window
+        self.minimum_calls = minimum_calls
+        self.failure_rate = failure_rate
+        self.wait_open = wait_open
+        self.half_open_calls = half_open_calls
+        self.clock = clock
+        self.state = self.CLOSED
+        self.activations = 0
+        self._results = collections.deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+
+    def allow(self):
+        """True when a call may go ahead (and counts a half-open probe)"""
+        if self.state == self.OPEN:
+            if self.clock() - self._opened_at < self.wait_open:
+                return False
+            self.state = self.HALF_OPEN
+            self._probes = self._probe_successes = 0
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_calls:
+                return False
+            self._probes += 1
+        return True
+
+    def retry_after(self):
+        """Seconds until an open breaker lets a probe through"""
+        if self.state != self.OPEN:
+            return 0.0
+        return max(0.0, self.wait_open - (self.clock() - self._opened_at))
+
+    def record(self, success):
+        if self.state == self.HALF_OPEN:
+            if not success:
+                self._open()
+                return
+            self._probe_successes += 1
+            if self._probe_successes >= self.half_open_calls:
+                self.state = self.CLOSED
+                self._results.clear()
+            return
+        self._results.append(success)
+        if self.state == self.CLOSED and len(self._results) >= self.minimum_calls:
+            failures = self._results.count(False)
+            if 100.0 * failures / len(self._results) >= self.failure_rate:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._opened_at = self.clock()
+        self.activations += 1
+        self._results.clear()
+
+
+# ---------------------------------------------------------------------------
+# Variables
+# ---------------------------------------------------------------------------
+
+def from_camunda(variables):
+    """{name: value} from Camunda's {name: {"type", "value", "valueInfo"}}"""
+    values = {}
+    for name, variable in (variables or {}).items():
+        value = variable.get("value")
+        kind = (variable.get("type") or "").lower()
+        info = variable.get("valueInfo") or {}
+        if isinstance(value, str) and (kind == "json" or (
+                kind == "object" and "json" in str(info.get("serializationDataFormat", "")))):
+            value = json.loads(value)
+        values[name] = value
+    return values
+
+
+def to_camunda(values):
+    """Camunda's typed variable form of a {name: value} dict"""
+    variables = {}
+    for name, value in values.items():
+        if value is None:
+            variables[name] = {"value": None, "type": "Null"}
+        elif isinstance(value, bool):
+            variables[name] = {"value": value, "type": "Boolean"}
+        elif isinstance(value, int):
+            variables[name] = {"value": value,
+                               "type": "Integer" if -2**31 <= value < 2**31 else "Long"}
+        elif isinstance(value, float):
+            variables[name] = {"value": value, "type": "Double"}
+        elif isinstance(value, str):
+            variables[name] = {"value": value, "type": "String"}
+        else:
+            variables[name] = {"value": json.dumps(value, ensure_ascii=False), "type": "Json"}
+    return variables
+
+
+# ---------------------------------------------------------------------------
+# Handlers
+# ---------------------------------------------------------------------------
+
+def table_handler(corpus, name, group=None):
+    """Handler that evaluates one table on the task variables"""
+    table = corpus.get(name, group=group)
+
+    def handle(variables):
+        rule = table.match(variables)
+        if rule is None:
+            raise BpmnError("DMN_NO_RULE", f"no rule of {name} matched")
+        outputs = rule.output(variables)
+        outputs["regraDmn"] = rule.id
+        return outputs
+
+    return handle
+
+
+def audit_handler(auditor):
+    """Handler that routes the task by its TUSS variable (see audit.Auditor)"""
+
+    def handle(variables):
+        result = auditor.audit(variables)
+        if "error" in result:
+            raise BpmnError("DMN_ROUTING", result["error"])
+        return {
+            "resultado": result["resultado"],
+            "observacao": result["observacao"],
+            "fundamentacao": result["fundamentacao"],
+            "regraDmn": result["rule"],
+            "tabelaDmn": result["table"],
+        }
+
+    return handle
+
+
+class Subscription:
+    """A topic, the handler for its tasks and the variables to fetch"""
+
+    def __init__(self, topic, handler, variables=None, lock_duration=60000, local_variables=False):
+        self.topic = topic
+        self.handler = handler
+        self.variables = variables
+        self.lock_duration = lock_duration
+        self.local_variables = local_variables
+        self.is_async = inspect.iscoroutinefunction(handler)
+
+    def fetch_topic(self):
+        topic = {"topicName": self.topic, "lockDuration": self.lock_duration}
+        if self.variables is not None:
+            topic["variables"] = list(self.variables)
+        if self.local_variables:
+            topic["localVariables"] = True
+        return topic
+
+
+# ---------------------------------------------------------------------------
+# Worker
+# ---------------------------------------------------------------------------
+
+class ExternalTaskWorker:
+    """Fetches, evaluates and completes external tasks on one event loop"""
+
+    def __init__(self, base_url, subscriptions, worker_id=None, max_tasks=100, concurrency=32,
+                 async_response_timeout=20000, default_retries=DEFAULT_RETRIES,
+                 use_priority=True, breaker=None, http_timeout=30.0, request_retries=3,
+                 request_backoff=1.0):
+        self.base_url = base_url
+        self.subscriptions = {s.topic: s for s in subscriptions}
+        self.worker_id = worker_id or f"dmn-engine-{socket.gethostname()}-{os.getpid()}"
+        self.max_tasks = max_tasks
+        self.concurrency = concurrency
+        self.async_response_timeout = async_response_timeout
+        self.default_retries = default_retries
+        self.use_priority = use_priority
+        self.breaker = breaker or CircuitBreaker()
+        self.http_timeout = http_timeout
+        self.request_retries = request_retries
+        self.request_backoff = request_backoff
+        self.counters = dict.fromkeys(_STATS, 0)
+        self.execution_time = 0.0
+        self._http = None
+        self._sending = None
+        self._inflight = set()
+        self._stopping = False
+
+    # -- REST ------------------------------------------------------------
+
+    async def _call(self, path, body, timeout=None):
+        """POST with retries and the circuit breaker; returns the decoded body"""
+        delay = self.request_backoff
+        attempts = max(1, self.request_retries)
+        for attempt in range(attempts):
+            if not self.breaker.allow():
+                raise CircuitOpenError(f"circuit open for {self.breaker.retry_after():.1f}s")
+            activations = self.breaker.activations
+            try:
+                status, data = await self._http.request("POST", path, body, timeout)
+            except (OSError, asyncio.TimeoutError) as exc:
+                self.breaker.record(False)
+                error = exc
+            else:
+                if status < 500:
+                    self.breaker.record(True)
+                    if status >= 400:
+                        message = data.get("message") if isinstance(data, dict) else data
+                        raise EngineError(status, message)
+                    return data
+                self.breaker.record(False)
+                error = EngineError(status, data.get("message") if isinstance(data, dict) else data)
+            self.counters["worker.circuit_breaker.activations"] += \
+                self.breaker.activations - activations
+            if attempt + 1 < attempts:
+                await asyncio.sleep(delay)
+                delay *= 2
+        raise error
+
+    async def fetch(self, max_tasks):
+        """fetchAndLock up to max_tasks tasks of every subscribed topic"""
+        body = {
+            "workerId": self.worker_id,
+            "maxTasks": max_tasks,
+            "usePriority": self.use_priority,
+            "asyncResponseTimeout": self.async_response_timeout,
+            "topics": [s.fetch_topic() for s in self.subscriptions.values()],
+        }
+        await self._start()
+        self.counters["worker.fetches"] += 1
+        timeout = self.http_timeout + self.async_response_timeout / 1000.0
+        return await self._call("/external-task/fetchAndLock", body, timeout) or []
+
+    # -- Processing ------------------------------------------------------
+
+    async def _evaluate(self, task):
+        """(endpoint, body) to report for one task"""
+        subscription = self.subscriptions[task["topicName"]]
+        started = time.perf_counter()
+        try:
+            variables = from_camunda(task.get("variables"))
+            if subscription.is_async:
+                outputs = await subscription.handler(variables)
+            else:
+                outputs = subscription.handler(variables)
+        except BpmnError as exc:
+            self.counters["worker.bpmn_errors.total"] += 1
+            self.counters["worker.executions.total.failure"] += 1
+            return "bpmnError", {"workerId": self.worker_id, "errorCode": exc.code,
+                                 "errorMessage": str(exc),
+                                 "variables": to_camunda(exc.variables)}
+        except Exception as exc:
+            self.counters["worker.executions.total.failure"] += 1
+            return self._failure(task, exc)
+        finally:
+            self.execution_time += time.perf_counter() - started
+        self.counters["worker.executions.total.success"] += 1
+        return "complete", {"workerId": self.worker_id, "variables": to_camunda(outputs or {})}
+
+    def _failure(self, task, exc):
+        retries = task.get("retries")
+        if retries is None:
+            retries = self.default_retries
+        if retries > 0:
+            self.counters["worker.retries.total"] += 1
+            # Camunda's retryTimeout is a long: keep it an int
+            timeout = 1000 << max(self.default_retries - retries, 0)
+            return "failure", {"workerId": self.worker_id,
+                               "errorMessage": f"{type(exc).__name__}: {exc}"[:666],
+                               "errorDetails": repr(exc),
+                               "retries": retries - 1, "retryTimeout": timeout}
+        self.counters["worker.bpmn_errors.total"] += 1
+        return "bpmnError", {"workerId": self.worker_id, "errorCode": WORKER_FAILURE,
+                             "errorMessage": str(exc)}
+
+    async def _report(self, task_id, endpoint, body):
+        async with self._sending:
+            try:
+                await self._call(f"/external-task/{quote(task_id, safe='')}/{endpoint}", body)
+            except EngineError as exc:
+                if exc.status == 400:
+                    # The lock expired or another worker holds the task: drop it
+                    self.counters["worker.locks.lost"] += 1
+                else:
+                    self.counters["worker.completions.lost"] += 1
+            except (DmnError, OSError, asyncio.TimeoutError):
+                # The lock expires and the engine hands the task out again
+                self.counters["worker.completions.lost"] += 1
+
+    async def process(self, tasks):
+        """Evaluate a fetched batch and start reporting its results"""
+        await self._start()
+        for task in tasks:
+            endpoint, body = await self._evaluate(task)
+            job = asyncio.ensure_future(self._report(task["id"], endpoint, body))
+            self._inflight.add(job)
+            job.add_done_callback(self._inflight.discard)
+
+    async def _start(self):
+        if self._http is None:
+            # One connection more than the senders for the long poll
+            self._http = HttpPool(self.base_url, self.concurrency + 1, self.http_timeout)
+            self._sending = asyncio.Semaphore(self.concurrency)
+
+    async def run_once(self):
+        """One fetch and its evaluation; returns the number of tasks fetched"""
+        await self._start()
+        room = self.max_tasks - len(self._inflight)
+        if room <= 0:
+            await asyncio.wait(set(self._inflight), return_when=asyncio.FIRST_COMPLETED)
+            return 0
+        tasks = await self.fetch(room)
+        await self.process(tasks)
+        return len(tasks)
+
+    async def run(self, stop=None):
+        """Fetch and process until stop (an asyncio.Event) is set or stop() is called"""
+        self._stopping = False
+        await self._start()
+        try:
+            while not self._stopping and not (stop is not None and stop.is_set()):
+                try:
+                    await self.run_once()
+                except CircuitOpenError:
+                    await asyncio.sleep(max(self.breaker.retry_after(), 0.05))
+                except (DmnError, OSError, asyncio.TimeoutError):
+                    await asyncio.sleep(self.request_backoff)
+        finally:
+            await self.drain()
+
+    def stop(self):
+        self._stopping = True
+
+    async def drain(self):
+        """Wait for every pending completion"""
+        if self._inflight:
+            await asyncio.gather(*list(self._inflight), return_exceptions=True)
+
+    async def close(self):
+        await self.drain()
+        if self._http is not None:
+            await self._http.close()
+            self._http = None
+
+    def stats(self):
+        stats = dict(self.counters)
+        stats["worker.execution.time.seconds"] = round(self.execution_time, 6)
+        stats["worker.circuit_breaker.state"] = self.breaker.state
+        stats["inflight"] = len(self._inflight)
+        return stats
+
@@ -0,0 +1,16 @@
+import pytest
+
+from dmn_engine import Corpus
+from dmn_engine.bench import fixtures
+
+
+@pytest.fixture(scope="session")
+def corpus():
+    return Corpus()
+
+
+def samples(corpus, ref, count=20, seed=0):
+    """Generated contexts for a table, as used by the benchmark"""
+    table = corpus.get(ref.key)
+    metadata = corpus.metadata(ref.key) if ref.metadata_path else None
+    return fixtures(table, metadata, count, seed)
@@ -0,0 +1,41 @@
+import random
+
+from dmn_engine.analyzer import _OTHER, _any_input_cells, analyze_table, reorder
+from dmn_engine.engine import parse_table
+
+from .conftest import samples
+
+
+def _any_inputs(table, count, rng):
+    """Contexts drawn from the literals of every column, plus an unknown value"""
+    input_asts, parsed_rules, _ = parse_table(table.source)
+    columns = []
+    for col, ast in enumerate(input_asts):
+        if ast[0] == "name":
+            cells = _any_input_cells([tests[col] if col < len(tests) else None
+                                      for tests, _ in parsed_rules])
+            columns.append((ast[1], [v for v in cells if v != _OTHER] + ["zzz-outro"]))
+    return [{name: rng.choice(values) for name, values in columns} for _ in range(count)]
+
+
+def test_reorder_keeps_first_hit_results(corpus):
+    rng = random.Random(1)
+    for ref in corpus:
+        table = corpus.get(ref.key)
+        if table.hit_policy != "FIRST":
+            continue
+        metadata = corpus.metadata(ref.key) if ref.metadata_path else None
+        hits = {rule.index: rng.choice([0, 1, 10, 1000]) for rule in table.rules}
+        report = analyze_table(table, metadata, hits)
+        fast = reorder(table, report["indices"])
+        for ctx in samples(corpus, ref, 10) + _any_inputs(table, 10, rng):
+            a, b = table.match(ctx), fast.match(ctx)
+            assert (a and a.index) == (b and b.index), (ref.key, ctx)
+
+
+def test_domain_dead_rules_stay_in_the_order(corpus):
+    table = corpus.get("30902100")
+    report = analyze_table(table, corpus.metadata("30902100"), {"Rule_30902100_DOC_Imagem": 0})
+    fast = reorder(table, report["indices"])
+    ctx = {"classeIndicacao": "Classe I", "examesComprobatorios": "SemImagem"}
+    assert fast.match(ctx).id == table.match(ctx).id == "Rule_30902100_DOC_Imagem"
@@ -0,0 +1,98 @@
+import random
+
+import pytest
+
+from dmn_engine.applicability import (
+    PRIORITIES, ApplicabilityIndex, _optional_inputs, priority_level)
+from dmn_engine.engine import parse_table
+from dmn_engine.ews import _names
+
+
+@pytest.fixture(scope="module")
+def index(corpus):
+    return ApplicabilityIndex(corpus)
+
+
+@pytest.fixture(scope="module")
+def required(corpus):
+    """{key: required variables} of every clinical alert, read table by table"""
+    return {ref.key: _required(corpus, ref) for ref in corpus
+            if ref.family == "Regras-Clinicas-Hospitais"}
+
+
+def _required(corpus, ref):
+    """Every variable a table's input expressions read, optional ones dropped"""
+    input_asts, _, _ = parse_table(corpus.get(ref.key).source)
+    optional = _optional_inputs(corpus.metadata(ref.key) if ref.metadata_path else None)
+    return {name for ast in input_asts for name in _names(ast, set())} - optional
+
+
+def _brute_force(required, index, ctx):
+    """Keys of the tables whose every input ctx has, checking each table in turn"""
+    present = {name for name, value in ctx.items() if value is not None}
+    found = [key for key, names in required.items() if names <= present]
+    rank = {p: i for i, p in enumerate(PRIORITIES)}
+    # sorted() is stable: corpus order within a priority
+    return sorted(found, key=lambda key: rank.get(index.priority(key), len(PRIORITIES)))
+
+
+def _contexts(index, count, seed):
+    rng = random.Random(seed)
+    sets = [set(names) for names in index.variable_sets]
+    names = sorted(set().union(*sets))
+    for _ in range(count):
+        # A table's whole input set plus noise, or a random handful of variables
+        ctx = dict.fromkeys(rng.choice(sets) if rng.random() < 0.7 else (), 1)
+        for name in rng.sample(names, rng.randint(0, 12)):
+            ctx[name] = None if rng.random() < 0.2 else 1
+        yield ctx
+
+
+def test_tables_match_a_brute_force_filter(index, required):
+    applied = 0
+    for ctx in _contexts(index, 300, seed=0):
+        expected = _brute_force(required, index, ctx)
+        assert [ref.key for ref in index.tables(ctx)] == expected
+        applied += bool(expected)
+    assert applied > 100
+
+
+def test_every_table_applies_to_its_own_inputs(index, required):
+    for key, names in required.items():
+        ctx = dict.fromkeys(names, 0)
+        assert key in [found.key for found in index.tables(ctx)]
+        if ctx:
+            # Missing any one input rules it out
+            ctx[sorted(ctx)[0]] = None
+            assert key not in [found.key for found in index.tables(ctx)]
+    assert sum(len(keys) for keys in index.variable_sets.values()) == len(index) == len(required)
+
+
+def test_evaluate_runs_the_applicable_tables(corpus, index):
+    ctx = {"medicamentosAtivos": ["FENELZINA"], "medicamentoNovo": "FENTANIL", "idade": 70}
+    expected = []
+    for ref in index.tables(ctx):
+        rule = corpus.get(ref.key).match(ctx)
+        if rule is not None and rule.tests:
+            expected.append((ref.key, rule.id))
+    found = index.evaluate(ctx)
+    assert [(r["key"], r["rule"]) for r in found] == expected
+    ranks = [PRIORITIES.index(r["priority"]) if r["priority"] else len(PRIORITIES)
+             for r in found]
+    assert ranks == sorted(ranks)
+
+
+def test_priority_words():
+    assert priority_level(" Crítica ") == "CRITICAL"
+    assert priority_level("alta") == "HIGH"
+    assert priority_level("Atenção") == "MEDIUM"
+    assert priority_level("rotina") == "LOW"
+    assert priority_level("qualquer") is None
+    assert priority_level(3) is None
+
+
+def test_optional_inputs():
+    assert _optional_inputs({"inputs": [{"name": "a", "required": False}, {"name": "b"}]}) == {"a"}
+    assert _optional_inputs({"inputs": {"a": {"required": True}, "b": {"required": False}}}) == \
+        {"b"}
+    assert _optional_inputs(None) == set()
@@ -0,0 +1,86 @@
+import io
+import json
+import shutil
+
+import pytest
+
+from dmn_engine import Corpus
+from dmn_engine.audit import FAMILY, run_audit
+
+from .conftest import samples
+
+GROUP = "cabeca-e-pescoco-cirurgia"
+
+
+@pytest.fixture(scope="module")
+def root(tmp_path_factory, corpus):
+    base = tmp_path_factory.mktemp("audit")
+    shutil.copytree(corpus.root / FAMILY / GROUP, base / FAMILY / GROUP)
+    return base
+
+
+@pytest.fixture(scope="module")
+def lines(root):
+    """JSONL claims for every table of the specialty, with a blank and a broken line"""
+    live = Corpus(root, families=(FAMILY,))
+    found = []
+    for ref in live:
+        for ctx in samples(live, ref, count=10):
+            found.append(json.dumps(dict(ctx, tuss=ref.code, guia=f"G-{len(found)}")) + "\n")
+    found[5:5] = ["\n", "{not json\n"]
+    return found
+
+
+class _Reader:
+    """A claim stream that counts the lines taken from it"""
+
+    def __init__(self, lines):
+        self.lines = lines
+        self.read = 0
+
+    def __iter__(self):
+        for line in self.lines:
+            self.read += 1
+            yield line
+
+
+class _Writer(io.StringIO):
+    """An output that records how far ahead of it the reader was"""
+
+    def __init__(self, reader):
+        super().__init__()
+        self.reader = reader
+        self.written = 0
+        self.ahead = 0
+
+    def write(self, text):
+        if text == "\n":
+            self.written += 1
+            self.ahead = max(self.ahead, self.reader.read - self.written)
+        return super().write(text)
+
+
+def test_results_keep_input_order(root, lines):
+    serial = io.StringIO()
+    run_audit(io.StringIO("".join(lines)), serial, workers=0, root=root)
+    parallel = io.StringIO()
+    summary = run_audit(io.StringIO("".join(lines)), parallel, workers=3, chunk_size=7,
+                        root=root)
+
+    results = [json.loads(line) for line in parallel.getvalue().splitlines()]
+    assert [r["line"] for r in results] == [n for n, line in enumerate(lines, 1) if line.strip()]
+    assert "invalid JSON" in results[5]["error"]
+    assert results == \
+        [json.loads(line) for line in serial.getvalue().splitlines()]
+    assert summary["claims"] == len(results) and summary["errors"] == 1
+
+
+def test_read_ahead_is_bounded(root, lines):
+    chunk_size, inflight = 4, 2
+    reader = _Reader(lines * 4)
+    out = _Writer(reader)
+    summary = run_audit(reader, out, workers=2, chunk_size=chunk_size, inflight=inflight,
+                        root=root)
+    assert summary["claims"] == out.written == len(lines * 4) - 4
+    # The chunk being written, `inflight` outstanding ones and the one the reader is filling
+    assert out.ahead <= (inflight + 2) * chunk_size
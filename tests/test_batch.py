@@ -0,0 +1,47 @@
+import pytest
+
+from .conftest import samples
+
+np = pytest.importorskip("numpy")
+
+from dmn_engine.batch import compile_batch  # noqa: E402
+
+
+def _columns(contexts):
+    names = sorted({name for ctx in contexts for name in ctx})
+    return {name: [ctx.get(name) for ctx in contexts] for name in names}
+
+
+def _numeric(columns):
+    """Numeric columns as float arrays with NaN for missing values"""
+    converted = {}
+    for name, values in columns.items():
+        if all(v is None or (type(v) in (int, float)) for v in values):
+            converted[name] = np.array([np.nan if v is None else v for v in values], dtype=float)
+        else:
+            converted[name] = values
+    return converted
+
+
+def _single_hit(corpus, group):
+    return [ref for ref in corpus if ref.group.split("/", 1)[0] == group
+            and corpus.get(ref.key).hit_policy in ("FIRST", "UNIQUE", "ANY")]
+
+
+@pytest.mark.parametrize("group", ["EWS", "DDI"])
+def test_batch_matches_scalar_evaluation(corpus, group):
+    refs = _single_hit(corpus, group)
+    assert refs
+    for ref in refs:
+        table = corpus.get(ref.key)
+        contexts = samples(corpus, ref, 40)
+        columns = _columns(contexts)
+        for batch in (columns, _numeric(columns)):
+            result = compile_batch(table).evaluate(batch)
+            for row, ctx in enumerate(contexts):
+                rule = table.match(ctx)
+                assert result["rule"][row] == (rule.index if rule is not None else -1), (ref.key, ctx)
+                expected = table.evaluate(ctx) or {}
+                for name, value in expected.items():
+                    got = result[name][row]
+                    assert got == value or (value is None and got != got), (ref.key, name, ctx)
@@ -0,0 +1,107 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from dmn_engine.bench import compare, fixtures, percentile, run_benchmark
+
+GROUPS = ("EWS", "cabeca-e-pescoco-cirurgia")
+
+_DUMP = """
+import json, sys
+from dmn_engine import Corpus
+from dmn_engine.bench import fixtures
+corpus = Corpus()
+out = {}
+for ref in corpus:
+    if ref.group.split("/", 1)[0] in sys.argv[1:]:
+        out[ref.key] = fixtures(corpus.get(ref.key), corpus.metadata(ref.key), 20, 7)
+print(json.dumps(out, sort_keys=True))
+"""
+
+
+def _dump(hash_seed):
+    env = dict(os.environ, PYTHONHASHSEED=str(hash_seed))
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    done = subprocess.run([sys.executable, "-c", _DUMP, *GROUPS], env=env, check=True,
+                          capture_output=True, text=True)
+    return json.loads(done.stdout)
+
+
+def test_fixtures_are_the_same_in_every_process():
+    first = _dump(1)
+    assert first and all(first.values())
+    assert _dump(2) == first
+
+
+def test_fixtures_depend_on_the_seed_and_table_only(corpus):
+    refs = [ref for ref in corpus if ref.group.split("/", 1)[0] in GROUPS]
+    changed = 0
+    for ref in refs[:10]:
+        table, metadata = corpus.get(ref.key), corpus.metadata(ref.key)
+        contexts = fixtures(table, metadata, 30, seed=3)
+        assert fixtures(table, metadata, 30, seed=3) == contexts
+        # A shorter run draws the same first contexts
+        assert fixtures(table, metadata, 10, seed=3) == contexts[:10]
+        changed += fixtures(table, metadata, 30, seed=4) != contexts
+    assert changed == 10
+
+
+def test_benchmark_counts_are_reproducible(corpus):
+    first = run_benchmark(corpus, samples=20, seed=5, groups=GROUPS, repeat=1)
+    second = run_benchmark(corpus, samples=20, seed=5, groups=GROUPS, repeat=1)
+    assert set(first["groups"]) == {"Regras-Clinicas-Hospitais/EWS",
+                                    "Regras-Audit-Operadora/cabeca-e-pescoco-cirurgia"}
+    for name, group in first["groups"].items():
+        other = second["groups"][name]
+        for key in ("tables", "rules", "errors"):
+            assert group[key] == other[key]
+        for key in ("count", "matched"):
+            assert group["evaluate"][key] == other["evaluate"][key]
+        assert group["evaluate"]["count"] == 20 * group["tables"] - group["errors"]
+    assert first["total"]["tables"] == sum(g["tables"] for g in first["groups"].values())
+    assert compare(first, first) == []
+
+
+def test_percentile_is_nearest_rank():
+    ordered = list(range(1, 101))
+    assert percentile(ordered, 50) == 50
+    assert percentile(ordered, 99) == 99
+    assert percentile([7], 99) == 7
+    assert percentile([], 50) is None
+
+
+def _report(p50, parse_ms=100.0, group="EWS"):
+    section = {"parse": {"totalMs": parse_ms}, "compile": {"totalMs": 50.0},
+               "evaluate": {"p50Us": p50, "p99Us": 10.0}}
+    return {"total": section, "families": {}, "groups": {group: section}}
+
+
+@pytest.mark.parametrize("after, regressed", [
+    (5.0, False),     # unchanged
+    (3.0, False),     # faster
+    (6.0, False),     # +20%, inside the tolerance
+    (7.0, True),      # +40%
+])
+def test_compare_tolerance(after, regressed):
+    found = compare(_report(5.0), _report(after))
+    assert bool(found) == regressed
+    if regressed:
+        assert {f["group"] for f in found} == {"total", "EWS"}
+        assert found[0] == {"group": "total", "metric": "evaluate.p50Us", "before": 5.0,
+                            "after": 7.0, "change": 0.4}
+
+
+def test_compare_ignores_timer_noise_and_missing_groups():
+    # +100% but only 0.5us, and +50% but only 5ms
+    assert compare(_report(0.5, parse_ms=10.0), _report(1.0, parse_ms=15.0)) == []
+    assert compare(_report(0.5, parse_ms=10.0), _report(1.0, parse_ms=15.0),
+                   floor_us=0.1, floor_ms=1.0) != []
+    assert [f["metric"] for f in compare(_report(5.0, 100.0), _report(5.0, 200.0))] == \
+        ["parse.totalMs", "parse.totalMs"]
+    found = compare(_report(5.0, group="EWS"), _report(50.0, group="BILL"))
+    assert [f["group"] for f in found] == ["total"]
+    assert compare({}, _report(50.0)) == []
@@ -0,0 +1,30 @@
+from dmn_engine.cache import ResultCache
+
+from .conftest import samples
+
+
+def test_cache_matches_table_evaluation(corpus):
+    cache = ResultCache(corpus, maxsize=512)
+    refs = list(corpus)[::7]
+    for ref in refs:
+        table = corpus.get(ref.key)
+        contexts = samples(corpus, ref, 10)
+        # Each context twice: the second lookup is served from the cache
+        for ctx in contexts + contexts:
+            assert cache.evaluate(ref.key, ctx) == table.evaluate(ctx), (ref.key, ctx)
+            if table.hit_policy == "FIRST":
+                rule, _ = cache.match(ref.key, ctx)
+                expected = table.match(ctx)
+                assert (rule and rule.index) == (expected and expected.index)
+    stats = cache.stats()
+    assert stats["hits"] > 0 and stats["evictions"] > 0
+
+
+def test_cache_keeps_value_types_apart(corpus):
+    cache = ResultCache(corpus)
+    ref = next(ref for ref in corpus if ref.family == "Regras-Audit-Operadora")
+    table = corpus.get(ref.key)
+    name = table.input_names[0]
+    for value in (True, "true", 1, "1", None):
+        ctx = {name: value}
+        assert cache.evaluate(ref.key, ctx) == table.evaluate(ctx)
@@ -0,0 +1,36 @@
+import random
+
+from dmn_engine.cid import CidIndex
+
+from .conftest import samples
+
+CODES = ["A40", "A41.9", "C50", "C50.9", "E11", "E11.9", "F32", "I10", "I21.0", "J45",
+         "K35", "M54.5", "N18.5", "O14", "O24.4", "R52", "Z00", "Z30.0", "C", "", "xyz"]
+
+
+def test_compiled_tables_match_the_original(corpus):
+    index = CidIndex(corpus)
+    rng = random.Random(0)
+    keys = sorted({test.table for test in index._tests})
+    assert keys
+    for key in keys[::3]:
+        ref = corpus.resolve(key)
+        table = corpus.get(ref.key)
+        compiled = index.compile(ref.key)
+        contexts = samples(corpus, ref, 10)
+        for ctx in contexts:
+            for name in index.variables:
+                if name in ctx or rng.random() < 0.3:
+                    ctx[name] = rng.choice(CODES)
+            assert compiled.evaluate(ctx) == table.evaluate(ctx), (key, ctx)
+
+
+def test_rules_agree_with_the_predicates(corpus):
+    index = CidIndex(corpus)
+    for code in CODES:
+        found = {(r["table"], r["ruleIndex"], r["variable"]) for r in index.rules(code)}
+        expected = set()
+        for test in index._tests:
+            if test.pred(code, {test.variable: code}):
+                expected.add((test.table, test.rule, test.variable))
+        assert found == expected, code
@@ -0,0 +1,43 @@
+import random
+
+from dmn_engine.ddi import CATEGORY, FAMILY, DrugIndex
+
+from .conftest import samples
+
+
+def test_screen_matches_a_linear_scan(corpus):
+    index = DrugIndex(corpus)
+    refs = [ref for ref in corpus if ref.family == FAMILY
+            and ref.group.split("/", 1)[0] == CATEGORY]
+    tables = [(ref, corpus.get(ref.key)) for ref in refs]
+    values = {}
+    for ref in refs:
+        for ctx in samples(corpus, ref, 5):
+            for name, value in ctx.items():
+                values.setdefault(name, []).append(value)
+    # Drugs every table spells the same way, so one context serves the linear scan
+    drugs = [d for d in index.drugs if index._spellings[d] == {d}]
+    rng = random.Random(0)
+    for _ in range(300):
+        new = rng.choice(drugs)
+        active = rng.sample(drugs, rng.randint(0, 3))
+        context = {name: rng.choice(choices) for name, choices in values.items()
+                   if name not in ("medicamentoNovo", "suplementoNovo", "medicamentosAtivos")}
+        ctx = dict(context, medicamentoNovo=new, suplementoNovo=new,
+                   medicamentosAtivos=sorted(active))
+        expected = set()
+        for ref, table in tables:
+            rule = table.match(ctx)
+            if rule is not None and rule.tests:
+                expected.add((ref.key, rule.id))
+        found = {(alert["key"], alert["rule"]) for alert in index.screen(new, active, context)}
+        assert found == expected, (new, active, context)
+
+
+def test_screen_reads_drug_aliases(corpus):
+    index = DrugIndex(corpus)
+    active = ["FENELZINA"]
+    expected = index.screen("FENTANIL", active, {"idade": 70})
+    assert expected
+    assert index.screen("Fentanila", active, {"idade": 70}) == expected
+    assert index.screen("fentanil", ["fenelzina"], {"idade": 70}) == expected
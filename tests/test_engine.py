@@ -0,0 +1,116 @@
+import gc
+
+import pytest
+
+from dmn_engine import Corpus, engine
+from dmn_engine.engine import compile_table
+from dmn_engine.errors import DmnError
+from dmn_engine.loader import parse_dmn
+
+TABLE = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="https://www.omg.org/spec/DMN/20191111/MODEL/" id="Definitions_T" name="T">
+  <decision id="Decision_T" name="Teste">
+    <decisionTable id="DecisionTable_T" hitPolicy="{policy}">
+      <input id="Input_1"><inputExpression typeRef="integer"><text>idade</text></inputExpression></input>
+      <input id="Input_2"><inputExpression typeRef="string"><text>sexo</text></inputExpression></input>
+      <input id="Input_3"><inputExpression typeRef="boolean"><text>laudo</text></inputExpression></input>
+      <output id="Output_1" name="resultado" typeRef="string" />
+      <output id="Output_2" name="observacao" typeRef="string" />
+      <rule id="Rule_Menor">
+        <inputEntry><text>&lt; 18</text></inputEntry>
+        <inputEntry><text>-</text></inputEntry>
+        <inputEntry><text>-</text></inputEntry>
+        <outputEntry><text>"Reprovado"</text></outputEntry>
+        <outputEntry><text>"Menor de idade"</text></outputEntry>
+      </rule>
+      <rule id="Rule_Feminino">
+        <inputEntry><text>[18..65]</text></inputEntry>
+        <inputEntry><text>"F"</text></inputEntry>
+        <inputEntry><text>true</text></inputEntry>
+        <outputEntry><text>"Aprovado"</text></outputEntry>
+        <outputEntry><text>"Idade: " + string(idade)</text></outputEntry>
+      </rule>
+      <rule id="Rule_Laudo">
+        <inputEntry><text>-</text></inputEntry>
+        <inputEntry><text>-</text></inputEntry>
+        <inputEntry><text>true</text></inputEntry>
+        <outputEntry><text>"Pendente"</text></outputEntry>
+      </rule>
+      <rule id="Rule_Default">
+        <inputEntry><text>-</text></inputEntry>
+        <inputEntry><text>-</text></inputEntry>
+        <inputEntry><text>-</text></inputEntry>
+        <outputEntry><text>"Auditoria"</text></outputEntry>
+        <outputEntry><text>"Sem regra"</text></outputEntry>
+      </rule>
+    </decisionTable>
+  </decision>
+</definitions>
+"""
+
+
+def _table(policy="FIRST"):
+    return compile_table(parse_dmn(TABLE.replace("{policy}", policy)))
+
+
+def test_first_hit_policy_takes_the_earliest_rule():
+    table = _table()
+    assert table.match({"idade": 10, "sexo": "F", "laudo": True}).id == "Rule_Menor"
+    assert table.match({"idade": 30, "sexo": "F", "laudo": True}).id == "Rule_Feminino"
+    assert table.match({"idade": 30, "sexo": "M", "laudo": True}).id == "Rule_Laudo"
+    assert table.match({"idade": 30, "sexo": "M", "laudo": False}).id == "Rule_Default"
+
+
+def test_wildcards_are_dropped():
+    table = _table()
+    assert [len(rule.tests) for rule in table.rules] == [1, 3, 1, 0]
+    assert table.match({}).id == "Rule_Default"
+
+
+def test_inputs_are_coerced_by_type_ref():
+    table = _table()
+    assert table.match({"idade": "30", "sexo": "F", "laudo": "true"}).id == "Rule_Feminino"
+    assert table.input_values({"idade": "30", "laudo": "false"}) == [30, None, False]
+
+
+def test_outputs():
+    table = _table()
+    assert table.evaluate({"idade": 30, "sexo": "F", "laudo": True}) == {
+        "resultado": "Aprovado", "observacao": "Idade: 30"}
+    # A rule with fewer output entries than outputs yields null for the rest
+    assert table.evaluate({"idade": 30, "laudo": True}) == {
+        "resultado": "Pendente", "observacao": None}
+
+
+def test_collect_returns_every_match():
+    table = _table("COLLECT")
+    results = table.evaluate({"idade": 30, "sexo": "F", "laudo": True})
+    assert [r["resultado"] for r in results] == ["Aprovado", "Pendente", "Auditoria"]
+
+
+def test_unsupported_hit_policy():
+    with pytest.raises(DmnError):
+        _table("PRIORITY")
+
+
+def test_reload_does_not_grow_the_shared_caches(tmp_path):
+    path = tmp_path / "Regras-Audit-Operadora" / "teste" / "10000000" / "regra.dmn.xml"
+    path.parent.mkdir(parents=True)
+    caches = (engine._PREDICATES, engine._OUTPUT_FUNCTIONS, engine._EXTRACTORS,
+              engine._CONSTANTS)
+    path.write_text(TABLE.replace("{policy}", "FIRST"), encoding="utf-8")
+    corpus = Corpus(tmp_path)
+    sizes = []
+    for version in range(20):
+        # Every version has a predicate, output expression and constant outputs no other table has
+        path.write_text(TABLE.replace("{policy}", "FIRST")
+                        .replace("&lt; 18", f"&lt; {9000 + version}")
+                        .replace('"Idade: "', f'"Idade {version}: "')
+                        .replace('"Menor de idade"', f'"Menor de {9000 + version}"'),
+                        encoding="utf-8")
+        corpus.reload("10000000")
+        table = corpus.get("10000000")
+        assert table.evaluate({"idade": 8999 + version})["observacao"] == f"Menor de {9000 + version}"
+        gc.collect()
+        sizes.append(tuple(len(cache) for cache in caches))
+    assert sizes[-1] == sizes[0]
@@ -0,0 +1,86 @@
+import random
+
+import pytest
+
+from dmn_engine.errors import DmnError
+from dmn_engine.ews import EwsMonitor
+
+from .conftest import samples
+
+
+@pytest.fixture(scope="module")
+def monitor_values(corpus):
+    """Every value the benchmark fixtures give each EWS input, by name"""
+    monitor = EwsMonitor(corpus)
+    values = {}
+    for entry in monitor.tables:
+        for ctx in samples(corpus, corpus.resolve(entry.key), count=40):
+            for name in entry.required:
+                if ctx.get(name) is not None and ctx[name] not in values.setdefault(name, []):
+                    values[name].append(ctx[name])
+    return values
+
+
+def _readings(values, seed, count=600, patients=("leito-1", "leito-2", "leito-3")):
+    rng = random.Random(seed)
+    names = sorted(values)
+    for _ in range(count):
+        reading = {}
+        for name in rng.sample(names, rng.randint(1, 3)):
+            reading[name] = None if rng.random() < 0.03 else rng.choice(values[name])
+        yield rng.choice(patients), reading
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_incremental_matches_a_full_match(corpus, monitor_values, seed):
+    monitor = EwsMonitor(corpus)
+    rules, levels = {}, {}
+    alerted = 0
+    for patient, reading in _readings(monitor_values, seed):
+        alerts = monitor.observe(patient, reading)
+        ctx = monitor.context(patient)
+        state = monitor._patients[patient]
+        expected = []
+        for entry in monitor.tables:
+            if not entry.known(ctx):
+                continue
+            rule = entry.table.match(ctx)
+            found = entry.winner(state.states[entry.key])
+            assert (found and found.id) == (rule and rule.id), (entry.key, ctx)
+            key = (patient, entry.key)
+            if rule is None or rules.get(key) == rule.index:
+                continue
+            rules[key] = rule.index
+            level = rule.output(ctx).get("nivelAlerta")
+            if key not in levels or levels[key] != level:
+                expected.append((entry.key, levels.get(key), level))
+                levels[key] = level
+        # Alerts only when nivelAlerta changed, exactly as a full re-evaluation sees it
+        assert sorted((a["table"], a["previous"], a["nivelAlerta"]) for a in alerts) == \
+            sorted(expected, key=lambda e: e[0])
+        alerted += len(alerts)
+    assert alerted
+    for patient in ("leito-1", "leito-2", "leito-3"):
+        assert monitor.levels(patient) == {key: level for (p, key), level in levels.items()
+                                           if p == patient}
+
+
+def test_repeated_reading_is_silent(corpus):
+    monitor = EwsMonitor(corpus, tables=["EWS-NEWS-004"])
+    first = monitor.observe("leito-1", {"news2ScoreTotal": 7})
+    assert len(first) == 1 and first[0]["previous"] is None
+    assert monitor.observe("leito-1", {"news2ScoreTotal": 7}) == []
+    # 7.0 == 7 but is a different reading
+    monitor.observe("leito-1", {"news2ScoreTotal": 7.0})
+    assert monitor.context("leito-1")["news2ScoreTotal"] == 7.0
+    assert monitor.discharge("leito-1") and not monitor.discharge("leito-1")
+    assert len(monitor) == 0
+
+
+def test_stream_needs_the_patient(corpus):
+    monitor = EwsMonitor(corpus, tables=["EWS-NEWS-004"])
+    alerts = list(monitor.stream([{"paciente": "a", "news2ScoreTotal": 1, "t": 5}],
+                                 time_field="t"))
+    assert [(a["patient"], a["at"]) for a in alerts] == [("a", 5)]
+    with pytest.raises(DmnError):
+        list(monitor.stream([{"news2ScoreTotal": 1}]))
@@ -0,0 +1,81 @@
+import pytest
+
+from dmn_engine.errors import FeelSyntaxError
+from dmn_engine.feel import (
+    compile_expression,
+    compile_unary_tests,
+    parse_expression,
+    parse_unary_tests,
+)
+
+
+@pytest.mark.parametrize("text", ["-", "", "  ", "*"])
+def test_wildcard(text):
+    assert parse_unary_tests(text) is None
+    assert compile_unary_tests(text) is None
+
+
+@pytest.mark.parametrize("text, ast", [
+    ('"A","B"', ("tests", [("eq", ("lit", "A")), ("eq", ("lit", "B"))])),
+    ("[1..5]", ("tests", [("range", True, ("lit", 1), ("lit", 5), True)])),
+    ("(1..5]", ("tests", [("range", False, ("lit", 1), ("lit", 5), True)])),
+    (">= 3", ("tests", [("cmp", ">=", ("lit", 3))])),
+    ('not("A")', ("not", [("eq", ("lit", "A"))])),
+    ("null", ("tests", [("eq", ("lit", None))])),
+    ("Sim", ("tests", [("eq", ("name", "Sim"))])),
+])
+def test_parse_unary_tests(text, ast):
+    assert parse_unary_tests(text) == ast
+
+
+@pytest.mark.parametrize("text, accepted, rejected", [
+    ('"A","B"', ["A", "B"], ["C", None, 1]),
+    ('"A" or "B"', ["A", "B"], ["C", None]),
+    ("[1..5]", [1, 3, 5, 2.5, "4"], [0, 6, None, "x"]),
+    ("(1..5)", [2, 4.9], [1, 5]),
+    (">= 3", [3, 10], [2, None, "abc"]),
+    ("< 0.5", [0, 0.49], [0.5, None]),
+    ('not("A")', ["B", None, 1], ["A"]),
+    ("not(null)", ["A", 0, False], [None]),
+    ("null", [None], ["", 0, False]),
+    ("true", [True], [False, None, "Sim"]),
+    ('"3"', ["3"], ["4"]),
+])
+def test_compile_unary_tests(text, accepted, rejected):
+    pred = compile_unary_tests(text)
+    for value in accepted:
+        assert pred(value, {}) is True, value
+    for value in rejected:
+        assert not pred(value, {}), value
+
+
+def test_bare_word_reads_context_or_itself():
+    pred = compile_unary_tests("Sim")
+    assert pred("Sim", {})
+    assert not pred("Sim", {"Sim": "Nao"})
+    assert pred("Nao", {"Sim": "Nao"})
+
+
+def test_function_tests():
+    pred = compile_unary_tests('contains(diagnosticoPrincipal, "A40") or starts with(diagnosticoPrincipal, "C")')
+    assert pred(None, {"diagnosticoPrincipal": "A40.1"})
+    assert pred(None, {"diagnosticoPrincipal": "C50"})
+    assert not pred(None, {"diagnosticoPrincipal": "I10"})
+    assert not pred(None, {})
+    member = compile_unary_tests('list contains(medicamentosAtivos, "FENELZINA")')
+    assert member(None, {"medicamentosAtivos": ["OMEPRAZOL", "FENELZINA"]})
+    assert not member(None, {"medicamentosAtivos": ["OMEPRAZOL"]})
+
+
+def test_expressions():
+    assert compile_expression("a + 2")({"a": 1}) == 3
+    assert compile_expression('"texto"')({}) == "texto"
+    assert compile_expression("")({}) is None
+    assert parse_expression("idade") == ("name", "idade")
+    assert compile_expression("idade >= 65 and sexo = \"F\"")({"idade": 70, "sexo": "F"}) is True
+
+
+@pytest.mark.parametrize("text", ["[1..", '"A', ">=", "(1..2", "a b c"])
+def test_syntax_errors(text):
+    with pytest.raises(FeelSyntaxError):
+        compile_unary_tests(text)
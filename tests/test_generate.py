@@ -0,0 +1,47 @@
+import json
+
+from dmn_engine.generate import UNCHANGED, Spec, find_specs, generate
+
+
+def test_specs_reproduce_the_committed_tables(corpus):
+    specs = find_specs(corpus.root)
+    assert specs
+    patches = []
+    report = generate(specs=specs, dry_run=True, force=True, diff=patches.append)
+    assert patches == []
+    assert {status for _, status in report} == {UNCHANGED}
+
+
+def test_every_output_is_in_the_manifest(corpus):
+    for path in find_specs(corpus.root):
+        report = generate(specs=[path], dry_run=True)
+        assert {status for _, status in report} == {UNCHANGED}
+        spec = Spec(path)
+        assert all(spec.output_path(tuss).is_file() for tuss in spec.procedures)
+
+
+def test_one_template_per_shape(corpus):
+    for path in find_specs(corpus.root):
+        spec = Spec(path)
+        shapes = {" ".join(text.split()) for text in spec.templates.values()}
+        assert len(shapes) == len(spec.templates)
+
+
+def test_defaults_and_empty_blocks(tmp_path):
+    gen = tmp_path / "teste" / "_generator"
+    gen.mkdir(parents=True)
+    (gen / "document.xml.tmpl").write_text("<t id=\"{tuss}\">{head}{notes}\n{rules}\n</t>\n")
+    (gen / "rule.xml.tmpl").write_text("  <r id=\"{id}\">{name}</r>")
+    (gen / "head.xml.tmpl").write_text("<!--{title}-->")
+    (gen / "spec.json").write_text(json.dumps({
+        "templates": {"document": "document.xml.tmpl", "rule": "rule.xml.tmpl",
+                      "head": "head.xml.tmpl"},
+        "defaults": {"head": [{"template": "head"}], "notes": [], "title": "padrão"},
+        "procedures": {
+            "1": {"name": "um", "rules": [{"template": "rule", "id": "a"}]},
+            "2": {"name": "dois", "title": "outro", "head": [], "rules": []},
+        },
+    }, ensure_ascii=False), encoding="utf-8")
+    spec = Spec(gen / "spec.json")
+    assert spec.render("1") == '<t id="1"><!--padrão-->\n  <r id="a">um</r>\n</t>\n'
+    assert spec.render("2") == '<t id="2">\n\n</t>\n'
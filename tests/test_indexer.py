@@ -0,0 +1,50 @@
+import json
+import shutil
+
+from dmn_engine.cli import main
+from dmn_engine.indexer import INDEX_FILES, rebuild_index
+
+FAMILY = "Regras-Clinicas-Hospitais"
+
+
+def _copy_family(corpus, tmp_path, family=FAMILY):
+    shutil.copytree(corpus.root / family, tmp_path / family,
+                    ignore=shutil.ignore_patterns(".swarm", ".claude-flow", "*.db"))
+    return tmp_path / family / INDEX_FILES[family]
+
+
+def test_rebuild_of_an_up_to_date_index_is_a_no_op(corpus, tmp_path):
+    path = _copy_family(corpus, tmp_path)
+    before = path.read_bytes()
+    result = rebuild_index(FAMILY, tmp_path)
+    assert not result["changed"]
+    assert result["parsed"] == 0 and result["reused"] == result["tables"]
+    assert path.read_bytes() == before
+
+
+def test_check_reports_a_stale_index(corpus, tmp_path, capsys):
+    path = _copy_family(corpus, tmp_path)
+    assert main(["--root", str(tmp_path), "index", "--check"]) == 0
+
+    table = next((tmp_path / FAMILY).glob("EWS/*/*/regra.dmn.xml"))
+    table.write_text(table.read_text(encoding="utf-8") + "\n", encoding="utf-8")
+    before = path.read_bytes()
+    assert main(["--root", str(tmp_path), "index", "--check"]) == 1
+    assert "stale" in capsys.readouterr().out
+    assert path.read_bytes() == before
+
+    assert main(["--root", str(tmp_path), "index"]) == 0
+    assert main(["--root", str(tmp_path), "index", "--check"]) == 0
+
+
+def test_new_specialties_get_no_made_up_status(corpus, tmp_path):
+    family = "Regras-Audit-Operadora"
+    source = corpus.root / family / "mastologia"
+    shutil.copytree(source, tmp_path / family / "mastologia")
+    index = tmp_path / family / INDEX_FILES[family]
+    index.write_text('{"specialties": []}\n', encoding="utf-8")
+    rebuild_index(family, tmp_path)
+    (spec,) = json.loads(index.read_text(encoding="utf-8"))["specialties"]
+    assert spec["slug"] == "mastologia"
+    assert spec["rulesCount"] == len(spec["rules"]) > 0
+    assert "status" not in spec
@@ -0,0 +1,128 @@
+import json
+import shutil
+import sqlite3
+
+import pytest
+
+from dmn_engine import memory as memory_module
+from dmn_engine.corpus import DEFAULT_ROOT
+from dmn_engine.memory import RuleMemory, find_memories, unpack_embedding
+
+SOURCES = find_memories(DEFAULT_ROOT)
+
+
+@pytest.fixture(params=SOURCES, ids=lambda path: path.parent.name)
+def swarm(request, tmp_path):
+    """A .swarm directory holding a copy of one committed memory.db"""
+    target = tmp_path / ".swarm"
+    target.mkdir()
+    shutil.copyfile(request.param / "memory.db", target / "memory.db")
+    return target
+
+
+def _rows(swarm):
+    db = sqlite3.connect(str(swarm / "memory.db"))
+    try:
+        return db.execute(
+            "SELECT rowid, key, namespace, status, embedding FROM memory_entries"
+            " WHERE embedding IS NOT NULL ORDER BY rowid").fetchall()
+    finally:
+        db.close()
+
+
+def _scan(rows, rowid, k, namespace=None):
+    """The k nearest [(score, key)] to a row, by decoding every JSON embedding"""
+    vectors = {r: json.loads(text) for r, _, _, _, text in rows}
+
+    def cosine(a, b):
+        dot = sum(x * y for x, y in zip(a, b))
+        return dot / (sum(x * x for x in a) ** 0.5 * sum(y * y for y in b) ** 0.5)
+
+    scored = [(cosine(vectors[rowid], vectors[r]), key) for r, key, ns, status, _ in rows
+              if r != rowid and status == "active" and namespace in (None, ns)]
+    return sorted(scored, reverse=True)[:k]
+
+
+def _found(results):
+    return [(entry["score"], entry["key"]) for entry in results]
+
+
+def _assert_same(found, expected):
+    assert [key for _, key in found] == [key for _, key in expected]
+    assert [score for score, _ in found] == pytest.approx([s for s, _ in expected], abs=1e-5)
+
+
+def test_similar_to_matches_a_full_scan(swarm):
+    rows = _rows(swarm)
+    with RuleMemory(swarm) as memory:
+        for rowid, key, namespace, _, _ in rows:
+            _assert_same(_found(memory.similar_to(key, k=3, namespace=namespace)),
+                         _scan(rows, rowid, 3, namespace))
+            _assert_same(_found(memory.similar(memory.vector(rowid), k=2, namespace=namespace,
+                                               exclude=(rowid,))),
+                         _scan(rows, rowid, 2, namespace))
+        assert memory.stats()["rows"] == len(rows)
+        assert not memory.stats()["packed"]
+
+
+def test_similar_to_without_numpy(swarm, monkeypatch):
+    monkeypatch.setattr(memory_module, "np", None)
+    rows = _rows(swarm)
+    with RuleMemory(swarm) as memory:
+        for rowid, key, namespace, _, _ in rows:
+            _assert_same(_found(memory.similar_to(key, k=3, namespace=namespace)),
+                         _scan(rows, rowid, 3, namespace))
+
+
+def test_migrate_packs_the_embeddings(swarm):
+    rows = _rows(swarm)
+    with RuleMemory(swarm) as memory:
+        before = {key: _found(memory.similar_to(key, namespace=ns)) for _, key, ns, _, _ in rows}
+        assert memory.migrate() == {"packed": len(rows), "invalid": 0}
+        assert memory.migrate() == {"packed": 0, "invalid": 0}
+        db = sqlite3.connect(str(swarm / "memory.db"))
+        for (rowid, _, _, _, text), (blob, json_text) in zip(rows, db.execute(
+                "SELECT embedding_blob, embedding FROM memory_entries"
+                " WHERE embedding_blob IS NOT NULL ORDER BY rowid")):
+            assert json_text == text
+            assert unpack_embedding(blob) == pytest.approx(json.loads(text), rel=1e-6)
+        db.close()
+        for _, key, ns, _, _ in rows:
+            _assert_same(_found(memory.similar_to(key, namespace=ns)), before[key])
+
+        memory.migrate(keep_json=False)
+        db = sqlite3.connect(str(swarm / "memory.db"))
+        assert db.execute("SELECT count(embedding) FROM memory_entries").fetchone() == (0,)
+        db.close()
+        for _, key, ns, _, _ in rows:
+            _assert_same(_found(memory.similar_to(key, namespace=ns)), before[key])
+        assert memory.stats()["packed"]
+
+
+def test_writes_by_another_connection_are_seen(swarm):
+    rows = _rows(swarm)
+    _, key, namespace, _, text = rows[0]
+    second, other = [(r[0], r[1]) for r in rows if r[2] == namespace][-1]
+    with RuleMemory(swarm) as memory:
+        memory.migrate()
+        assert memory.similar_to(key, k=1, namespace=namespace)[0]["score"] < 0.999
+        db = sqlite3.connect(str(swarm / "memory.db"))
+        with db:
+            # As the memory tool writes: updated_at is the time of the write
+            db.execute("UPDATE memory_entries SET embedding = ?, updated_at ="
+                       " (SELECT max(updated_at) + 1 FROM memory_entries) WHERE rowid = ?",
+                       (text, second))
+        db.close()
+        nearest = memory.similar_to(key, k=1, namespace=namespace)[0]
+        assert nearest["key"] == other and nearest["score"] == pytest.approx(1, abs=1e-5)
+
+
+def test_filters(swarm):
+    rows = _rows(swarm)
+    rowid, key, namespace = rows[0][:3]
+    with RuleMemory(swarm) as memory:
+        vector = memory.vector(rowid)
+        assert memory.similar(vector, k=len(rows), status="archived") == []
+        found = memory.similar(vector, k=len(rows), namespace=namespace)
+        assert {entry["namespace"] for entry in found} == {namespace}
+        assert found[0]["key"] == key and found[0]["score"] == pytest.approx(1, abs=1e-5)
@@ -0,0 +1,124 @@
+import re
+
+import pytest
+
+from dmn_engine import Corpus, Metrics, ResultCache
+from dmn_engine.errors import DmnError
+
+from .test_engine import TABLE
+
+KEY = "Regras-Audit-Operadora/teste/10000000"
+
+# name{labels} value, as OpenMetrics writes a sample
+_SAMPLE = re.compile(r'([a-z_]+)(\{(?:[a-z]+="(?:[^"\\]|\\.)*",?)*\})? (\S+)')
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    def make(policy="FIRST", name="live"):
+        root = tmp_path / policy / name
+        path = root / KEY / "regra.dmn.xml"
+        path.parent.mkdir(parents=True)
+        path.write_text(TABLE.replace("{policy}", policy), encoding="utf-8")
+        return Corpus(root)
+    return make
+
+
+def _samples(text):
+    """{(name, labels): value} of an exposition, checking it is well formed"""
+    lines = text.splitlines()
+    assert lines[-1] == "# EOF" and text.endswith("\n")
+    families, samples = set(), {}
+    for line in lines[:-1]:
+        if line.startswith("# TYPE "):
+            families.add(line.split()[2])
+            continue
+        if line.startswith("#"):
+            assert line.split()[1] in ("HELP", "UNIT")
+            continue
+        match = _SAMPLE.fullmatch(line)
+        assert match, line
+        name, labels, value = match.groups()
+        assert any(name == f or name.startswith(f + "_") for f in families), line
+        samples[name, labels or ""] = float(value)
+    return samples
+
+
+def test_match_and_evaluate_are_counted(corpus):
+    metrics = Metrics()
+    table = metrics.attach(corpus()).get("10000000")
+    table.match({"idade": 10})
+    table.evaluate({"idade": 30, "sexo": "F", "laudo": True})
+    table.evaluate({"idade": 30, "sexo": "M", "laudo": False})
+    assert metrics.hits(KEY) == {("Rule_Menor", "Reprovado"): 1,
+                                 ("Rule_Feminino", ""): 1,
+                                 ("Rule_Default", "Auditoria"): 1}
+    assert metrics.top(1)[0][2] == 3
+
+
+def test_multi_hit_tables_count_every_rule(corpus):
+    metrics = Metrics()
+    table = metrics.attach(corpus("COLLECT")).get("10000000")
+    assert len(table.evaluate({"idade": 30, "sexo": "F", "laudo": True})) == 3
+    table.match_all({"idade": 30, "sexo": "M", "laudo": None})
+    assert metrics.hits(KEY) == {("Rule_Feminino", ""): 1,
+                                 ("Rule_Laudo", "Pendente"): 1,
+                                 ("Rule_Default", "Auditoria"): 2}
+    assert metrics.top(1)[0][2] == 2
+
+
+def test_tables_compiled_before_attach(corpus):
+    plain = corpus()
+    table = plain.get("10000000")
+    metrics = Metrics()
+    metrics.attach(plain)
+    table.match({"idade": 10})
+    assert metrics.hits(KEY) == {("Rule_Menor", "Reprovado"): 1}
+
+
+def test_cache_hits_are_counted_apart(corpus):
+    metrics = Metrics()
+    cache = ResultCache(metrics.attach(corpus()))
+    for _ in range(3):
+        cache.evaluate("10000000", {"idade": 10})
+    assert metrics.hits(KEY) == {("Rule_Menor", "Reprovado"): 1}
+    samples = _samples(metrics.openmetrics())
+    labels = f'{{table="{KEY}",code="10000000"}}'
+    assert samples["dmn_cache_hits_total", labels] == 2
+    assert samples["dmn_evaluation_time_seconds_count", labels] == 1
+
+
+def test_exposition_format(corpus):
+    metrics = Metrics(tags={"worker": 'audit "1"\nb'})
+    table = metrics.attach(corpus()).get("10000000")
+    for age in (10, 20, 30, 70):
+        table.match({"idade": age, "sexo": "F", "laudo": True})
+    samples = _samples(metrics.openmetrics())
+
+    base = f'{{worker="audit \\"1\\"\\nb",table="{KEY}",code="10000000"}}'
+    hits = {labels: value for (name, labels), value in samples.items()
+            if name == "dmn_rule_hits_total"}
+    assert sum(hits.values()) == 4
+    assert hits[base[:-1] + ',rule="Rule_Menor",resultado="Reprovado"}'] == 1
+    buckets = [value for (name, labels), value in samples.items()
+               if name == "dmn_evaluation_time_seconds_bucket"]
+    assert buckets == sorted(buckets) and len(buckets) == len(metrics.buckets) + 1
+    assert buckets[-1] == samples["dmn_evaluation_time_seconds_count", base] == 4
+    assert samples["dmn_evaluation_time_seconds_max", base] <= \
+        samples["dmn_evaluation_time_seconds_sum", base]
+    for phase in ("parse", "compile"):
+        assert samples["dmn_table_load_time_seconds_count",
+                       base[:-1] + f',phase="{phase}"}}'] == 1
+
+
+def test_merge_adds_snapshots(corpus):
+    metrics, other = Metrics(), Metrics()
+    for registry in (metrics, other):
+        cache = ResultCache(registry.attach(corpus(name=str(id(registry)))))
+        cache.evaluate("10000000", {"idade": 10})
+        cache.evaluate("10000000", {"idade": 10})
+    metrics.merge(other.snapshot())
+    assert metrics.hits(KEY) == {("Rule_Menor", "Reprovado"): 2}
+    assert metrics.snapshot()["tables"][KEY][-1] == 2
+    with pytest.raises(DmnError):
+        metrics.merge(Metrics(buckets=(1.0,)).snapshot())
@@ -0,0 +1,114 @@
+import pytest
+
+from dmn_engine import Corpus
+from dmn_engine.pipeline import FAMILY, STAGES, RevenuePipeline
+
+TABLE = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="https://www.omg.org/spec/DMN/20191111/MODEL/" id="Definitions_{code}" name="{code}">
+  <decision id="Decision_{code}" name="{code}">
+    <decisionTable id="DecisionTable_{code}" hitPolicy="FIRST">
+      <input id="Input_1"><inputExpression typeRef="boolean"><text>{field}</text></inputExpression></input>
+      <output id="Output_1" name="resultado" typeRef="string" />
+      <output id="Output_2" name="observacao" typeRef="string" />
+      <output id="Output_3" name="acaoRecomendada" typeRef="string" />
+      <output id="Output_4" name="alertasConformidade" typeRef="string" />
+      <output id="Output_5" name="riscoDenial" typeRef="string" />
+      <rule id="Rule_{code}_Falha">
+        <inputEntry><text>false</text></inputEntry>
+        <outputEntry><text>"{resultado}"</text></outputEntry>
+        <outputEntry><text>"{field} ausente"</text></outputEntry>
+        <outputEntry><text>"Corrigir"</text></outputEntry>
+        <outputEntry><text>"{alert}"</text></outputEntry>
+        <outputEntry><text>"ALTO"</text></outputEntry>
+      </rule>
+      <rule id="Rule_{code}_Ok">
+        <inputEntry><text>-</text></inputEntry>
+        <outputEntry><text>"Prosseguir"</text></outputEntry>
+        <outputEntry><text>"OK"</text></outputEntry>
+        <outputEntry><text>"Nenhuma"</text></outputEntry>
+        <outputEntry><text>"NENHUM"</text></outputEntry>
+        <outputEntry><text>"BAIXO"</text></outputEntry>
+      </rule>
+    </decisionTable>
+  </decision>
+</definitions>
+"""
+
+# (group, code, input, resultado when the input is false)
+TABLES = (
+    ("CRED/MEDICO", "CRED-MEDICO-001", "medicoCredenciado", "Revisar"),
+    ("AUTH/GUIA", "AUTH-GUIA-001", "temAutorizacao", "Bloquear"),
+    ("BILL/OPME", "BILL-OPME-001", "codigoAnvisaValido", "Bloquear"),
+    ("BILL/MED", "BILL-MED-001", "loteRegistrado", "Alertar"),
+    ("DENY/PREV", "DENY-PREV-001", "cidInformado", "Revisar"),
+)
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    root = tmp_path_factory.mktemp("pipeline")
+    for group, code, field, resultado in TABLES:
+        path = root / FAMILY / group / code / "regra.dmn.xml"
+        path.parent.mkdir(parents=True)
+        path.write_text(TABLE.format(code=code, field=field, resultado=resultado,
+                                     alert=f"ALERTA_{code}"), encoding="utf-8")
+    return Corpus(root, families=(FAMILY,))
+
+
+ACCOUNT = {"medicoCredenciado": True, "temAutorizacao": True, "cidInformado": True,
+           "itens": [{"codigoAnvisaValido": True}, {"loteRegistrado": True}]}
+
+
+def _account(**changes):
+    account = dict(ACCOUNT, **changes)
+    account["itens"] = [dict(item) for item in account["itens"]]
+    return account
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_clean_account_runs_every_stage(corpus, workers):
+    with RevenuePipeline(corpus, workers=workers) as pipeline:
+        report = pipeline.run(_account())
+    assert report["resultado"] == "Prosseguir"
+    assert not report["blocked"] and report["skipped"] == []
+    assert [s["stage"] for s in report["stages"]] == [name for name, _ in STAGES]
+    assert sum(s["evaluated"] for s in report["stages"]) == len(TABLES)
+    assert report["findings"] == []
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_blocking_stage_ends_the_run(corpus, workers):
+    with RevenuePipeline(corpus, workers=workers) as pipeline:
+        report = pipeline.run(_account(medicoCredenciado=False, temAutorizacao=False,
+                                       cidInformado=False))
+    names = [name for name, _ in STAGES]
+    assert report["blocked"] and report["blockedAt"] == "authorization"
+    assert [s["stage"] for s in report["stages"]] == names[:2]
+    assert report["skipped"] == names[2:]
+    # The denial table would have found cidInformado missing, but never ran
+    assert [f["table"] for f in report["findings"]] == [
+        f"{FAMILY}/CRED/MEDICO/CRED-MEDICO-001", f"{FAMILY}/AUTH/GUIA/AUTH-GUIA-001"]
+    assert report["resultado"] == "Bloquear" and report["riscoDenial"] == "ALTO"
+    assert report["alertasConformidade"] == ["ALERTA_AUTH-GUIA-001", "ALERTA_CRED-MEDICO-001"]
+
+
+def test_blocking_item_stops_after_its_stage(corpus):
+    account = _account(cidInformado=False)
+    account["itens"][0]["codigoAnvisaValido"] = False
+    account["itens"][1]["loteRegistrado"] = False
+    with RevenuePipeline(corpus) as pipeline:
+        report = pipeline.run(account)
+    assert report["blockedAt"] == "billing"
+    assert report["skipped"] == [name for name, _ in STAGES][5:]
+    billing = report["stages"][-1]
+    assert billing["stage"] == "billing"
+    assert billing["resultados"] == {"Bloquear": 1, "Alertar": 1}
+    assert sorted(f["item"] for f in report["findings"]) == [0, 1]
+
+
+def test_tables_with_unknown_inputs_are_skipped(corpus):
+    with RevenuePipeline(corpus, stages=("credentialing", "denial")) as pipeline:
+        assert len(pipeline.tables()) == 2
+        report = pipeline.run({"cidInformado": False})
+    assert [s["evaluated"] for s in report["stages"]] == [0, 1]
+    assert report["resultado"] == "Revisar" and not report["blocked"]
@@ -0,0 +1,86 @@
+import io
+import json
+import shutil
+
+import pytest
+
+from dmn_engine import Corpus
+from dmn_engine.audit import FAMILY, Auditor, run_audit
+from dmn_engine.shadow import UNCHANGED
+
+from .conftest import samples
+
+GROUP = "cabeca-e-pescoco-cirurgia"
+EDITED = f"{FAMILY}/{GROUP}/30201012"
+
+
+@pytest.fixture(scope="module")
+def roots(tmp_path_factory, corpus):
+    """A live and a candidate root with one specialty; the candidate edits one table"""
+    base = tmp_path_factory.mktemp("shadow")
+    for name in ("live", "candidate"):
+        shutil.copytree(corpus.root / FAMILY / GROUP, base / name / FAMILY / GROUP)
+    path = base / "candidate" / EDITED / "regra.dmn.xml"
+    path.write_text(path.read_text(encoding="utf-8").replace('"Reprovado"', '"Pendente"'),
+                    encoding="utf-8")
+    return base / "live", base / "candidate"
+
+
+@pytest.fixture(scope="module")
+def claims(roots):
+    live = Corpus(roots[0], families=(FAMILY,))
+    found = []
+    for ref in live:
+        for ctx in samples(live, ref):
+            found.append(dict(ctx, tuss=ref.code, especialidade=GROUP))
+    return found
+
+
+def test_unchanged_tables_are_not_evaluated(roots, claims):
+    live = Corpus(roots[0], families=(FAMILY,))
+    candidate = Corpus(roots[1], families=(FAMILY,))
+    auditor = Auditor(live, shadow=candidate)
+    results = [auditor.audit(claim, line) for line, claim in enumerate(claims, 1)]
+
+    edited = [r for r in results if r["table"] == EDITED]
+    assert all("error" not in r for r in results)
+    assert auditor.shadow.changed_tables() == [EDITED]
+    # Only the edited table was compiled in the candidate, and only its claims evaluated
+    assert list(candidate._compiled) == [EDITED]
+    stats = auditor.shadow.stats()
+    assert stats["evaluated"] == len(edited)
+    assert stats["unchanged"] == len(results) - len(edited)
+    assert stats["missing"] == 0
+    assert stats["compared"] == len(results)
+    assert auditor.shadow.match(f"{FAMILY}/{GROUP}/30202051", {}) is UNCHANGED
+
+
+def test_divergences_are_recorded(roots, claims):
+    stream = io.StringIO("".join(json.dumps(claim) + "\n" for claim in claims))
+    out, divergences = io.StringIO(), io.StringIO()
+    summary = run_audit(stream, out, workers=0, root=roots[0], shadow=str(roots[1]),
+                        divergences=divergences)
+
+    rejected = [r for r in map(json.loads, out.getvalue().splitlines())
+                if r["table"] == EDITED and r["resultado"] == "Reprovado"]
+    found = [json.loads(line) for line in divergences.getvalue().splitlines()]
+    assert rejected
+    assert [d["line"] for d in found] == [r["line"] for r in rejected]
+    for divergence in found:
+        assert divergence["table"] == EDITED
+        assert divergence["live"]["resultado"] == "Reprovado"
+        assert divergence["candidate"]["resultado"] == "Pendente"
+    assert summary["divergent"] == len(found)
+    shadow = summary["shadow"]
+    assert shadow["compared"] == len(claims)
+    assert shadow["evaluated"] == sum(1 for claim in claims if claim["tuss"] == "30201012")
+    assert shadow["seconds"] >= 0
+
+
+def test_worker_stats_are_summed(roots, claims):
+    stream = io.StringIO("".join(json.dumps(claim) + "\n" for claim in claims))
+    summary = run_audit(stream, io.StringIO(), workers=2, chunk_size=16, root=roots[0],
+                        shadow=str(roots[1]))
+    assert summary["shadow"]["compared"] == len(claims)
+    assert summary["shadow"]["evaluated"] == sum(1 for c in claims if c["tuss"] == "30201012")
+
@@ -0,0 +1,50 @@
+import random
+
+from dmn_engine.analyzer import _OTHER, _any_input_cells
+from dmn_engine.engine import parse_table
+from dmn_engine.shared import SharedFragments
+
+from .conftest import samples
+
+
+def _fragment_values(shared):
+    """{input name: values} from the literals each fragment tests"""
+    values = {}
+    for fragment in shared.fragments:
+        _, parsed_rules, _ = parse_table(fragment.table.source)
+        for col, name in enumerate(fragment.inputs):
+            cells = _any_input_cells([tests[col] for tests, _ in parsed_rules])
+            values.setdefault(name, []).extend(v for v in cells if v != _OTHER)
+    return values
+
+
+def test_composed_results_equal_per_table_results(corpus):
+    shared = SharedFragments(corpus)
+    values = _fragment_values(shared)
+    rng = random.Random(0)
+    decided = 0
+    for ref in corpus:
+        table = corpus.get(ref.key)
+        dependent = bool(shared.plan(ref.key).depends)
+        contexts = samples(corpus, ref, 20 if dependent else 3)
+        if dependent:
+            contexts += [dict(ctx, **{name: rng.choice(choices) for name, choices in values.items()
+                                      if rng.random() < 0.5})
+                         for ctx in contexts]
+        for ctx in contexts:
+            claim = shared.claim(ctx)
+            composed = claim.match(ref.key)
+            rule = table.match(ctx)
+            assert composed["rule"] == (rule.id if rule is not None else None), (ref.key, ctx)
+            assert composed["outputs"] == table.evaluate(ctx), (ref.key, ctx)
+            decided += composed["source"] != ref.key
+    assert decided
+
+
+def test_copy_keeps_its_place_in_the_table(corpus):
+    shared = SharedFragments(corpus)
+    ref = corpus.resolve("30601062", group="cirurgia-plastica")
+    table = corpus.get(ref.key)
+    for ctx in samples(corpus, ref, 50):
+        ctx["expectativaVidaSuperior1Ano"] = False
+        assert shared.claim(ctx).match(ref.key)["rule"] == table.match(ctx).id
@@ -0,0 +1,81 @@
+import hashlib
+import os
+
+import pytest
+
+from dmn_engine import snapshot as snapshot_module
+from dmn_engine.corpus import FAMILIES
+from dmn_engine.errors import DmnError
+from dmn_engine.snapshot import Snapshot, build_snapshot
+
+from .conftest import samples
+
+
+def _outcome(table, ctx):
+    try:
+        return table.evaluate(ctx)
+    except DmnError as exc:
+        return type(exc), str(exc)
+
+
+@pytest.fixture(scope="module")
+def built(tmp_path_factory, corpus):
+    path = tmp_path_factory.mktemp("snapshot") / "corpus.snap"
+    count, errors = build_snapshot(path, corpus.root)
+    assert errors == [] and count == len(corpus)
+    return path
+
+
+def test_snapshot_evaluates_like_the_corpus(built, corpus):
+    with Snapshot(built) as snap:
+        assert [ref.key for ref in snap] == [ref.key for ref in corpus]
+        for ref in corpus:
+            table, cold = corpus.get(ref.key), snap.get(ref.key)
+            for ctx in samples(corpus, ref, count=5):
+                assert _outcome(cold, ctx) == _outcome(table, ctx), (ref.key, ctx)
+
+
+def test_metadata_and_hashes(built, corpus):
+    with Snapshot(built) as snap:
+        for ref in list(corpus)[::50]:
+            assert snap.metadata(ref.key) == corpus.metadata(ref.key)
+            with open(ref.path, "rb") as f:
+                assert snap.content_hash(ref.key) == hashlib.sha1(f.read()).hexdigest()
+
+
+def test_rebuild_replaces_the_file(tmp_path, corpus):
+    path = tmp_path / "corpus.snap"
+    build_snapshot(path, corpus.root, families=(FAMILIES[0],))
+    with Snapshot(path) as old:
+        inode = os.stat(path).st_ino
+        build_snapshot(path, corpus.root)
+        # A new file took the name; the open snapshot still reads the old one
+        assert os.stat(path).st_ino != inode
+        assert {ref.family for ref in old} == {FAMILIES[0]}
+        old.get(next(iter(old)).key)
+    with Snapshot(path) as new:
+        assert len(new) == len(corpus)
+    assert os.listdir(tmp_path) == ["corpus.snap"]
+
+
+def test_failed_rebuild_keeps_the_old_file(tmp_path, corpus, monkeypatch):
+    path = tmp_path / "corpus.snap"
+    build_snapshot(path, corpus.root, families=(FAMILIES[0],))
+    before = path.read_bytes()
+
+    def broken(table):
+        raise RuntimeError("interrupted")
+    monkeypatch.setattr(snapshot_module, "parse_table", broken)
+    with pytest.raises(RuntimeError):
+        build_snapshot(path, corpus.root)
+    assert path.read_bytes() == before
+    assert os.listdir(tmp_path) == ["corpus.snap"]
+
+
+def test_other_python_versions_are_refused(built, tmp_path):
+    data = bytearray(built.read_bytes())
+    data[8:10] = (2).to_bytes(2, "little")
+    path = tmp_path / "old.snap"
+    path.write_bytes(bytes(data))
+    with pytest.raises(DmnError, match="rebuild"):
+        Snapshot(path)
@@ -0,0 +1,108 @@
+import json
+
+from dmn_engine.validate import check_table, validate
+
+HEAD = """<?xml version="1.0" encoding="UTF-8"?>
+<definitions xmlns="https://www.omg.org/spec/DMN/20191111/MODEL/" id="D" name="T">
+  <decision id="Decision_T" name="{name}">
+    <decisionTable id="DT" hitPolicy="FIRST">
+      <input id="Input_1"><inputExpression typeRef="string"><text>medicamentoNovo</text></inputExpression>
+        <inputValues><text>"A","B","C"</text></inputValues></input>
+      <input id="Input_2"><inputExpression typeRef="integer"><text>idade</text></inputExpression></input>
+      <output id="Output_1" name="resultado" typeRef="string" />
+"""
+TAIL = """    </decisionTable>
+  </decision>
+</definitions>
+"""
+STANDARD = {"name": "resultado", "values": ["Aprovado", "Reprovado", "Pendente"]}
+
+
+def _rule(rule_id, inputs, output='"Aprovado"'):
+    entries = "".join(f"<inputEntry><text>{text}</text></inputEntry>" for text in inputs)
+    return f'      <rule id="{rule_id}">{entries}<outputEntry><text>{output}</text></outputEntry></rule>\n'
+
+
+def _write(tmp_path, rules, name="Teste", metadata=None, head=HEAD):
+    table = tmp_path / "regra.dmn.xml"
+    table.write_text(head.format(name=name) + "".join(rules) + TAIL, encoding="utf-8")
+    meta = None
+    if metadata is not None:
+        meta = tmp_path / "metadata.json"
+        meta.write_text(json.dumps(metadata), encoding="utf-8")
+    return table, meta
+
+
+def _codes(findings):
+    return [f["code"] for f in findings]
+
+
+def test_clean_table(tmp_path):
+    table, _ = _write(tmp_path, [_rule("R1", ['"A"', ">= 18"]), _rule("R2", ["-", "-"], '"Pendente"')])
+    assert check_table(table, output_standard=STANDARD) == []
+
+
+def test_or_chain_is_reported_once_per_cell(tmp_path):
+    table, _ = _write(tmp_path, [_rule("R1", ['"A" or "B" or "C"', "-"])])
+    findings = check_table(table)
+    assert _codes(findings) == ["feel-nonstandard"]
+    assert findings[0]["rule"] == "R1" and findings[0]["column"] == "medicamentoNovo"
+
+
+def test_rule_shape(tmp_path):
+    table, _ = _write(tmp_path, [_rule("R1", ['"A"'])])
+    (finding,) = check_table(table)
+    assert finding["code"] == "rule-shape" and finding["severity"] == "error"
+    assert finding["rule"] == "R1"
+
+
+def test_output_standard(tmp_path):
+    table, _ = _write(tmp_path, [_rule("R1", ['"A"', "-"], '"Talvez"')])
+    assert _codes(check_table(table, output_standard=STANDARD)) == ["output-value"]
+    other = dict(STANDARD, name="decisao")
+    (finding,) = check_table(table, output_standard=other)
+    assert finding["code"] == "output-standard" and finding["severity"] == "error"
+
+
+def test_allowed_values(tmp_path):
+    metadata = {"inputs": [
+        {"name": "medicamentoNovo", "type": "string", "allowedValues": ["A", "B"]},
+        {"name": "idade", "type": "integer"},
+    ]}
+    table, meta = _write(tmp_path, [_rule("R1", ['"A"', "-"])], metadata=metadata)
+    (finding,) = check_table(table, meta)
+    assert finding["code"] == "allowed-values" and finding["column"] == "medicamentoNovo"
+
+
+def test_xml_repaired(tmp_path):
+    table, _ = _write(tmp_path, [_rule("R1", ['"A"', "-"])], name="PTI recente (<12 meses)")
+    findings = check_table(table)
+    assert _codes(findings) == ["xml-repaired"]
+    assert findings[0]["severity"] == "warning"
+
+
+def test_cache_reuses_unchanged_tables(tmp_path):
+    root = tmp_path / "dmn"
+    family = "Regras-Clinicas-Hospitais"
+    for code in ("T-001", "T-002"):
+        directory = root / family / "TST" / code
+        directory.mkdir(parents=True)
+        _write(directory, [_rule("R1", ['"A" or "B"', "-"])])
+    cache = tmp_path / "cache.json"
+
+    def run():
+        stats = {}
+        results = {ref.code: findings for ref, findings in
+                   validate(root, families=(family,), workers=0, cache=cache, stats=stats)}
+        return results, stats
+
+    first, stats = run()
+    assert stats == {"tables": 2, "checked": 2, "cached": 0}
+    second, stats = run()
+    assert stats == {"tables": 2, "checked": 0, "cached": 2}
+    assert second == first
+
+    _write(root / family / "TST" / "T-002", [_rule("R1", ['"A"', "-"])])
+    third, stats = run()
+    assert stats == {"tables": 2, "checked": 1, "cached": 1}
+    assert third["T-001"] == first["T-001"] and third["T-002"] == []
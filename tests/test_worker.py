@@ -0,0 +1,137 @@
+import asyncio
+
+from dmn_engine.stub import StubEngine
+from dmn_engine.worker import (
+    WORKER_FAILURE,
+    CircuitBreaker,
+    CircuitOpenError,
+    EngineError,
+    ExternalTaskWorker,
+    Subscription,
+    table_handler,
+)
+
+
+def _run(test):
+    async def main():
+        engine = StubEngine()
+        url = await engine.start()
+        try:
+            await test(engine, url)
+        finally:
+            await engine.close()
+    asyncio.run(main())
+
+
+def _worker(url, handler, **options):
+    options.setdefault("async_response_timeout", 0)
+    options.setdefault("request_backoff", 0.001)
+    return ExternalTaskWorker(url, [Subscription("topic", handler, **options.pop("sub", {}))],
+                              worker_id="test-worker", **options)
+
+
+def _fail(variables):
+    raise ValueError("boom")
+
+
+def test_fetch_lock_and_complete(corpus):
+    async def test(engine, url):
+        ids = [engine.add_task("topic", {"news2ScoreTotal": score}) for score in (2, 8)]
+        engine.add_task("other", {})
+        worker = _worker(url, table_handler(corpus, "EWS-NEWS-001"))
+        tasks = await worker.fetch(10)
+        assert sorted(t["id"] for t in tasks) == ids
+        assert all(engine.tasks[i]["workerId"] == "test-worker" for i in ids)
+        assert await worker.fetch(10) == []          # still locked
+        await worker.process(tasks)
+        await worker.close()
+        table = corpus.get("EWS-NEWS-001")
+        for task_id, score in zip(ids, (2, 8)):
+            completed = engine.completed[task_id]
+            rule = table.match({"news2ScoreTotal": score})
+            assert completed["regraDmn"]["value"] == rule.id
+        assert engine.pending == 1
+        assert worker.stats()["worker.executions.total.success"] == 2
+    _run(test)
+
+
+def test_failure_counts_retries_down_then_raises_an_incident():
+    async def test(engine, url):
+        task_id = engine.add_task("topic", {}, retries=3)
+        worker = _worker(url, _fail)
+        for expected in (2, 1, 0):
+            (task,) = await worker.fetch(1)
+            await worker.process([task])
+            await worker.drain()
+            assert engine.tasks[task_id]["retries"] == expected
+            assert engine.tasks[task_id]["errorMessage"] == "ValueError: boom"
+            engine.tasks[task_id]["lockExpiration"] = 0.0   # skip the retryTimeout
+        assert task_id in engine.incidents
+        assert await worker.fetch(1) == []
+        assert worker.stats()["worker.retries.total"] == 3
+        await worker.close()
+    _run(test)
+
+
+def test_retry_timeout_is_an_integer():
+    worker = ExternalTaskWorker("http://localhost/engine-rest", [], default_retries=3)
+    timeouts = [worker._failure({"retries": r}, ValueError())[1]["retryTimeout"]
+                for r in (None, 3, 2, 1, 5)]
+    assert timeouts == [1000, 1000, 2000, 4000, 1000]
+    assert all(type(t) is int for t in timeouts)
+
+
+def test_bpmn_error_at_zero_retries():
+    async def test(engine, url):
+        task_id = engine.add_task("topic", {}, retries=1)
+        worker = _worker(url, _fail)
+        (task,) = await worker.fetch(1)
+        await worker.process([dict(task, retries=0)])
+        await worker.close()
+        assert engine.bpmn_errors[task_id]["errorCode"] == WORKER_FAILURE
+        assert task_id not in engine.tasks
+    _run(test)
+
+
+def test_expired_lock_drops_the_task():
+    async def test(engine, url):
+        task_id = engine.add_task("topic", {})
+        worker = _worker(url, lambda variables: {"ok": True}, sub={"lock_duration": 20})
+        tasks = await worker.fetch(1)
+        await asyncio.sleep(0.05)
+        await worker.process(tasks)
+        await worker.drain()
+        stats = worker.stats()
+        assert stats["worker.locks.lost"] == 1
+        assert stats["worker.completions.lost"] == 0
+        assert worker.breaker.state == CircuitBreaker.CLOSED
+        assert task_id not in engine.completed
+        # The engine hands the task out again
+        assert [t["id"] for t in await worker.fetch(1)] == [task_id]
+        await worker.close()
+    _run(test)
+
+
+def test_breaker_opens_while_the_engine_fails():
+    async def test(engine, url):
+        engine.fail_next(100)
+        worker = _worker(url, _fail)
+        for _ in range(5):
+            try:
+                await worker.fetch(1)
+            except EngineError as exc:
+                assert exc.status == 503
+            except CircuitOpenError:
+                break
+        assert worker.breaker.activations == 1
+        assert worker.stats()["worker.circuit_breaker.activations"] == 1
+        requests = engine.requests
+        try:
+            await worker.fetch(1)
+        except CircuitOpenError:
+            pass
+        else:
+            raise AssertionError("fetch went through an open breaker")
+        assert engine.requests == requests
+        await worker.close()
+    _run(test)